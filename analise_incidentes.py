@@ -0,0 +1,102 @@
+import re
+import unicodedata
+from collections import Counter
+
+import pandas as pd
+
+# Campos agregados na aba "Dados Processados": chave = campo do JSON, valor = rótulo exibido
+CAMPOS_AGREGADOS = {
+    "cmdb_ci": "IC",
+    "assignment_group": "Grupo de atribuição",
+    "u_incident_type": "Tipo de incidente",
+    "short_description": "Descrição resumida",
+}
+
+# Campos de data usados para o histograma de abertura, em ordem de preferência
+CAMPOS_ABERTURA = ("opened_at", "sys_created_on")
+
+CATEGORIAS = {
+    "criticos": "Críticos",
+    "altos": "Altos",
+    "especificos": "Específicos",
+    "vips": "VIPS",
+}
+
+VALOR_VAZIO = "Não informado"
+
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_NUMEROS = re.compile(r"\d+")
+
+def normalizar_descricao(texto):
+    """
+    Normaliza a short_description para agrupamento.
+    Remove acentos, ignora maiúsculas/minúsculas, substitui números por "#"
+    e colapsa espaços, para que variações da mesma falha caiam no mesmo grupo.
+    """
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _RE_NUMEROS.sub("#", texto.upper())
+    return _RE_ESPACOS.sub(" ", texto).strip()
+
+def extrair_hora_abertura(incident):
+    """
+    Retorna a hora (0-23) de abertura do incidente ou None se não houver data válida.
+    As datas do ServiceNow vêm no formato "YYYY-MM-DD HH:MM:SS".
+    """
+    for campo in CAMPOS_ABERTURA:
+        valor = incident.get(campo) or ""
+        if len(valor) >= 13 and valor[11:13].isdigit():
+            hora = int(valor[11:13])
+            if hora < 24:
+                return hora
+    return None
+
+def agregar_incidentes(dados_processados, top_n=10):
+    """
+    Agrega os incidentes já categorizados em uma única passada.
+
+    Args:
+        dados_processados (dict): Resultado de processar_json.
+        top_n (int): Quantidade de valores mais frequentes retornados por campo.
+
+    Returns:
+        dict: {
+            "top": {rótulo do campo: DataFrame com os top_n valores e quantidades},
+            "por_hora": DataFrame (24 linhas x categorias) com os incidentes abertos por hora
+        }
+    """
+    contadores = {campo: Counter() for campo in CAMPOS_AGREGADOS}
+    histograma = {categoria: [0] * 24 for categoria in CATEGORIAS}
+    # Cada descrição distinta é normalizada uma única vez
+    descricoes = {}
+
+    for categoria, incidentes in dados_processados.items():
+        if categoria not in CATEGORIAS:
+            continue
+        horas = histograma[categoria]
+        for incident in incidentes:
+            for campo, contador in contadores.items():
+                valor = incident.get(campo) or ""
+                if campo == "short_description":
+                    if valor not in descricoes:
+                        descricoes[valor] = normalizar_descricao(valor)
+                    valor = descricoes[valor]
+                contador[valor or VALOR_VAZIO] += 1
+
+            hora = extrair_hora_abertura(incident)
+            if hora is not None:
+                horas[hora] += 1
+
+    top = {}
+    for campo, contador in contadores.items():
+        rotulo = CAMPOS_AGREGADOS[campo]
+        top[rotulo] = pd.DataFrame(contador.most_common(top_n), columns=[rotulo, "Quantidade"])
+
+    por_hora = pd.DataFrame(
+        {CATEGORIAS[categoria]: horas for categoria, horas in histograma.items()},
+        index=pd.RangeIndex(24, name="Hora")
+    )
+
+    return {"top": top, "por_hora": por_hora}
@@ -0,0 +1,485 @@
+"""
+API HTTP local para automação dos três processamentos do gerador:
+
+    POST /keep-chgs    Planilha de CHGs (XLSX ou ODS) -> relatório do Keep (texto), só as alterações desde o
+                       último envio (?relatorio=delta) ou CHGs filtradas (?formato=xlsx)
+    POST /incidentes   JSON de incidentes -> relatório de incidentes (texto) ou incidentes categorizados (?formato=xlsx)
+    POST /testes       Cadernos de testes + arquivo diário (multipart) -> arquivo diário atualizado (XLSX)
+    GET  /saude        Estado do serviço (processamentos em execução e na fila)
+
+Os arquivos podem ser enviados em multipart/form-data ou, em /keep-chgs e /incidentes,
+como o próprio corpo da requisição. O upload é lido em blocos e gravado em disco
+acima de LIMITE_MMAP_BYTES. O processamento roda em um pool de processos e o resultado
+é gravado em um arquivo temporário e devolvido em blocos.
+
+No máximo `processos` requisições são processadas ao mesmo tempo e outras `fila`
+aguardam; acima disso a API responde 503 com Retry-After sem ler o upload, o que
+também segura o envio do cliente.
+
+Uso:
+    python api_http.py --porta 8080 --processos 4 --fila 16
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+from aiohttp import web
+
+from arquivo_enviado import LIMITE_MMAP_BYTES, ArquivoEnviado
+from logger import configurar_logs, registrar_log
+
+# Tamanho dos blocos lidos do upload e enviados na resposta
+TAMANHO_BLOCO_HTTP = 64 * 1024
+
+# Tamanho máximo de cada arquivo enviado
+TAMANHO_MAXIMO_UPLOAD = 512 * 1024 * 1024
+
+# Requisições que aguardam um processo livre antes de a API responder 503
+MAX_FILA = 16
+
+# Segundos sugeridos ao cliente (Retry-After) quando a fila está cheia
+SEGUNDOS_NOVA_TENTATIVA = 1
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME_TEXTO = "text/plain; charset=utf-8"
+
+class ErroEntrada(Exception):
+    """Entrada inválida enviada pelo cliente (respondida com 400)."""
+
+class ErroProcessamento(Exception):
+    """Entrada lida, mas que não pôde ser processada (respondida com 422)."""
+
+# Etapas do pipeline de CHGs cuja falha indica um arquivo ilegível ou sem as colunas esperadas
+ETAPAS_LEITURA_CHGS = ("ler", "validar")
+
+def _erro_etapa(e, etapas_entrada):
+    """Converte o ErroEtapa de um processamento no erro respondido pela API."""
+    if e.inesperado:
+        # Falha inesperada (erro de programação, recurso indisponível): vira 500
+        return e
+    if e.etapa in etapas_entrada:
+        return ErroEntrada(str(e))
+    return ErroProcessamento(str(e))
+
+# ========== Processamentos (executados no pool de processos) ==========
+
+def executar_keep_chgs(origem, nome, formato, destino, relatorio="completo", registrar=False):
+    """
+    Filtra as CHGs da planilha e grava o relatório do Keep (ou as CHGs em XLSX) em destino.
+    Com registrar=True, o relatório em texto é registrado como enviado (envios_keep);
+    o delta só é gerado se o Keep do dia já foi enviado, senão o relatório é o completo.
+
+    Returns:
+        dict: Quantidade de CHGs e tipo do relatório gerado
+
+    Raises:
+        ErroEntrada: Planilha ilegível ou sem as colunas das CHGs
+        ErroProcessamento: Planilha lida, mas que não pôde ser processada
+    """
+    from chg_processor import gerar_relatorio, gerar_relatorio_delta, processar_dados
+    from envios_keep import obter_registro_envios
+    from pipeline import ErroEtapa
+
+    with ArquivoEnviado(origem, nome=nome) as arquivo:
+        try:
+            df = processar_dados(arquivo, relancar_erros=True)
+        except ErroEtapa as e:
+            raise _erro_etapa(e, ETAPAS_LEITURA_CHGS)
+
+    if formato == "xlsx":
+        from exportacao_xlsx import abas_chgs, escrever_xlsx
+        with open(destino, "wb") as saida:
+            escrever_xlsx(abas_chgs(df), saida)
+        return {"chgs": len(df), "relatorio": None}
+
+    registro = obter_registro_envios()
+    anterior = registro.ultimo_envio() if relatorio == "delta" else None
+    with open(destino, "w", encoding="utf-8") as saida:
+        if anterior:
+            gerar_relatorio_delta(df, anterior, saida=saida)
+        else:
+            gerar_relatorio(df, saida=saida)
+    relatorio = "delta" if anterior else "completo"
+    if registrar and not df.empty:
+        registro.registrar(df, relatorio)
+    return {"chgs": len(df), "relatorio": relatorio}
+
+def executar_incidentes(origem, nome, formato, data, destino):
+    """
+    Categoriza o JSON de incidentes e grava o relatório (ou os incidentes em XLSX) em destino.
+
+    Returns:
+        dict: Quantidade de incidentes por categoria
+
+    Raises:
+        ErroEntrada: O arquivo não é um JSON de incidentes
+        ErroProcessamento: Erro na categorização dos incidentes
+    """
+    from gera_relatorio import gerar_relatorio, processar_arquivo_incidentes
+    from pipeline import ErroEtapa
+
+    with ArquivoEnviado(origem, nome=nome) as arquivo:
+        try:
+            dados_processados = processar_arquivo_incidentes(arquivo)
+        except ErroEtapa as e:
+            raise _erro_etapa(e, ("carregar",))
+
+    if formato == "xlsx":
+        from exportacao_xlsx import abas_incidentes, escrever_xlsx
+        with open(destino, "wb") as saida:
+            escrever_xlsx(abas_incidentes(dados_processados), saida)
+    else:
+        with open(destino, "w", encoding="utf-8") as saida:
+            gerar_relatorio(None, data, saida=saida, dados_processados=dados_processados)
+    return {categoria: len(incidentes) for categoria, incidentes in dados_processados.items()}
+
+def executar_testes(cadernos, diario, data_manual, ignorar_duplicados, destino):
+    """
+    Mescla os cadernos ((origem, nome)) no arquivo diário e grava o resultado em destino.
+
+    Returns:
+        dict: Quantidade de registros adicionados
+
+    Raises:
+        ErroProcessamento: Erro ao processar os cadernos ou o arquivo diário
+    """
+    from test_processor import processar_testes_lote
+
+    try:
+        output, registros = processar_testes_lote(
+            arquivos_caderno=[ArquivoEnviado(origem, nome=nome) for origem, nome in cadernos],
+            arquivo_diario=ArquivoEnviado(diario[0], nome=diario[1]),
+            data_manual=data_manual,
+            ignorar_duplicados=ignorar_duplicados
+        )
+    except Exception as e:
+        # processar_testes_lote já registrou o traceback e relata toda falha como Exception
+        raise ErroProcessamento(str(e))
+    with open(destino, "wb") as saida:
+        saida.write(output.getbuffer())
+    return {"registros": registros}
+
+# ========== Servidor ==========
+
+def criar_pool(processos):
+    # "spawn" evita copiar o estado do servidor (loop de eventos, threads) para os processos
+    return ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=configurar_logs)
+
+class ControleCarga:
+    """
+    Limita os processamentos simultâneos e a quantidade de requisições aguardando.
+
+    Uma requisição ocupa uma vaga desde antes da leitura do upload até o fim da
+    resposta. Com todas as vagas (processos + fila) ocupadas, a requisição é recusada
+    com 503 antes de o corpo ser lido.
+    """
+
+    def __init__(self, processos, fila):
+        self.pool = criar_pool(processos)
+        self.processos = processos
+        self.fila = fila
+        self.admitidas = 0
+        self.em_execucao = 0
+        self.recusadas = 0
+        self._semaforo = asyncio.Semaphore(processos)
+
+    def vaga(self):
+        if self.admitidas >= self.processos + self.fila:
+            self.recusadas += 1
+            raise web.HTTPServiceUnavailable(
+                text=json.dumps({"erro": "Servidor ocupado, tente novamente em instantes."}, ensure_ascii=False),
+                content_type="application/json",
+                headers={"Retry-After": str(SEGUNDOS_NOVA_TENTATIVA)}
+            )
+        return self
+
+    async def __aenter__(self):
+        self.admitidas += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.admitidas -= 1
+
+    async def executar(self, funcao, *args):
+        """Aguarda um processo livre e executa funcao(*args) no pool."""
+        async with self._semaforo:
+            self.em_execucao += 1
+            try:
+                pool = self.pool
+                return await asyncio.get_running_loop().run_in_executor(pool, funcao, *args)
+            except BrokenProcessPool:
+                # Um processo morreu (por exemplo, falta de memória): as próximas requisições usam um pool novo
+                if pool is self.pool:
+                    registrar_log("Pool de processos da API interrompido, criando um novo", "erro")
+                    self.pool = criar_pool(self.processos)
+                    pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            finally:
+                self.em_execucao -= 1
+
+    def estado(self):
+        return {
+            "processos": self.processos,
+            "em_execucao": self.em_execucao,
+            "aguardando": self.admitidas - self.em_execucao,
+            "fila": self.fila,
+            "recusadas": self.recusadas,
+        }
+
+class Temporarios:
+    """Uploads recebidos e arquivos de resultado da requisição, removidos ao final."""
+
+    def __init__(self):
+        self.caminhos = []
+
+    def novo(self, sufixo="", prefixo="api_resultado_"):
+        descritor, caminho = tempfile.mkstemp(prefix=prefixo, suffix=sufixo)
+        os.close(descritor)
+        self.caminhos.append(caminho)
+        return caminho
+
+    async def receber(self, ler_bloco, nome):
+        """
+        Lê um upload em blocos com ler_bloco(tamanho) até receber b"".
+
+        Returns:
+            bytes ou str: Conteúdo em memória ou, acima de LIMITE_MMAP_BYTES, caminho do
+            arquivo temporário (os processos do pool recebem só o caminho)
+        """
+        blocos, tamanho, arquivo = [], 0, None
+        try:
+            while bloco := await ler_bloco(TAMANHO_BLOCO_HTTP):
+                tamanho += len(bloco)
+                if tamanho > TAMANHO_MAXIMO_UPLOAD:
+                    raise web.HTTPRequestEntityTooLarge(max_size=TAMANHO_MAXIMO_UPLOAD, actual_size=tamanho)
+                if arquivo is None and tamanho > LIMITE_MMAP_BYTES:
+                    caminho = self.novo(os.path.splitext(nome or "")[1], "api_upload_")
+                    arquivo = open(caminho, "wb")
+                    arquivo.writelines(blocos)
+                    blocos = []
+                if arquivo is not None:
+                    arquivo.write(bloco)
+                else:
+                    blocos.append(bloco)
+        finally:
+            if arquivo is not None:
+                arquivo.close()
+        return arquivo.name if arquivo is not None else b"".join(blocos)
+
+    def remover(self):
+        for caminho in self.caminhos:
+            try:
+                os.unlink(caminho)
+            except OSError as e:
+                registrar_log(f"Não foi possível remover o temporário {caminho}: {str(e)}", "aviso")
+
+async def ler_formulario(request, temporarios):
+    """
+    Lê um multipart/form-data em blocos.
+
+    Returns:
+        tuple: ({campo: [(origem, nome do arquivo), ...]}, {campo: valor dos campos de texto})
+    """
+    arquivos, campos = {}, {}
+    leitor = await request.multipart()
+    while (parte := await leitor.next()) is not None:
+        if parte.filename is None:
+            campos[parte.name] = await parte.text()
+        else:
+            # Clientes como o aiohttp enviam nomes não ASCII codificados (filename="di%C3%A1rio.xlsx")
+            nome = unquote(parte.filename)
+            origem = await temporarios.receber(parte.read_chunk, nome)
+            arquivos.setdefault(parte.name, []).append((origem, nome))
+    return arquivos, campos
+
+async def ler_arquivo(request, temporarios, campo):
+    """
+    Lê o arquivo enviado no campo `campo` de um multipart ou como corpo da requisição
+    (com o nome do arquivo no parâmetro ?nome=).
+
+    Returns:
+        tuple: (origem, nome do arquivo)
+    """
+    if request.content_type == "multipart/form-data":
+        arquivos, _ = await ler_formulario(request, temporarios)
+        if not arquivos.get(campo):
+            raise ErroEntrada(f'Envie o arquivo no campo "{campo}".')
+        return arquivos[campo][0]
+    nome = request.query.get("nome")
+    return await temporarios.receber(request.content.read, nome), nome
+
+def ler_formato(request):
+    formato = request.query.get("formato", "txt")
+    if formato not in ("txt", "xlsx"):
+        raise ErroEntrada('O parâmetro formato deve ser "txt" ou "xlsx".')
+    return formato
+
+def ler_relatorio(request):
+    relatorio = request.query.get("relatorio", "completo")
+    if relatorio not in ("completo", "delta"):
+        raise ErroEntrada('O parâmetro relatorio deve ser "completo" ou "delta".')
+    return relatorio
+
+def ler_data(valor):
+    """Converte uma data DD/MM/YYYY (ou vazia) para o formato usado pelos processamentos."""
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, "%d/%m/%Y").date()
+    except ValueError:
+        raise ErroEntrada(f"Data inválida: {valor} (use DD/MM/YYYY).")
+
+async def responder_arquivo(request, caminho, content_type, nome_arquivo, cabecalhos=None):
+    """Envia o arquivo em blocos de TAMANHO_BLOCO_HTTP."""
+    resposta = web.StreamResponse(headers={
+        "Content-Type": content_type,
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(nome_arquivo)}",
+        **(cabecalhos or {})
+    })
+    resposta.content_length = os.path.getsize(caminho)
+    await resposta.prepare(request)
+    with open(caminho, "rb") as arquivo:
+        while bloco := arquivo.read(TAMANHO_BLOCO_HTTP):
+            await resposta.write(bloco)
+    await resposta.write_eof()
+    return resposta
+
+def tratar_erros(nome):
+    """Decorador dos endpoints: controla a vaga, os temporários, os erros e o log da requisição."""
+    def decorador(handler):
+        async def envolvido(request):
+            controle = request.app["controle"]
+            inicio = time.perf_counter()
+            temporarios = Temporarios()
+            async with controle.vaga():
+                try:
+                    resposta = await handler(request, controle, temporarios)
+                except ErroEntrada as e:
+                    resposta = web.json_response({"erro": str(e)}, status=400)
+                except ErroProcessamento as e:
+                    registrar_log(f"Erro na API {nome}: {str(e)}", "erro")
+                    resposta = web.json_response({"erro": str(e)}, status=422)
+                except web.HTTPException:
+                    raise
+                except BrokenProcessPool as e:
+                    resposta = web.json_response({"erro": f"Processo interrompido: {str(e)}"}, status=500)
+                except Exception as e:
+                    registrar_log(f"Erro inesperado na API {nome}: {str(e)}", "erro")
+                    registrar_log(f"Detalhes do erro: {traceback.format_exc()}", "erro")
+                    resposta = web.json_response({"erro": f"Erro interno: {str(e)}"}, status=500)
+                finally:
+                    temporarios.remover()
+            registrar_log(f"API {nome}: {resposta.status} em {time.perf_counter() - inicio:.2f}s", "info")
+            return resposta
+        return envolvido
+    return decorador
+
+@tratar_erros("keep-chgs")
+async def keep_chgs(request, controle, temporarios):
+    formato = ler_formato(request)
+    relatorio = ler_relatorio(request)
+    # Registrar o envio move a base do próximo delta: só quando o cliente confirma que enviará
+    registrar = request.query.get("registrar", "0") == "1"
+    origem, nome = await ler_arquivo(request, temporarios, "arquivo")
+    destino = temporarios.novo(f".{formato}")
+    resultado = await controle.executar(executar_keep_chgs, origem, nome, formato, destino, relatorio, registrar)
+    cabecalhos = {"X-Quantidade-CHGs": str(resultado["chgs"])}
+    if resultado["relatorio"]:
+        cabecalhos["X-Tipo-Relatorio"] = resultado["relatorio"]
+    return await responder_arquivo(
+        request, destino,
+        MIME_XLSX if formato == "xlsx" else MIME_TEXTO,
+        "CHGs_Filtradas.xlsx" if formato == "xlsx" else
+        "CHGs_Delta.txt" if resultado["relatorio"] == "delta" else "CHGs_Report.txt",
+        cabecalhos
+    )
+
+@tratar_erros("incidentes")
+async def incidentes(request, controle, temporarios):
+    formato = ler_formato(request)
+    data = ler_data(request.query.get("data"))
+    origem, nome = await ler_arquivo(request, temporarios, "arquivo")
+    destino = temporarios.novo(f".{formato}")
+    quantidades = await controle.executar(executar_incidentes, origem, nome, formato, data, destino)
+    return await responder_arquivo(
+        request, destino,
+        MIME_XLSX if formato == "xlsx" else MIME_TEXTO,
+        "Incidentes.xlsx" if formato == "xlsx" else "relatorio_incidentes.txt",
+        {"X-Quantidade-Incidentes": json.dumps(quantidades)}
+    )
+
+@tratar_erros("testes")
+async def testes(request, controle, temporarios):
+    if request.content_type != "multipart/form-data":
+        raise ErroEntrada('Envie os cadernos (campo "caderno") e o arquivo diário (campo "diario") em multipart/form-data.')
+    arquivos, campos = await ler_formulario(request, temporarios)
+    if not arquivos.get("caderno") or not arquivos.get("diario"):
+        raise ErroEntrada('Envie ao menos um arquivo no campo "caderno" e o arquivo diário no campo "diario".')
+    data = ler_data(campos.get("data"))
+    ignorar_duplicados = campos.get("ignorar_duplicados", "sim").strip().lower() not in ("nao", "não", "false", "0")
+    diario = arquivos["diario"][0]
+    destino = temporarios.novo(".xlsx")
+    resultado = await controle.executar(
+        executar_testes, arquivos["caderno"], diario,
+        data.strftime("%d/%m/%Y") if data else None, ignorar_duplicados, destino
+    )
+    return await responder_arquivo(
+        request, destino, MIME_XLSX, os.path.basename(diario[1] or "diario.xlsx"),
+        {"X-Registros-Adicionados": str(resultado["registros"])}
+    )
+
+async def saude(request):
+    return web.json_response({"status": "ok", **request.app["controle"].estado()})
+
+def criar_app(processos=None, fila=MAX_FILA):
+    """
+    Cria a aplicação aiohttp com o pool de processos dos processamentos.
+
+    Args:
+        processos: Processamentos simultâneos (padrão: número de CPUs)
+        fila: Requisições aguardando um processo antes de a API responder 503
+
+    Returns:
+        web.Application: Aplicação pronta para web.run_app ou AppRunner
+    """
+    processos = processos or os.cpu_count() or 1
+    app = web.Application()
+
+    async def iniciar_pool(app):
+        app["controle"] = ControleCarga(processos, fila)
+        registrar_log(f"API iniciada com {processos} processo(s) e fila de {fila}", "info")
+        yield
+        app["controle"].pool.shutdown(wait=True, cancel_futures=True)
+
+    app.cleanup_ctx.append(iniciar_pool)
+    app.add_routes([
+        web.post("/keep-chgs", keep_chgs),
+        web.post("/incidentes", incidentes),
+        web.post("/testes", testes),
+        web.get("/saude", saude),
+    ])
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP local do gerador de relatórios.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (padrão: 127.0.0.1)")
+    parser.add_argument("--porta", type=int, default=8080, help="Porta de escuta (padrão: 8080)")
+    parser.add_argument("--processos", type=int, default=None, help="Processamentos simultâneos (padrão: CPUs)")
+    parser.add_argument("--fila", type=int, default=MAX_FILA, help=f"Requisições aguardando (padrão: {MAX_FILA})")
+    args = parser.parse_args(argv)
+
+    configurar_logs()
+    web.run_app(criar_app(args.processos, args.fila), host=args.host, port=args.porta)
+
+if __name__ == "__main__":
+    main()
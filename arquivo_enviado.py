@@ -0,0 +1,132 @@
+import mmap
+import os
+import tempfile
+import weakref
+from io import BytesIO
+
+from logger import registrar_log
+
+# Arquivos maiores que este tamanho são gravados em disco e mapeados em memória (mmap)
+LIMITE_MMAP_BYTES = 32 * 1024 * 1024
+
+def _conteudo_sem_copia(origem):
+    """Retorna o conteúdo de um arquivo enviado evitando cópias sempre que possível.
+    Para BytesIO (como os arquivos do Streamlit) getvalue() devolve o próprio buffer;
+    getbuffer() e read() parcial criariam uma cópia.
+    """
+    if isinstance(origem, bytes):
+        return origem
+    if isinstance(origem, (bytearray, memoryview)):
+        return bytes(origem)
+    if isinstance(origem, BytesIO):
+        return origem.getvalue()
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+    return origem.read()
+
+def _fechar_mapeamento(mapeamento, caminho):
+    try:
+        mapeamento.close()
+    except BufferError:
+        # Ainda existem memoryviews abertas; o mapeamento é liberado quando elas forem descartadas
+        pass
+    try:
+        os.unlink(caminho)
+    except OSError as e:
+        registrar_log(f"Não foi possível remover o arquivo temporário {caminho}: {str(e)}", "aviso")
+
+class ArquivoEnviado:
+    """
+    Conteúdo de um arquivo enviado, lido uma única vez e exposto sem novas cópias.
+
+    O conteúdo fica disponível como memoryview (dados) e como arquivo binário novo a cada
+    chamada de abrir(), que é o que os leitores (pandas, openpyxl, zipfile) recebem.
+    Arquivos acima de limite_mmap são gravados em um arquivo temporário e mapeados em
+    memória, e os processos auxiliares recebem apenas o caminho desse arquivo.
+    """
+
+    def __init__(self, origem, nome=None, limite_mmap=LIMITE_MMAP_BYTES):
+        """
+        Args:
+            origem: Arquivo do Streamlit, arquivo binário, bytes ou caminho do arquivo
+            nome: Nome do arquivo (padrão: atributo name da origem)
+            limite_mmap: Tamanho a partir do qual o conteúdo é mapeado de um arquivo temporário
+        """
+        self.nome = nome or getattr(origem, "name", None)
+        self._conteudo = None
+        self._caminho = None
+        self._mmap = None
+
+        if isinstance(origem, (str, os.PathLike)):
+            self.nome = self.nome or os.path.basename(origem)
+            self._mapear(os.fspath(origem))
+            return
+
+        conteudo = _conteudo_sem_copia(origem)
+        if len(conteudo) <= limite_mmap:
+            self._conteudo = conteudo
+            return
+
+        sufixo = os.path.splitext(self.nome or "")[1]
+        with tempfile.NamedTemporaryFile(prefix="upload_", suffix=sufixo, delete=False) as temporario:
+            temporario.write(conteudo)
+        self._mapear(temporario.name)
+        # O arquivo temporário é removido quando este objeto for descartado (ou em fechar())
+        self._finalizador = weakref.finalize(self, _fechar_mapeamento, self._mmap, self._caminho)
+        registrar_log(f"Arquivo {self.nome} ({len(conteudo) / 1e6:.1f} MB) mapeado de {self._caminho}", "info")
+
+    def _mapear(self, caminho):
+        self._caminho = caminho
+        with open(caminho, "rb") as arquivo:
+            if os.fstat(arquivo.fileno()).st_size == 0:
+                self._conteudo = b""
+                return
+            self._mmap = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def tamanho(self):
+        return len(self._mmap) if self._mmap is not None else len(self._conteudo)
+
+    @property
+    def dados(self):
+        """Conteúdo completo como memoryview somente leitura (sem cópia)."""
+        return memoryview(self._mmap if self._mmap is not None else self._conteudo).toreadonly()
+
+    def abrir(self):
+        """Retorna um arquivo binário novo, posicionado no início, sobre o mesmo conteúdo."""
+        if self._mmap is not None:
+            return open(self._caminho, "rb")
+        # BytesIO sobre bytes compartilha o buffer até que haja uma escrita
+        return BytesIO(self._conteudo)
+
+    def fechar(self):
+        """Libera o mapeamento e remove o arquivo temporário (quando houver)."""
+        finalizador = getattr(self, "_finalizador", None)
+        if finalizador is not None:
+            finalizador()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def __getstate__(self):
+        # Para os processos auxiliares: o arquivo mapeado é enviado pelo caminho, sem copiar o conteúdo
+        if self._mmap is not None:
+            return {"nome": self.nome, "caminho": self._caminho}
+        return {"nome": self.nome, "conteudo": self._conteudo}
+
+    def __setstate__(self, estado):
+        self.nome = estado["nome"]
+        self._conteudo = None
+        self._caminho = None
+        self._mmap = None
+        if "caminho" in estado:
+            self._mapear(estado["caminho"])
+        else:
+            self._conteudo = estado["conteudo"]
+
+def como_arquivo_enviado(origem):
+    """Retorna a origem se ela já for um ArquivoEnviado, ou a envolve em um."""
+    return origem if isinstance(origem, ArquivoEnviado) else ArquivoEnviado(origem)
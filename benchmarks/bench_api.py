@@ -0,0 +1,140 @@
+"""
+Teste de carga local da API HTTP (api_http.py).
+
+Sobe a API em um subprocesso e dispara requisições concorrentes durante alguns
+segundos contra um endpoint, medindo requisições por segundo, latência (p50/p95/máx)
+e as respostas 503 devolvidas quando a fila está cheia:
+  - incidentes: POST /incidentes com o exemplo.json (ou --json);
+  - keep-chgs: POST /keep-chgs com uma planilha de CHGs gerada com --linhas linhas;
+  - keep-chgs-xlsx: o mesmo, com a resposta em XLSX.
+
+Uso:
+    python benchmarks/bench_api.py --endpoint incidentes --concorrencia 16 --segundos 10
+    python benchmarks/bench_api.py --endpoint keep-chgs --linhas 5000 --processos 4 --fila 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import aiohttp
+
+def gerar_planilha_chgs(caminho, linhas):
+    from datetime import datetime, timedelta
+
+    from openpyxl import Workbook
+
+    from chg_processor import COLUNAS_CHGS
+
+    agora = datetime.now()
+    wb = Workbook(write_only=True)
+    for aba in ('CHGs', 'CHGs II'):
+        ws = wb.create_sheet(aba)
+        ws.append(COLUNAS_CHGS)
+        for i in range(linhas // 2):
+            inicio = agora.replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(hours=i % 12)
+            ws.append([f'CHG{i:07d}', f'Mudança {i}', 'Agendado', 'Sem indisponibilidade', inicio,
+                       inicio + timedelta(hours=2), f'IC {i % 200}', f'Grupo {i % 40}', '', 'Sim' if i % 2 else 'Não'])
+    wb.save(caminho)
+
+async def aguardar_api(sessao, url, processo, limite=60):
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("A API terminou antes de responder")
+        try:
+            async with sessao.get(f"{url}/saude") as resposta:
+                if resposta.status == 200:
+                    return
+        except aiohttp.ClientConnectionError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("A API não respondeu a tempo")
+
+async def cliente(sessao, url, corpo, fim, latencias, estados):
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        async with sessao.post(url, data=corpo) as resposta:
+            await resposta.read()
+            estados[resposta.status] += 1
+            if resposta.status == 200:
+                latencias.append(time.perf_counter() - inicio)
+            elif resposta.status == 503:
+                await asyncio.sleep(float(resposta.headers.get("Retry-After", 1)) / 10)
+
+async def carga(args, url, caminho, corpo):
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=600)) as sessao:
+        # Aquecimento: requisições simultâneas iniciam todos os processos do pool e carregam os módulos
+        async def aquecer():
+            async with sessao.post(url + caminho, data=corpo) as resposta:
+                if resposta.status != 200:
+                    raise RuntimeError(f"Resposta {resposta.status}: {await resposta.text()}")
+                await resposta.read()
+
+        await asyncio.gather(*[aquecer() for _ in range(min(args.processos or os.cpu_count() or 1, args.fila + 1))])
+
+        latencias, estados = [], Counter()
+        inicio = time.perf_counter()
+        fim = inicio + args.segundos
+        await asyncio.gather(*[cliente(sessao, url + caminho, corpo, fim, latencias, estados)
+                               for _ in range(args.concorrencia)])
+        duracao = time.perf_counter() - inicio
+
+    print(f"{caminho}: {args.concorrencia} clientes, {duracao:.1f}s")
+    print(f"  {len(latencias) / duracao:.1f} req/s concluídas, respostas: {dict(sorted(estados.items()))}")
+    if latencias:
+        latencias.sort()
+        print(f"  latência p50 {statistics.median(latencias) * 1000:.0f} ms, "
+              f"p95 {latencias[int(len(latencias) * 0.95) - 1] * 1000:.0f} ms, máx {latencias[-1] * 1000:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--endpoint', choices=['incidentes', 'keep-chgs', 'keep-chgs-xlsx'], default='incidentes')
+    parser.add_argument('--json', default=os.path.join(RAIZ, 'exemplo.json'), help='JSON de incidentes enviado')
+    parser.add_argument('--linhas', type=int, default=2000, help='Linhas da planilha de CHGs enviada')
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--fila', type=int, default=16)
+    parser.add_argument('--porta', type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        if args.endpoint == 'incidentes':
+            caminho = '/incidentes'
+            with open(args.json, 'rb') as arquivo:
+                corpo = arquivo.read()
+        else:
+            planilha = os.path.join(pasta, 'chgs.xlsx')
+            gerar_planilha_chgs(planilha, args.linhas)
+            caminho = '/keep-chgs?nome=chgs.xlsx' + ('&formato=xlsx' if args.endpoint == 'keep-chgs-xlsx' else '')
+            with open(planilha, 'rb') as arquivo:
+                corpo = arquivo.read()
+
+        comando = [sys.executable, os.path.join(RAIZ, 'api_http.py'), '--porta', str(args.porta), '--fila', str(args.fila)]
+        if args.processos:
+            comando += ['--processos', str(args.processos)]
+        processo = subprocess.Popen(comando, cwd=pasta, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            url = f"http://127.0.0.1:{args.porta}"
+
+            async def executar():
+                async with aiohttp.ClientSession() as sessao:
+                    await aguardar_api(sessao, url, processo)
+                await carga(args, url, caminho, corpo)
+
+            asyncio.run(executar())
+        finally:
+            processo.terminate()
+            processo.wait()
+
+if __name__ == '__main__':
+    main()
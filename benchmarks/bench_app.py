@@ -0,0 +1,65 @@
+"""
+Benchmark do app Streamlit (generate_chg_report.py).
+
+Mede, em um processo novo, o tempo da primeira execução do script (partida a
+frio, incluindo as importações) e o tempo médio das reexecuções seguintes,
+que é o custo pago a cada interação do usuário. Usa o AppTest do Streamlit,
+sem servidor nem navegador.
+
+Uso:
+    python benchmarks/bench_app.py --reexecucoes 20
+    python benchmarks/bench_app.py --app /outro/checkout/generate_chg_report.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO_MEDICAO = """
+import json, statistics, sys, time
+from streamlit.testing.v1 import AppTest
+
+app, reexecucoes = sys.argv[1], int(sys.argv[2])
+at = AppTest.from_file(app, default_timeout=120)
+inicio = time.perf_counter()
+at.run()
+partida = time.perf_counter() - inicio
+tempos = []
+for _ in range(reexecucoes):
+    inicio = time.perf_counter()
+    at.run()
+    tempos.append(time.perf_counter() - inicio)
+modulos = [nome for nome in ("pandas", "openpyxl", "PIL", "tabula") if nome in sys.modules]
+print(json.dumps({"partida": partida, "reexecucao": statistics.median(tempos),
+                  "erros": len(at.exception), "modulos": modulos}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--app', default=os.path.join(RAIZ, 'generate_chg_report.py'))
+    parser.add_argument('--reexecucoes', type=int, default=20)
+    parser.add_argument('--rodadas', type=int, default=3, help='Processos novos para medir a partida a frio')
+    args = parser.parse_args()
+
+    app = os.path.abspath(args.app)
+    resultados = []
+    for _ in range(args.rodadas):
+        saida = subprocess.run(
+            [sys.executable, '-c', CODIGO_MEDICAO, app, str(args.reexecucoes)],
+            cwd=os.path.dirname(app), capture_output=True, text=True, check=True
+        )
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    partida = sorted(r['partida'] for r in resultados)[len(resultados) // 2]
+    reexecucao = sorted(r['reexecucao'] for r in resultados)[len(resultados) // 2]
+    print(f"Partida a frio: {partida * 1000:.0f} ms (mediana de {args.rodadas})")
+    print(f"Reexecução:     {reexecucao * 1000:.1f} ms (mediana de {args.reexecucoes})")
+    print(f"Módulos pesados carregados: {', '.join(resultados[-1]['modulos']) or 'nenhum'}")
+    if any(r['erros'] for r in resultados):
+        print("Atenção: o app gerou exceções durante a medição")
+
+if __name__ == '__main__':
+    main()
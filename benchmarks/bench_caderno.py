@@ -0,0 +1,107 @@
+"""
+Benchmark da leitura do caderno de testes (preparar_caderno).
+
+Gera um caderno com N linhas divididas entre as abas de ABAS_CADERNO e mede o
+tempo e o pico de memória residente (RSS, amostrado em /proc; apenas Linux)
+acima do consumo inicial. Também compara, isoladamente, a combinação das abas:
+concatenação coluna a coluna já no layout do arquivo diário contra a ida e
+volta por registros (to_dict('records')) seguida de reindex(columns=header),
+usada anteriormente.
+
+Uso:
+    python benchmarks/bench_caderno.py --linhas 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from test_processor import ABAS_CADERNO, COLUNAS_DESTINO, preparar_caderno
+
+CABECALHO_CADERNO = [
+    'ID Fluxo', 'Frente', 'Canal', 'Plataforma', 'Tipo de Plano', 'Plano',
+    'Característica da massa', 'Entrypoint', 'Funcionalidade', 'Cenário',
+    'Resultado esperado', 'Status', 'N° INC', 'Notas QD', 'Prioridade'
+]
+STATUS = ['Passed', 'failed', 'Not executed', 'A validar', 'Blocked']
+
+def gerar_caderno(caminho, linhas):
+    wb = Workbook(write_only=True)
+    por_aba = linhas // len(ABAS_CADERNO)
+    for aba in ABAS_CADERNO:
+        ws = wb.create_sheet(aba)
+        ws.append(CABECALHO_CADERNO)
+        for i in range(por_aba):
+            ws.append([i, 'Frente', 'App', 'iOS', 'Pré', f'Plano {i % 50}', 'massa', 'entry',
+                       f'Funcionalidade {i % 300}', f'Cenário {i}', 'ok', STATUS[i % len(STATUS)],
+                       '' if i % 7 else f'INC{i}', f'nota {i}', 'alta'])
+    wb.save(caminho)
+
+def memoria_residente():
+    with open('/proc/self/statm') as arquivo:
+        return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def medir(funcao, *args):
+    # O RSS é amostrado em paralelo: inclui a memória alocada fora do Python (numpy, pyarrow)
+    base = memoria_residente()
+    pico = [base]
+    executando = threading.Event()
+    executando.set()
+
+    def amostrar():
+        while executando.is_set():
+            pico[0] = max(pico[0], memoria_residente())
+            time.sleep(0.002)
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    duracao = time.perf_counter() - inicio
+    executando.clear()
+    amostrador.join()
+    return resultado, duracao, (max(pico[0], memoria_residente()) - base) / 1e6
+
+def combinar_por_registros(frames, header):
+    registros = []
+    for df in frames:
+        registros.extend(df.to_dict('records'))
+    return pd.DataFrame(registros).reindex(columns=header, fill_value='')
+
+def combinar_colunas(frames, header):
+    return pd.concat([df.reindex(columns=header, fill_value='') for df in frames], ignore_index=True, sort=False)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=200000)
+    args = parser.parse_args()
+
+    header = COLUNAS_DESTINO + ['Observação']
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'caderno.xlsx')
+        inicio = time.perf_counter()
+        gerar_caderno(caminho, args.linhas)
+        print(f"Caderno gerado: {args.linhas} linhas, {os.path.getsize(caminho) / 1e6:.1f} MB "
+              f"({time.perf_counter() - inicio:.1f}s)")
+
+        df, duracao, pico = medir(preparar_caderno, caminho, '01/01/2025', header)
+        print(f"preparar_caderno: {duracao:.2f}s, pico {pico:.0f} MB, {len(df)} registros válidos")
+
+        frames = [
+            pd.read_excel(caminho, sheet_name=aba, dtype=str).rename(columns={'Notas QD': 'Observação'})
+            for aba in ABAS_CADERNO
+        ]
+        for nome, funcao in (("concat no layout", combinar_colunas), ("registros + reindex", combinar_por_registros)):
+            resultado, duracao, pico = medir(funcao, frames, header)
+            del resultado
+            print(f"Combinação ({nome}): {duracao:.2f}s, pico {pico:.0f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark da anexação de registros ao arquivo diário (aba B2C).
+
+Compara a anexação em streaming (diario_xlsx.AnexadorDiario) com o caminho
+completo via openpyxl para um diário com N linhas de histórico.
+
+Uso:
+    python benchmarks/bench_diario.py --linhas 500000 --novas 500
+    python benchmarks/bench_diario.py --linhas 100000 --openpyxl
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+from arquivo_enviado import como_arquivo_enviado
+from diario_xlsx import AnexadorDiario
+from test_processor import COLUNAS_DESTINO, CORES_STATUS_RGB, anexar_com_openpyxl
+
+def gerar_diario(caminho, linhas):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('B2C')
+    ws.append(COLUNAS_DESTINO)
+    for i in range(linhas):
+        ws.append(['01/01/2025', 'Frente', 'App', 'iOS', 'Pré', f'Plano {i % 50}', 'massa',
+                   'entry', f'Funcionalidade {i % 300}', f'Cenário {i}', 'ok', 'Passed', ''])
+    wb.save(caminho)
+
+def gerar_novos(quantidade):
+    return pd.DataFrame({
+        col: [f'{col} {i}' for i in range(quantidade)] for col in COLUNAS_DESTINO
+    }).assign(Data='02/01/2025', Status='Failed')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=500000)
+    parser.add_argument('--novas', type=int, default=500)
+    parser.add_argument('--openpyxl', action='store_true', help='Também mede o caminho openpyxl')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'diario.xlsx')
+        inicio = time.perf_counter()
+        gerar_diario(caminho, args.linhas)
+        print(f"Diário gerado: {args.linhas} linhas, {os.path.getsize(caminho) / 1e6:.1f} MB "
+              f"({time.perf_counter() - inicio:.1f}s)")
+
+        with open(caminho, 'rb') as arquivo:
+            dados = arquivo.read()
+        novos = gerar_novos(args.novas)
+
+        inicio = time.perf_counter()
+        anexador = AnexadorDiario(dados, 'B2C')
+        linhas = dataframe_to_rows(novos.reindex(columns=anexador.cabecalho), index=False, header=False)
+        saida = anexador.anexar(linhas, cores_status=CORES_STATUS_RGB)
+        print(f"Streaming: {time.perf_counter() - inicio:.2f}s, saída {len(saida.getvalue()) / 1e6:.1f} MB")
+
+        if args.openpyxl:
+            inicio = time.perf_counter()
+            saida, _ = anexar_com_openpyxl(como_arquivo_enviado(dados), novos)
+            print(f"openpyxl:  {time.perf_counter() - inicio:.2f}s, saída {len(saida.getvalue()) / 1e6:.1f} MB")
+
+if __name__ == '__main__':
+    main()
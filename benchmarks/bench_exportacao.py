@@ -0,0 +1,93 @@
+"""
+Benchmark da exportação das CHGs filtradas em XLSX (exportacao_xlsx).
+
+Exporta N CHGs no formato de processar_dados e compara:
+  - gerar_xlsx, que escreve o zip em streaming e entrega o arquivo em blocos;
+  - openpyxl em modo write-only, que monta o arquivo em disco/memória antes de entregar.
+
+Para cada um mede o tempo total, o tempo até o primeiro bloco (quando o download
+começa) e o pico de memória alocada pelo Python (tracemalloc, medido em uma segunda
+execução para não distorcer os tempos). O arquivo gerado é relido com pd.read_excel
+para conferir os valores.
+
+Uso:
+    python benchmarks/bench_exportacao.py --linhas 100000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from exportacao_xlsx import abas_chgs, gerar_xlsx
+
+def gerar_chgs(quantidade):
+    inicio = datetime(2025, 1, 1, 18, 0)
+    datas = [inicio + timedelta(minutes=i % 600) for i in range(quantidade)]
+    return pd.DataFrame({
+        'Número': [f'CHG{i:07d}' for i in range(quantidade)],
+        'Descrição resumida': [f'Mudança {i}' for i in range(quantidade)],
+        'Status': ['Agendado' if i % 4 else 'Em Execução' for i in range(quantidade)],
+        'Tipo de Indisponibilidade': ['Sem indisponibilidade' if i % 3 else 'Total' for i in range(quantidade)],
+        'Data de início planejada': pd.to_datetime(datas),
+        'Data de término planejada': pd.to_datetime(datas) + pd.Timedelta(hours=2),
+        'IC Impactado': [f'IC {i % 200}' for i in range(quantidade)],
+        'Grupo de atribuição': [f'Grupo {i % 40}' for i in range(quantidade)],
+        'Observação (Time Mudanças)': ['' if i % 5 else f'obs {i}' for i in range(quantidade)],
+        'Enviar Keep': ['Sim'] * quantidade,
+    })
+
+def exportar_streaming(df):
+    return gerar_xlsx(abas_chgs(df))
+
+def exportar_openpyxl(df):
+    (nome, cabecalho, linhas), = abas_chgs(df)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(nome)
+    ws.append(cabecalho)
+    for valores in linhas:
+        ws.append(list(valores))
+    saida = io.BytesIO()
+    wb.save(saida)
+    # O download só pode começar depois de salvar o arquivo inteiro
+    yield saida.getvalue()
+
+def medir(funcao, df):
+    inicio = time.perf_counter()
+    blocos = []
+    for bloco in funcao(df):
+        if not blocos:
+            primeiro_bloco = time.perf_counter()
+        blocos.append(bloco)
+    duracao = time.perf_counter() - inicio
+    # Na medição de memória os blocos são descartados, como se fossem enviados ao navegador
+    tracemalloc.start()
+    for bloco in funcao(df):
+        pass
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return b"".join(blocos), duracao, primeiro_bloco - inicio, pico
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=100000)
+    args = parser.parse_args()
+
+    df = gerar_chgs(args.linhas)
+    resultados = {}
+    for rotulo, funcao in (("gerar_xlsx (streaming)", exportar_streaming), ("openpyxl write-only", exportar_openpyxl)):
+        dados, duracao, primeiro, pico = medir(funcao, df)
+        resultados[rotulo] = pd.read_excel(io.BytesIO(dados))
+        print(f"{rotulo:24s} {duracao:6.2f}s, primeiro bloco em {primeiro * 1000:7.1f} ms, "
+              f"pico {pico / 1e6:6.1f} MB, {len(dados) / 1e6:.1f} MB")
+    pd.testing.assert_frame_equal(*resultados.values())
+
+if __name__ == '__main__':
+    main()
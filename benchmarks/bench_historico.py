@@ -0,0 +1,97 @@
+"""
+Benchmark do histórico de CHGs (historico_chgs).
+
+Simula um ano de planilhas diárias: cada planilha traz as CHGs de 3 dias antes a
+10 dias depois da data (--por-dia CHGs por dia), como a planilha real, em que a
+mesma CHG aparece em vários dias e muda de status. Mede:
+  - o arquivamento de cada planilha (a maior parte das linhas já está no histórico);
+  - as consultas de tendência do período (--dias), que devem ficar abaixo de 1 s.
+
+Uso:
+    python benchmarks/bench_historico.py --dias-simulados 365 --por-dia 300 --dias 90
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from historico_chgs import HistoricoChgs
+
+TIPOS = ['Sem indisponibilidade', 'Sem indisponibilidade', 'Indisponibilidade parcial', 'Indisponibilidade total']
+
+def planilha_do_dia(dia, primeiro_dia, por_dia):
+    linhas = []
+    for deslocamento in range(-3, 11):
+        data_chg = dia + timedelta(days=deslocamento)
+        indice_dia = (data_chg - primeiro_dia).days
+        for i in range(por_dia):
+            numero = indice_dia * por_dia + i
+            inicio = datetime.combine(data_chg, datetime.min.time()) + timedelta(hours=18, minutes=i % 360)
+            linhas.append({
+                'Número': f'CHG{numero:08d}',
+                'Descrição resumida': f'Mudança {numero}',
+                # O status muda conforme a data da CHG se aproxima e passa
+                'Status': 'Finalizada' if deslocamento < 0 else 'Agendado' if deslocamento > 1 else 'Implementar',
+                'Tipo de Indisponibilidade': TIPOS[numero % len(TIPOS)],
+                'Data de início planejada': inicio,
+                'Data de término planejada': inicio + timedelta(hours=2),
+                'IC Impactado': f'IC {numero % 250}',
+                'Grupo de atribuição': f'Grupo {numero % 40}',
+                'Observação (Time Mudanças)': '',
+                'Enviar Keep': 'Sim' if numero % 2 else 'Não',
+            })
+    return pd.DataFrame(linhas)
+
+def medir(funcao, *args, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, sorted(tempos)[len(tempos) // 2]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dias-simulados', type=int, default=365)
+    parser.add_argument('--por-dia', type=int, default=300)
+    parser.add_argument('--dias', type=int, default=90, help='Período das consultas')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        historico = HistoricoChgs(pasta)
+        primeiro_dia = date(2025, 1, 1)
+        tempos = []
+        for indice in range(args.dias_simulados):
+            df = planilha_do_dia(primeiro_dia + timedelta(days=indice), primeiro_dia, args.por_dia)
+            inicio = time.perf_counter()
+            historico.arquivar(df, f'{indice:064x}', f'chgs_{indice}.xlsx')
+            tempos.append(time.perf_counter() - inicio)
+        resumo = historico.resumo()
+        print(f"Arquivamento: {args.dias_simulados} planilhas de {len(df)} linhas, "
+              f"mediana {sorted(tempos)[len(tempos) // 2] * 1000:.0f} ms, total {sum(tempos):.1f}s")
+        print(f"Histórico: {resumo['linhas']} linhas em {resumo['particoes']} partições, "
+              f"{os.path.getsize(historico.caminho) / 1e6:.1f} MB")
+
+        fim = date.fromisoformat(resumo['fim']) - timedelta(days=10)
+        inicio = fim - timedelta(days=args.dias - 1)
+        consultas = [
+            ("Indisponibilidade por IC", historico.indisponibilidade_por_ic, (inicio, fim)),
+            ("Indisponibilidade por IC (1 grupo)", historico.indisponibilidade_por_ic, (inicio, fim, 'Grupo 7')),
+            ("CHGs por grupo", historico.chgs_por_grupo, (inicio, fim)),
+            ("CHGs por dia (1 IC)", historico.chgs_por_dia, (inicio, fim, 'IC 42')),
+            ("Busca de CHGs", historico.buscar_chgs, (inicio, fim)),
+            ("ICs distintos", historico.valores_distintos, ('ic', inicio, fim)),
+        ]
+        print(f"Consultas de {args.dias} dias ({inicio:%d/%m/%Y} a {fim:%d/%m/%Y}), mediana de 5:")
+        for rotulo, funcao, parametros in consultas:
+            resultado, duracao = medir(funcao, *parametros)
+            print(f"  {rotulo:36s} {duracao * 1000:7.1f} ms, {len(resultado)} linhas")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark do leitor ODS em streaming (LeitorOds).
+
+Gera a mesma planilha de CHGs (N linhas nas abas "CHGs" e "CHGs II") em ODS, no
+formato gravado pelo LibreOffice (células vazias e linhas vazias repetidas até o
+fim da aba), e em XLSX, e mede a leitura das colunas do relatório (ler_abas_chgs):
+  - ODS com LeitorOds;
+  - XLSX com LeitorXlsx, como referência;
+  - ODS com pd.read_excel(engine="odf"), que monta o DOM inteiro do odfpy. Por ser
+    muito mais lento, é medido com --linhas-odf linhas (0 para não medir).
+
+Uso:
+    python benchmarks/bench_leitor_ods.py --linhas 100000 --linhas-odf 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from arquivo_enviado import ArquivoEnviado
+from chg_processor import COLUNAS_CHGS, ler_abas_chgs
+
+COLUNAS_EXTRAS = ['Solicitante', 'Categoria', 'Risco', 'Impacto', 'Justificativa']
+
+INICIO_CONTENT = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">'
+    '<office:body><office:spreadsheet>'
+)
+FIM_CONTENT = '</office:spreadsheet></office:body></office:document-content>'
+MANIFEST = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">'
+    '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>'
+    '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+    '</manifest:manifest>'
+)
+
+def gerar_linhas(quantidade):
+    inicio = datetime(2025, 1, 1, 18, 0)
+    for i in range(quantidade):
+        data = inicio + timedelta(hours=i % 72)
+        yield ([f'CHG{i:07d}', f'Mudança {i}', 'Agendado', 'Sem indisponibilidade' if i % 3 else 'Total',
+                data, data + timedelta(hours=2), f'IC {i % 200}', f'Grupo {i % 40}',
+                '' if i % 5 else f'obs {i}', 'Sim' if i % 2 else 'Não']
+               + [f'{coluna} {i % 97}' for coluna in COLUNAS_EXTRAS])
+
+def celula_ods(valor):
+    if valor == '':
+        return '<table:table-cell/>'
+    if isinstance(valor, datetime):
+        iso = valor.isoformat()
+        return f'<table:table-cell office:value-type="date" office:date-value="{iso}"><text:p>{iso}</text:p></table:table-cell>'
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(valor)}</text:p></table:table-cell>'
+
+def gerar_ods(caminho, linhas):
+    with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED) as zout:
+        zout.writestr(zipfile.ZipInfo('mimetype'), 'application/vnd.oasis.opendocument.spreadsheet')
+        zout.writestr('META-INF/manifest.xml', MANIFEST)
+        with zout.open('content.xml', 'w') as content:
+            content.write(INICIO_CONTENT.encode())
+            for aba in ('CHGs', 'CHGs II'):
+                content.write(f'<table:table table:name="{aba}">'.encode())
+                cabecalho = ''.join(celula_ods(nome) for nome in COLUNAS_CHGS + COLUNAS_EXTRAS)
+                content.write(f'<table:table-row>{cabecalho}</table:table-row>'.encode())
+                for valores in gerar_linhas(linhas // 2):
+                    celulas = ''.join(celula_ods(valor) for valor in valores)
+                    content.write(f'<table:table-row>{celulas}<table:table-cell table:number-columns-repeated="1009"/>'
+                                  '</table:table-row>'.encode())
+                content.write(b'<table:table-row table:number-rows-repeated="1048000">'
+                              b'<table:table-cell table:number-columns-repeated="1024"/></table:table-row></table:table>')
+            content.write(FIM_CONTENT.encode())
+
+def gerar_xlsx(caminho, linhas):
+    wb = Workbook(write_only=True)
+    for aba in ('CHGs', 'CHGs II'):
+        ws = wb.create_sheet(aba)
+        ws.append(COLUNAS_CHGS + COLUNAS_EXTRAS)
+        for valores in gerar_linhas(linhas // 2):
+            ws.append(valores)
+    wb.save(caminho)
+
+def abas_odf(caminho):
+    with pd.ExcelFile(caminho, engine='odf') as planilha:
+        return planilha.parse('CHGs')[COLUNAS_CHGS], planilha.parse('CHGs II')[COLUNAS_CHGS]
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--linhas-odf', type=int, default=5000, help='Linhas da medição com o engine odf do pandas')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        ods = os.path.join(pasta, 'chgs.ods')
+        xlsx = os.path.join(pasta, 'chgs.xlsx')
+        gerar_ods(ods, args.linhas)
+        gerar_xlsx(xlsx, args.linhas)
+        print(f"Planilhas geradas: {args.linhas} linhas, ODS {os.path.getsize(ods) / 1e6:.1f} MB, "
+              f"XLSX {os.path.getsize(xlsx) / 1e6:.1f} MB")
+
+        abas_ods, duracao_ods = medir(ler_abas_chgs, ArquivoEnviado(ods))
+        abas_xlsx, duracao_xlsx = medir(ler_abas_chgs, ArquivoEnviado(xlsx))
+        for df_ods, df_xlsx in zip(abas_ods, abas_xlsx):
+            pd.testing.assert_frame_equal(df_ods, df_xlsx)
+        print(f"LeitorOds (ODS):   {duracao_ods:.2f}s, {sum(map(len, abas_ods))} linhas")
+        print(f"LeitorXlsx (XLSX): {duracao_xlsx:.2f}s")
+
+        if args.linhas_odf:
+            pequeno = os.path.join(pasta, 'chgs_pequeno.ods')
+            gerar_ods(pequeno, args.linhas_odf)
+            abas_pandas, duracao_pandas = medir(abas_odf, pequeno)
+            abas_streaming, duracao_streaming = medir(ler_abas_chgs, ArquivoEnviado(pequeno))
+            for df_pandas, df_streaming in zip(abas_pandas, abas_streaming):
+                pd.testing.assert_frame_equal(df_pandas, df_streaming)
+            print(f"{args.linhas_odf} linhas: pd.read_excel(engine='odf') {duracao_pandas:.2f}s, "
+                  f"LeitorOds {duracao_streaming:.2f}s ({duracao_pandas / duracao_streaming:.0f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark do leitor XLSX em streaming (LeitorXlsx) contra pd.read_excel (openpyxl).
+
+Gera uma planilha de CHGs com N linhas nas abas "CHGs" e "CHGs II", com colunas
+extras além das usadas no relatório (como nas extrações reais), e mede o tempo e o
+pico de memória residente (RSS, amostrado em /proc; apenas Linux) de:
+  - leitura das colunas do relatório (ler_abas_chgs) contra pd.read_excel das abas
+    inteiras, como era feito em processar_dados;
+  - leitura de todas as colunas de uma aba;
+  - leitura como texto das colunas do caderno de testes (preparar_caderno).
+Os resultados dos dois leitores são comparados com assert_frame_equal.
+
+Uso:
+    python benchmarks/bench_leitor_xlsx.py --linhas 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from arquivo_enviado import ArquivoEnviado
+from chg_processor import COLUNAS_CHGS, ler_abas_chgs
+from leitor_xlsx import LeitorXlsx
+
+COLUNAS_EXTRAS = ['Solicitante', 'Categoria', 'Risco', 'Impacto', 'Justificativa', 'Plano de rollback',
+                  'Aprovador', 'Localidade', 'Fornecedor', 'Comentários']
+
+def gerar_planilha(caminho, linhas):
+    wb = Workbook(write_only=True)
+    inicio = datetime(2025, 1, 1, 18, 0)
+    por_aba = linhas // 2
+    for aba in ('CHGs', 'CHGs II'):
+        ws = wb.create_sheet(aba)
+        ws.append(COLUNAS_CHGS + COLUNAS_EXTRAS)
+        for i in range(por_aba):
+            data = inicio + timedelta(hours=i % 72)
+            ws.append([f'CHG{i:07d}', f'Mudança {i}', 'Agendado', 'Sem indisponibilidade' if i % 3 else 'Total',
+                       data, data + timedelta(hours=2), f'IC {i % 200}', f'Grupo {i % 40}',
+                       '' if i % 5 else f'obs {i}', 'Sim' if i % 2 else 'Não']
+                      + [f'{coluna} {i % 97}' for coluna in COLUNAS_EXTRAS])
+    wb.save(caminho)
+
+def memoria_residente():
+    with open('/proc/self/statm') as arquivo:
+        return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def medir(funcao, *args):
+    # O RSS é amostrado em paralelo: inclui a memória alocada fora do Python (numpy, pyarrow)
+    base = memoria_residente()
+    pico = [base]
+    executando = threading.Event()
+    executando.set()
+
+    def amostrar():
+        while executando.is_set():
+            pico[0] = max(pico[0], memoria_residente())
+            time.sleep(0.002)
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    duracao = time.perf_counter() - inicio
+    executando.clear()
+    amostrador.join()
+    return resultado, duracao, (max(pico[0], memoria_residente()) - base) / 1e6
+
+def abas_openpyxl(caminho):
+    with pd.ExcelFile(caminho, engine='openpyxl') as planilha:
+        return planilha.parse('CHGs'), planilha.parse('CHGs II')
+
+def aba_inteira_streaming(caminho):
+    with LeitorXlsx(caminho) as leitor:
+        return leitor.ler_aba('CHGs')
+
+def colunas_texto_streaming(caminho, colunas):
+    with LeitorXlsx(caminho) as leitor:
+        return leitor.ler_aba('CHGs', colunas, como_texto=True)
+
+def comparar(nome, openpyxl, streaming):
+    (_, duracao_o, pico_o), (_, duracao_s, pico_s) = openpyxl, streaming
+    print(f"{nome}:")
+    print(f"  openpyxl:  {duracao_o:.2f}s, pico {pico_o:.0f} MB")
+    print(f"  streaming: {duracao_s:.2f}s, pico {pico_s:.0f} MB ({duracao_o / duracao_s:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'chgs.xlsx')
+        inicio = time.perf_counter()
+        gerar_planilha(caminho, args.linhas)
+        print(f"Planilha gerada: {args.linhas} linhas, {os.path.getsize(caminho) / 1e6:.1f} MB "
+              f"({time.perf_counter() - inicio:.1f}s)")
+
+        openpyxl = medir(abas_openpyxl, caminho)
+        streaming = medir(ler_abas_chgs, ArquivoEnviado(caminho))
+        for df_openpyxl, df_streaming in zip(openpyxl[0], streaming[0]):
+            pd.testing.assert_frame_equal(df_openpyxl[COLUNAS_CHGS], df_streaming)
+        comparar("Abas CHGs (colunas do relatório)", openpyxl, streaming)
+
+        openpyxl = medir(pd.read_excel, caminho, 'CHGs')
+        streaming = medir(aba_inteira_streaming, caminho)
+        pd.testing.assert_frame_equal(openpyxl[0], streaming[0])
+        comparar("Aba CHGs (todas as colunas)", openpyxl, streaming)
+
+        colunas = ['Número', 'Status', 'IC Impactado', 'Observação (Time Mudanças)']
+        openpyxl = medir(lambda: pd.read_excel(caminho, sheet_name='CHGs', dtype=str, usecols=colunas))
+        streaming = medir(colunas_texto_streaming, caminho, colunas)
+        pd.testing.assert_frame_equal(openpyxl[0], streaming[0])
+        comparar("Aba CHGs (4 colunas como texto)", openpyxl, streaming)
+
+if __name__ == '__main__':
+    main()
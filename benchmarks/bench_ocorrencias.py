@@ -0,0 +1,65 @@
+"""
+Benchmark da atualização da planilha de ocorrências (ocorrencias_processor).
+
+Gera uma planilha base e duas extrações com N linhas e compara a leitura
+sequencial com a leitura em paralelo (extrações em processos auxiliares
+enquanto a planilha base é carregada no processo principal), tanto na etapa
+de carregamento quanto de ponta a ponta.
+
+Uso:
+    python benchmarks/bench_ocorrencias.py --linhas 50000 --base 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+from ocorrencias_processor import COLUNAS_OCORRENCIAS, atualizar_ocorrencias, carregar_planilhas
+
+def linha(i):
+    return [f'INC{i:07d}', '', f'2025-04-{i % 28 + 1:02d} 10:00:00', str(i % 5 + 1), 'Em andamento',
+            f'Descrição resumida {i}', 'Descrição ' * 10, 'usuario', 'analista', 'App', 'IC', '', '',
+            'Aberto', '', '', '', '', '', '', '', '', i % 100]
+
+def gerar_planilha(caminho, abas, linhas):
+    wb = Workbook(write_only=True)
+    for aba in abas:
+        ws = wb.create_sheet(aba)
+        ws.append(COLUNAS_OCORRENCIAS)
+        for i in range(linhas):
+            ws.append(linha(i))
+    wb.save(caminho)
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=50000, help='Linhas de cada extração')
+    parser.add_argument('--base', type=int, default=20000, help='Linhas de cada aba da planilha base')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        base = gerar_planilha(os.path.join(pasta, 'base.xlsx'), ['Funcionais', 'Criticos NOW'], args.base)
+        funcionais = gerar_planilha(os.path.join(pasta, 'funcionais.xlsx'), ['extração funcionais'], args.linhas)
+        criticos = gerar_planilha(os.path.join(pasta, 'criticos.xlsx'), ['extração criticos'], args.linhas)
+        print(f"Base {len(base) / 1e6:.1f} MB, extrações {len(funcionais) / 1e6:.1f} MB + "
+              f"{len(criticos) / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+
+        for nome, paralelo in (("sequencial", False), ("paralelo", True)):
+            inicio = time.perf_counter()
+            carregar_planilhas(base, funcionais, criticos, paralelo)
+            carga = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            _, registros, _ = atualizar_ocorrencias(BytesIO(base), BytesIO(funcionais), BytesIO(criticos), paralelo)
+            total = time.perf_counter() - inicio
+            print(f"{nome:>10}: carregamento {carga:.2f}s, ponta a ponta {total:.2f}s, {registros} registros")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark do cache de etapas dos pipelines (pipeline.py).
+
+Processa a mesma planilha de CHGs (--linhas linhas) e o mesmo caderno de testes em
+quatro situações e mede o tempo de cada uma:
+  - frio: nenhuma etapa guardada;
+  - disco: saídas guardadas apenas em disco (como em outro processo ou após reiniciar);
+  - memória: saídas também no cache em memória do processo;
+  - outra configuração: outra janela do Keep (CHGs) ou outra data (caderno), em que só as
+    etapas posteriores à configuração alterada são executadas.
+
+Uso:
+    python benchmarks/bench_pipeline.py --linhas 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+import chg_processor
+from bench_api import gerar_planilha_chgs
+from bench_caderno import gerar_caderno
+from cache_compartilhado import hash_conteudo, obter_cache
+from historico_chgs import HistoricoChgs
+from test_processor import COLUNAS_DESTINO, PIPELINE_CADERNO, executar_caderno
+from arquivo_enviado import ArquivoEnviado
+
+def medir(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        # Saídas das etapas e histórico de CHGs em uma pasta temporária
+        chg_processor.PIPELINE_CHGS.diretorio = PIPELINE_CADERNO.diretorio = pasta
+        historico = HistoricoChgs(pasta)
+        chg_processor.obter_historico = lambda: historico
+
+        planilha = os.path.join(pasta, 'chgs.xlsx')
+        gerar_planilha_chgs(planilha, args.linhas)
+        caderno = os.path.join(pasta, 'caderno.xlsx')
+        gerar_caderno(caderno, args.linhas)
+
+        print(f"Planilha de CHGs com {args.linhas} linhas (processar_dados):")
+        situacoes = [
+            ("frio", {}, False),
+            ("disco", {}, True),
+            ("memória", {}, False),
+            ("outra janela (20h às 2h)", {"hora_inicio": 20, "hora_fim": 2}, False),
+        ]
+        for rotulo, janela, limpar_memoria in situacoes:
+            if limpar_memoria:
+                obter_cache().limpar()
+            df, duracao = medir(chg_processor.processar_dados, planilha, notificar_erro=print, **janela)
+            print(f"  {rotulo:28s} {duracao * 1000:8.0f} ms, {len(df)} CHGs no Keep")
+
+        print(f"Caderno de testes com {args.linhas} linhas (PIPELINE_CADERNO):")
+        arquivo = ArquivoEnviado(caderno)
+        hash_caderno = hash_conteudo(arquivo.dados)
+        situacoes = [
+            ("frio", "01/01/2025", False),
+            ("disco", "01/01/2025", True),
+            ("memória", "01/01/2025", False),
+            ("outra data", "02/01/2025", False),
+        ]
+        for rotulo, data, limpar_memoria in situacoes:
+            if limpar_memoria:
+                obter_cache().limpar()
+            df, duracao = medir(executar_caderno, arquivo, hash_caderno, data, COLUNAS_DESTINO)
+            print(f"  {rotulo:28s} {duracao * 1000:8.0f} ms, {len(df)} registros válidos")
+
+if __name__ == '__main__':
+    main()
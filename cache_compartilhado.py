@@ -0,0 +1,144 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+from logger import registrar_log
+
+# Memória máxima ocupada pelos itens do cache (estimada), somando todas as sessões
+ORCAMENTO_CACHE_BYTES = 512 * 1024 * 1024
+
+def hash_conteudo(*conteudos):
+    """Calcula o hash SHA-256 de um ou mais conteúdos (bytes ou texto), usado como chave de cache e de tarefas."""
+    h = hashlib.sha256()
+    for conteudo in conteudos:
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode("utf-8")
+        h.update(len(conteudo).to_bytes(8, "little"))
+        h.update(conteudo)
+    return h.hexdigest()
+
+def estimar_tamanho(valor):
+    """
+    Estima a memória ocupada por um valor do cache.
+    DataFrames usam memory_usage(deep=True); listas, tuplas e dicionários são percorridos.
+
+    Args:
+        valor: Valor a ser guardado no cache
+
+    Returns:
+        int: Tamanho estimado em bytes
+    """
+    if hasattr(valor, "memory_usage"):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(estimar_tamanho(item) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_tamanho(k) + estimar_tamanho(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+class CacheCompartilhado:
+    """
+    Cache LRU dos arquivos já interpretados, compartilhado por todas as sessões do processo.
+
+    As chaves são tuplas (tipo, hash do conteúdo, opções) e os valores não devem ser
+    alterados por quem os recebe (os DataFrames do pandas são copiados ao serem modificados).
+    Quando o orçamento de memória é ultrapassado, os itens usados há mais tempo são descartados.
+    """
+
+    def __init__(self, orcamento_bytes=ORCAMENTO_CACHE_BYTES):
+        self.orcamento_bytes = orcamento_bytes
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._acertos = 0
+        self._falhas = 0
+        self._descartes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, padrao=None):
+        """Retorna o valor guardado com a chave (ou padrao), contabilizando acerto ou falha."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self._falhas += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self._acertos += 1
+            return item[0]
+
+    def contem(self, chave):
+        """Indica se há um valor guardado com a chave, sem contabilizar acerto ou falha nem marcar o uso."""
+        with self._lock:
+            return chave in self._itens
+
+    def guardar(self, chave, valor, tamanho=None):
+        """
+        Guarda um valor no cache, descartando os itens menos usados se necessário.
+        Valores maiores que o orçamento inteiro não são guardados.
+
+        Args:
+            chave: Chave do item
+            valor: Valor a guardar
+            tamanho: Tamanho em bytes (padrão: estimar_tamanho(valor))
+
+        Returns:
+            bool: True se o valor foi guardado
+        """
+        tamanho = estimar_tamanho(valor) if tamanho is None else tamanho
+        if tamanho > self.orcamento_bytes:
+            registrar_log(f"Item de {tamanho / 1e6:.1f} MB maior que o orçamento do cache, não guardado", "aviso")
+            return False
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.orcamento_bytes:
+                _, (_, tamanho_descartado) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_descartado
+                self._descartes += 1
+        return True
+
+    def obter_ou_calcular(self, chave, funcao, *args, **kwargs):
+        """Retorna o valor guardado com a chave ou calcula funcao(*args, **kwargs) e o guarda."""
+        ausente = object()
+        valor = self.obter(chave, ausente)
+        if valor is ausente:
+            valor = funcao(*args, **kwargs)
+            self.guardar(chave, valor)
+        return valor
+
+    def limpar(self):
+        """Remove todos os itens, mantendo os contadores."""
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        """
+        Retorna os contadores do cache.
+
+        Returns:
+            dict: acertos, falhas, descartes, itens, bytes e orcamento_bytes
+        """
+        with self._lock:
+            return {
+                "acertos": self._acertos,
+                "falhas": self._falhas,
+                "descartes": self._descartes,
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "orcamento_bytes": self.orcamento_bytes
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def obter_cache():
+    """Retorna o cache compartilhado do processo, criando-o na primeira chamada."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheCompartilhado()
+        return _cache
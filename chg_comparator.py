@@ -2,6 +2,8 @@ import pandas as pd
 import tabula
 import re
 from logger import registrar_log
+from leitor_xlsx import abrir_planilha
+from perfilamento import perfilado
 
 def extrair_tabelas_pdf(arquivo_pdf):
     """Extrai tabelas de PDF usando tabula-py"""
@@ -43,13 +45,15 @@ def limpar_numero_chg(numero):
         return None
     return re.sub(r'\D', '', str(numero)).strip()
 
+@perfilado("comparar_chgs")
 def comparar_chgs(arquivo_principal, arquivo_pdf):
     """
-    Compara CHGs entre arquivo principal (XLSX) e PDF do email
+    Compara CHGs entre arquivo principal (XLSX ou ODS) e PDF do email
     """
     try:
         # Processar arquivo principal
-        df_principal = pd.read_excel(arquivo_principal)
+        with abrir_planilha(arquivo_principal) as leitor:
+            df_principal = leitor.ler_aba()
         df_principal['Número'] = df_principal['Número'].apply(limpar_numero_chg)
         
         # Extrair dados do PDF
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import streamlit as st
+import traceback
+from logger import registrar_log
+from cache_compartilhado import hash_conteudo
+from arquivo_enviado import como_arquivo_enviado
+from datetime import datetime, timedelta
+from pytz import timezone
+from templates_relatorio import compilar, registrar_filtro
+from perfilamento import perfilado
+from historico_chgs import obter_historico, tem_indisponibilidade
+from envios_keep import calcular_delta
+from pipeline import ErroEtapa, Etapa, Pipeline
+
+# ========== Funções Principais ==========
+# Colunas das abas CHGs usadas no relatório do Keep
+COLUNAS_CHGS = ['Número', 'Descrição resumida', 'Status', 'Tipo de Indisponibilidade',
+                'Data de início planejada', 'Data de término planejada', 'IC Impactado',
+                'Grupo de atribuição', 'Observação (Time Mudanças)', 'Enviar Keep']
+
+# Janela do Keep: CHGs de hoje a partir desta hora e de amanhã antes desta hora
+HORA_INICIO_KEEP = 17
+HORA_FIM_KEEP = 4
+
+def map_status_emoji(status):
+    emoji_map = {
+        'Novo': '🆕', 'Agendado': '🕔', 'Implementar': '💻',
+        'Em Execução': '⚙️', 'Revisão': '⚠️', 'Cancelada': '❌',
+        'Finalizada': '✅', 'CHG com Indisponibilidade': '📵', 'Avaliar': '⚠️'
+    }
+    return emoji_map.get(status, status)
+
+def ler_abas_chgs(arquivo):
+    """
+    Lê as abas "CHGs" e "CHGs II" do arquivo. Uma aba que não puder ser lida vira um DataFrame vazio.
+    
+    Args:
+        arquivo: ArquivoEnviado com a planilha (XLSX ou ODS) das CHGs
+        
+    Returns:
+        tuple: (DataFrame da aba CHGs, DataFrame da aba CHGs II)
+    """
+    # Importado aqui: o leitor depende do openpyxl, que a página inicial não precisa carregar
+    from leitor_xlsx import abrir_planilha
+    
+    # O arquivo é aberto uma única vez para as duas abas, e de cada aba são lidas
+    # apenas as colunas usadas no relatório
+    try:
+        leitor = abrir_planilha(arquivo.abrir())
+    except Exception as e:
+        registrar_log(f"Erro na leitura do arquivo: {str(e)}", "erro")
+        return pd.DataFrame(), pd.DataFrame()
+    
+    abas = []
+    with leitor:
+        for nome_aba in ('CHGs', 'CHGs II'):
+            try:
+                cabecalho = leitor.cabecalho(nome_aba)
+                # Sem nenhuma coluna conhecida a aba é lida inteira, e a falta das colunas
+                # é informada por processar_dados
+                colunas = [col for col in COLUNAS_CHGS if col in cabecalho] or None
+                df = leitor.ler_aba(nome_aba, colunas)
+                registrar_log(f"Leitura da aba {nome_aba} concluída: {len(df)} linhas", "info")
+            except Exception as e:
+                registrar_log(f"Erro na leitura da aba {nome_aba}: {str(e)}", "erro")
+                df = pd.DataFrame()
+            abas.append(df)
+    
+    df1, df2 = abas
+    return df1, df2
+
+def validar_chgs(abas):
+    """Etapa do pipeline: junta as abas e mantém apenas as colunas do relatório, verificando se todas existem."""
+    df1, df2 = abas
+    if df1.empty and df2.empty:
+        registrar_log("Ambas abas estão vazias ou não foram lidas corretamente", "erro")
+        raise ErroEtapa("Não foi possível ler dados do arquivo. Verifique se o formato está correto.")
+        
+    df = pd.concat([df1, df2], ignore_index=True)
+    registrar_log(f"Total de linhas após concatenação: {len(df)}", "info")
+    
+    colunas = COLUNAS_CHGS
+    
+    # Verifica se todas as colunas existem
+    colunas_faltantes = [col for col in colunas if col not in df.columns]
+    if colunas_faltantes:
+        msg_erro = f"Colunas faltantes no arquivo: {', '.join(colunas_faltantes)}"
+        registrar_log(msg_erro, "erro")
+        raise ErroEtapa(msg_erro)
+    
+    return df[colunas].copy()
+
+def normalizar_chgs(df):
+    """
+    Etapa do pipeline: converte as datas de início e término (descartando as linhas com datas
+    inválidas) e cria as colunas auxiliares usadas no filtro da janela do Keep.
+    """
+    df = df.copy()
+    
+    # Registrar informações sobre os tipos de dados na coluna 'Data de início planejada'
+    registrar_log(f"Tipo de dados na coluna 'Data de início planejada': {df['Data de início planejada'].dtype}", "info")
+    
+    # Verifica se a coluna já contém strings
+    if pd.api.types.is_string_dtype(df['Data de início planejada']):
+        registrar_log("A coluna 'Data de início planejada' já contém strings", "info")
+        # Converter string para datetime primeiro
+        df['Data de início planejada'] = pd.to_datetime(df['Data de início planejada'], errors='coerce')
+        registrar_log("Conversão de strings para datetime concluída", "info")
+    else:
+        # Tenta converter para datetime e depois para string
+        df['Data de início planejada'] = pd.to_datetime(df['Data de início planejada'], errors='coerce')
+        registrar_log("Conversão de 'Data de início planejada' para datetime concluída", "info")
+    
+    # Verificar se há valores nulos após a conversão
+    if df['Data de início planejada'].isna().any():
+        num_nulos = df['Data de início planejada'].isna().sum()
+        registrar_log(f"Atenção: {num_nulos} valores não puderam ser convertidos para data", "aviso")
+        # Remover linhas com datas nulas para evitar problemas
+        df = df.dropna(subset=['Data de início planejada'])
+        registrar_log(f"Linhas com datas nulas removidas. Restantes: {len(df)}", "info")
+    
+    # Verificar se ainda existem linhas após a filtragem
+    if df.empty:
+        registrar_log("Todas as linhas foram removidas durante a limpeza de datas", "erro")
+        raise ErroEtapa("Não foi possível processar o arquivo: todas as datas são inválidas.")
+    
+    # Guarda a coluna original para exibição
+    df['Data de início original'] = df['Data de início planejada'].copy()
+    
+    # Cria uma coluna só com a data em formato string (YYYY-MM-DD)
+    df['data_inicio_str'] = df['Data de início planejada'].dt.strftime('%Y-%m-%d')
+    registrar_log(f"Criação da coluna 'data_inicio_str' concluída", "info")
+    
+    # Cria uma coluna só com a hora em formato numérico (24h)
+    df['hora_inicio'] = df['Data de início planejada'].dt.hour
+    registrar_log(f"Criação da coluna 'hora_inicio' concluída", "info")
+    
+    # Registrar amostra de algumas linhas para debug
+    amostra = df[['Data de início planejada', 'data_inicio_str', 'hora_inicio']].head(3)
+    registrar_log(f"Amostra de dados após conversão: {amostra.to_dict()}", "info")
+    
+    # Converter coluna Data de término planejada
+    df['Data de término planejada'] = pd.to_datetime(df['Data de término planejada'], errors='coerce')
+    
+    # Verificar se há valores nulos após a conversão da data de término
+    if df['Data de término planejada'].isna().any():
+        num_nulos = df['Data de término planejada'].isna().sum()
+        registrar_log(f"Atenção: {num_nulos} valores de data de término não puderam ser convertidos", "aviso")
+        # Remover linhas com datas de término nulas
+        df = df.dropna(subset=['Data de término planejada'])
+        registrar_log(f"Linhas com datas de término nulas removidas. Restantes: {len(df)}", "info")
+        
+    # Verificar se ainda existem linhas após a filtragem
+    if df.empty:
+        registrar_log("Todas as linhas foram removidas durante a limpeza de datas de término", "erro")
+        raise ErroEtapa("Não foi possível processar o arquivo: todas as datas de término são inválidas.")
+    return df
+
+def arquivar_chgs(df, hash_planilha, nome):
+    """
+    Etapa do pipeline (apenas efeito): todas as CHGs da planilha (não só as do Keep de hoje)
+    vão para o histórico; uma falha no histórico não impede o relatório.
+    """
+    try:
+        obter_historico().arquivar(df, hash_planilha, nome)
+    except Exception as e:
+        registrar_log(f"Não foi possível arquivar as CHGs no histórico: {str(e)}", "aviso")
+        registrar_log(f"Detalhes do erro: {traceback.format_exc()}", "aviso")
+
+def filtrar_chgs(df, hoje, amanha, hora_inicio, hora_fim):
+    """
+    Etapa do pipeline: mantém as CHGs de hoje a partir de hora_inicio e de amanhã antes de
+    hora_fim marcadas para envio no Keep.
+    """
+    # Filtro para hoje: data == hoje E hora >= hora_inicio
+    hoje_filtro = (df['data_inicio_str'] == hoje) & (df['hora_inicio'] >= hora_inicio)
+    registrar_log(f"Filtro para hoje criado: {hoje_filtro.sum()} linhas", "info")
+    
+    # Filtro para amanhã: data == amanhã E hora < hora_fim
+    amanha_filtro = (df['data_inicio_str'] == amanha) & (df['hora_inicio'] < hora_fim)
+    registrar_log(f"Filtro para amanhã criado: {amanha_filtro.sum()} linhas", "info")
+    
+    # Filtro para Enviar Keep
+    if 'Enviar Keep' in df.columns:
+        enviar_keep = df['Enviar Keep'].astype(str)
+        keep_filtro = enviar_keep.str.strip().str.lower() == 'sim'
+        registrar_log(f"Filtro para 'Enviar Keep' criado: {keep_filtro.sum()} linhas", "info")
+    else:
+        registrar_log("Coluna 'Enviar Keep' não encontrada, considerando todas as linhas", "aviso")
+        enviar_keep = None
+        keep_filtro = pd.Series([True] * len(df))
+    
+    # Filtragem final; as colunas ajustadas são atribuídas na cópia filtrada, pois o
+    # DataFrame recebido pode ter vindo do cache do pipeline
+    filtro = (hoje_filtro | amanha_filtro) & keep_filtro
+    ajustes = {'Observação (Time Mudanças)': df['Observação (Time Mudanças)'][filtro].fillna('')}
+    if enviar_keep is not None:
+        ajustes['Enviar Keep'] = enviar_keep[filtro]
+    df_filtrado = df[filtro].assign(**ajustes)
+    
+    # Remover colunas auxiliares que não serão mostradas no relatório
+    if 'data_inicio_str' in df_filtrado.columns:
+        df_filtrado = df_filtrado.drop(columns=['data_inicio_str'])
+    if 'hora_inicio' in df_filtrado.columns:
+        df_filtrado = df_filtrado.drop(columns=['hora_inicio'])
+    
+    registrar_log(f"CHGs encontradas (hoje a partir das {hora_inicio:02d}:00 e amanhã até {hora_fim:02d}:00): "
+                  f"{len(df_filtrado)}", "info")
+    return df_filtrado
+
+# Leitura e normalização ficam guardadas por conteúdo da planilha: no dia seguinte (ou com
+# outra janela de horário) a mesma planilha só passa de novo pelo arquivamento e pelo filtro
+PIPELINE_CHGS = Pipeline("chgs", [
+    Etapa("ler", ler_abas_chgs, progresso=(0.1, "Lendo abas CHGs e CHGs II"), erro="Erro crítico"),
+    Etapa("validar", validar_chgs, persistir=False, erro="Erro crítico"),
+    Etapa("normalizar", normalizar_chgs, progresso=(0.6, "Convertendo datas"), erro="Erro na conversão de datas"),
+    Etapa("arquivar", arquivar_chgs, config=("hash_planilha", "nome"), efeito=True,
+          progresso=(0.7, "Arquivando CHGs no histórico")),
+    Etapa("filtrar", filtrar_chgs, config=("hoje", "amanha", "hora_inicio", "hora_fim"), persistir=False,
+          progresso=(0.8, "Filtrando CHGs de hoje/amanhã"), erro="Erro na filtragem de dados"),
+])
+
+@perfilado("processar_dados")
+def processar_dados(uploaded_file, progresso=None, notificar_erro=None, hora_inicio=HORA_INICIO_KEEP,
+                    hora_fim=HORA_FIM_KEEP, relancar_erros=False):
+    """
+    Lê as abas "CHGs" e "CHGs II" e retorna as CHGs de hoje (a partir das 17h) e de amanhã (até 4h)
+    marcadas para envio no Keep.
+    Todas as CHGs da planilha com datas válidas são arquivadas no histórico (historico_chgs).
+    As etapas de leitura e normalização são reaproveitadas do cache do pipeline (PIPELINE_CHGS)
+    quando a mesma planilha já foi processada.
+    
+    Args:
+        uploaded_file: Planilha XLSX ou ODS com as CHGs (arquivo enviado, ArquivoEnviado ou caminho)
+        progresso: Função progresso(fração, etapa) chamada a cada etapa (opcional)
+        notificar_erro: Função que exibe as mensagens de erro (padrão: st.error)
+        hora_inicio: Hora a partir da qual as CHGs de hoje entram no Keep
+        hora_fim: Hora até a qual (exclusive) as CHGs de amanhã entram no Keep
+        relancar_erros: Se True, os erros são relançados em vez de notificados (para quem
+            precisa saber a etapa que falhou, como a API)
+        
+    Returns:
+        DataFrame: CHGs filtradas (vazio em caso de erro)
+    
+    Raises:
+        ErroEtapa: Falha em uma etapa do pipeline (apenas com relancar_erros)
+    """
+    progresso = progresso or (lambda fracao, etapa: None)
+    notificar_erro = notificar_erro or st.error
+    try:
+        registrar_log("Iniciando processamento do arquivo", "info")
+        
+        # Configurar timezone de Brasília
+        tz_brasilia = timezone('America/Sao_Paulo')
+        
+        # Obter data e hora atual
+        agora = datetime.now(tz_brasilia)
+        hoje = agora.date()
+        amanha = hoje + timedelta(days=1)
+        
+        # Criar strings de datas para comparação
+        hoje_str = hoje.strftime('%Y-%m-%d')
+        amanha_str = amanha.strftime('%Y-%m-%d')
+        
+        registrar_log(f"Data de hoje: {hoje_str}, Data de amanhã: {amanha_str}", "info")
+        
+        arquivo = como_arquivo_enviado(uploaded_file)
+        hash_arquivo = hash_conteudo(arquivo.dados)
+        return PIPELINE_CHGS.executar(arquivo, hash_arquivo, {
+            "hash_planilha": hash_arquivo,
+            "nome": arquivo.nome,
+            "hoje": hoje_str,
+            "amanha": amanha_str,
+            "hora_inicio": hora_inicio,
+            "hora_fim": hora_fim,
+        }, progresso)
+    
+    except ErroEtapa as e:
+        if relancar_erros:
+            raise
+        notificar_erro(str(e))
+        return pd.DataFrame()
+    except Exception as e:
+        erro_detalhado = traceback.format_exc()
+        registrar_log(f"Erro no processamento: {str(e)}", "erro")
+        registrar_log(f"Detalhes do erro: {erro_detalhado}", "erro")
+        if relancar_erros:
+            raise
+        notificar_erro(f"Erro crítico: {str(e)}")
+        return pd.DataFrame()
+
+@registrar_filtro("icone_indisponibilidade")
+def icone_indisponibilidade(tipo_indisponibilidade):
+    return "📵 " if tem_indisponibilidade(tipo_indisponibilidade) else "👍 "
+
+@perfilado("gerar_relatorio_chgs")
+def gerar_relatorio(df, saida=None, layout="keep_chg"):
+    if df.empty:
+        mensagem = "Nenhuma CHG encontrada para o dia de hoje com os filtros aplicados."
+        if saida is None:
+            return mensagem
+        saida.write(mensagem)
+        return None
+    
+    # Cada linha vira um contexto do layout, com as colunas da planilha como campos
+    return compilar(layout).renderizar({"chgs": df.to_dict('records')}, saida)
+
+@perfilado("gerar_relatorio_delta_chgs")
+def gerar_relatorio_delta(df, anterior, saida=None, layout="keep_chg_delta"):
+    """
+    Gera o relatório do Keep apenas com o que mudou desde o último envio: CHGs incluídas,
+    reagendadas, canceladas (ou retiradas do Keep) e alteradas.
+
+    Args:
+        df: DataFrame de CHGs filtradas (processar_dados)
+        anterior: Último envio do dia (envios_keep.RegistroEnvios.ultimo_envio)
+        saida: Objeto com método write; se None, o relatório é retornado como texto
+        layout: Layout do arquivo de layouts usado no relatório
+
+    Returns:
+        str | None: O texto do relatório quando saida é None
+    """
+    return compilar(layout).renderizar(calcular_delta(df, anterior), saida)
+
+COLUNAS_ALVO = [
+    'Plataforma', 'Tipo de Plano', 'Plano', 'Característica da massa',
+    'Entrypoint', 'Funcionalidade', 'Cenário', 'Resultado esperado',
+    'Status', 'N° INC'
+]
+
+# Removendo o código duplicado pois agora estamos usando o módulo test_processor.py
+# As constantes abaixo são definidas no test_processor.py
+
+# STATUS_VALIDOS = ['Passed', 'Not Executed', 'Failed']
+# CORES_STATUS = {
+#     'Passed': PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid'),
+#     'Not Executed': PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid'),
+#     'Failed': PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
+# }
+
+# COLUNAS_IGNORAR = ['ID Fluxo', 'Planejamento', 'Prioridade', 'Obervação']
+# COLUNAS_DESTINO = [
+#     'Data', 'Frente', 'Canal', 'Plataforma', 'Tipo de Plano', 'Plano',
+#     'Característica da massa', 'Entrypoint', 'Funcionalidade', 'Cenário',
+#     'Resultado esperado', 'Status', 'N° INC'
+# ]
+
+# def processar_testes(arquivo_caderno, arquivo_diario, data_manual=None):
+#     """Processa e mescla os arquivos de teste no arquivo diário existente"""
+#     try:
+#         dfs = []
+#         for sheet_name in ['Full Web', 'Priorizado']:
+#             try:
+#                 df = pd.read_excel(
+#                     arquivo_caderno,
+#                     sheet_name=sheet_name,
+#                     engine='openpyxl',
+#                     dtype=str
+#                 )
+#                 
+#                 df = df.rename(columns={
+#                     'Obervação': 'Observação',
+#                     'Status': 'Status',
+#                     'N° INC': 'N° INC'
+#                 }).drop(columns=COLUNAS_IGNORAR, errors='ignore')
+#                 
+#                 dfs.append(df)
+#                 
+#             except Exception as e:
+#                 st.warning(f"Erro ao processar aba {sheet_name}: {str(e)}")
+#                 continue
+#         
+#         if not dfs:
+#             st.error("Nenhuma aba válida encontrada!")
+#             return None, 0
+#             
+#         df_combined = pd.concat(dfs, axis=0, ignore_index=True, sort=False)
+#         df_combined['Status'] = df_combined['Status'].str.strip().str.title()
+#         df_filtrado = df_combined[df_combined['Status'].isin(STATUS_VALIDOS)].copy()
+#         
+#         if df_filtrado.empty:
+#             st.warning("Nenhum teste válido encontrado para processar!")
+#             return None, 0
+#         
+#         data = data_manual if data_manual else datetime.now(timezone('America/Sao_Paulo')).strftime('%d/%m/%Y')
+#         df_filtrado.insert(0, 'Data', data)
+#         
+#         wb = load_workbook(BytesIO(arquivo_diario.read()))
+#         ws = wb['B2C']
+#         
+#         ultima_linha = ws.max_row
+#         while ws.cell(row=ultima_linha, column=1).value is None:
+#             ultima_linha -= 1
+#         
+#         header = [cell.value for cell in ws[1]]
+#         df_mapped = df_filtrado.reindex(columns=header, fill_value='')
+#         
+#         for r_idx, row in enumerate(dataframe_to_rows(df_mapped, index=False, header=False), 1):
+#             nova_linha = ultima_linha + r_idx
+#             for c_idx, value in enumerate(row, 1):
+#                 cell = ws.cell(row=nova_linha, column=c_idx, value=value)
+#                 
+#                 if header[c_idx-1] == 'Status':
+#                     status = str(value).strip().title()
+#                     cell.fill = CORES_STATUS.get(status, PatternFill())
+#         
+#         output = BytesIO()
+#         wb.save(output)
+#         output.seek(0)
+#         
+#         return output, len(df_filtrado)
+# 
+#     except Exception as e:
+#         st.error(f"Erro crítico: {str(e)}")
+#         raise
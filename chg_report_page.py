@@ -0,0 +1,124 @@
+import streamlit as st
+from datetime import datetime
+from pytz import timezone
+from chg_processor import processar_dados, gerar_relatorio, gerar_relatorio_delta
+from envios_keep import obter_registro_envios
+from tarefas import obter_executor
+from cache_compartilhado import hash_conteudo
+from painel_tarefas import acompanhar_tarefa
+
+def planilha_chgs(df):
+    """Gera o XLSX das CHGs filtradas; chamada pelo Streamlit apenas quando o download é pedido."""
+    # Importado aqui: a exportação depende do openpyxl, que a página inicial não precisa carregar
+    from exportacao_xlsx import abas_chgs, gerar_xlsx
+    return b"".join(gerar_xlsx(abas_chgs(df)))
+
+def registrar_envio(df, tipo):
+    """Callback do download do relatório: guarda as CHGs enviadas para o próximo delta."""
+    obter_registro_envios().registrar(df, tipo)
+
+def gerar_keep_chgs(tarefa, conteudo):
+    """Tarefa em segundo plano: filtra as CHGs do arquivo e gera o relatório do Keep."""
+    df = processar_dados(conteudo, progresso=tarefa.atualizar, notificar_erro=tarefa.avisar)
+    tarefa.atualizar(0.9, "Gerando relatório")
+    return df, gerar_relatorio(df) if not df.empty else None
+
+def render_chg_report_page():
+    """
+    Renderiza a página do Gerador de Keep CHGs no Streamlit.
+    
+    Esta função é responsável por:
+    1. Receber o arquivo XLSX com as CHGs
+    2. Filtrar as CHGs de hoje/amanhã e gerar o relatório do Keep
+    3. Se o Keep do dia já foi enviado, oferecer apenas as alterações desde o último envio
+    4. Disponibilizar a prévia e o download do relatório e das CHGs filtradas em XLSX
+    """
+    st.markdown("""
+        <div style="background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
+            <h2 style="color: #1f61d9; margin-bottom: 20px;">📤 Gerador de Keep CHGs</h2>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    with st.container():
+        uploaded_file = st.file_uploader(
+            "Arraste ou clique para carregar o arquivo XLSX ou ODS",
+            type=["xlsx", "ods"],
+            key="file_uploader",
+            help="Selecione a planilha (Excel ou LibreOffice) contendo as CHGs"
+        )
+
+        if 'ultimo_arquivo' in st.session_state and not uploaded_file:
+            del st.session_state.ultimo_arquivo
+            st.rerun()
+
+        if uploaded_file:
+            # O processamento roda em segundo plano; o mesmo arquivo no mesmo dia reaproveita a tarefa
+            conteudo = uploaded_file.getvalue()
+            hoje = datetime.now(timezone('America/Sao_Paulo')).strftime('%Y-%m-%d')
+            tarefa = obter_executor().submeter(
+                ("keep_chgs", hash_conteudo(conteudo), hoje),
+                f"Keep CHGs ({uploaded_file.name})",
+                gerar_keep_chgs,
+                conteudo
+            )
+            
+            if acompanhar_tarefa(tarefa):
+                if tarefa.erro:
+                    st.error(f"Erro ao processar o arquivo: {tarefa.erro}")
+                    return
+                df, relatorio = tarefa.resultado
+                
+                if not df.empty:
+                    st.markdown(f"""
+                        <div class="success-message">
+                            ✅ {len(df)} CHGs de hoje/amanhã processadas com sucesso!
+                        </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # O download do relatório conta como envio; depois dele, o Keep do dia pode
+                    # ser atualizado só com as alterações
+                    anterior = obter_registro_envios().ultimo_envio()
+                    tipo = "completo"
+                    if anterior:
+                        enviado_em = datetime.fromisoformat(anterior["enviado_em"])
+                        st.caption(f"Keep de hoje já enviado às {enviado_em:%H:%M} ({len(anterior['chgs'])} CHGs)")
+                        modo = st.radio(
+                            "Relatório",
+                            ["Somente alterações", "Completo"],
+                            horizontal=True,
+                            key="modo_relatorio_chgs"
+                        )
+                        if modo == "Somente alterações":
+                            tipo = "delta"
+                            relatorio = gerar_relatorio_delta(df, anterior)
+                    
+                    st.text_area(
+                        "Prévia do Relatório",
+                        relatorio,
+                        height=500,
+                        help="Visualize o relatório antes de baixar"
+                    )
+                    
+                    col1, col2, col3 = st.columns([1,2,1])
+                    with col2:
+                        st.download_button(
+                            "⬇️ Baixar Relatório",
+                            relatorio,
+                            "CHGs_Delta.txt" if tipo == "delta" else "CHGs_Report.txt",
+                            on_click=registrar_envio,
+                            args=(df, tipo),
+                            use_container_width=True
+                        )
+                        st.download_button(
+                            "📊 Baixar CHGs (XLSX)",
+                            lambda: planilha_chgs(df),
+                            "CHGs_Filtradas.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            use_container_width=True
+                        )
+                else:
+                    st.markdown("""
+                        <div class="warning-message">
+                            ⚠️ Nenhuma CHG encontrada para hoje!
+                        </div>
+                    """, unsafe_allow_html=True)
@@ -0,0 +1,443 @@
+import math
+import posixpath
+import re
+import zipfile
+from collections import deque
+from io import BytesIO
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils.cell import column_index_from_string, get_column_letter
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+TAMANHO_BLOCO = 1 << 20
+# Janela inicial da aba onde devem estar a dimensão e o cabeçalho
+TAMANHO_CABECA = 1 << 20
+# Janela final da aba usada para localizar a última linha com dados
+TAMANHO_CAUDA = 8 << 20
+
+# Nível de compressão zlib usado ao regravar a aba
+NIVEL_COMPRESSAO_ABA = 1
+
+_RE_SHEETDATA = re.compile(rb"<sheetData\s*(/?)>")
+_RE_FIM_SHEETDATA = re.compile(rb"</sheetData>")
+_RE_DIMENSAO = re.compile(rb'<dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"\s*/>')
+_RE_LINHA = re.compile(rb"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_RE_CELULA = re.compile(rb"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.S)
+_RE_VALOR = re.compile(rb"<v>[^<]|<t\b[^>]*>[^<]|<f\b")
+_RE_REF = re.compile(rb"([A-Z]+)(\d+)")
+
+class DiarioIncompativel(Exception):
+    """O arquivo diário não tem a estrutura esperada para a anexação em streaming."""
+
+def _atributo(atributos, nome):
+    """Extrai o valor de um atributo XML de um trecho de tag em bytes."""
+    match = re.search(rb'(?:^|\s)' + nome + rb'="([^"]*)"', atributos)
+    return match.group(1).decode("utf-8") if match else None
+
+def _resolver_caminho(base, alvo):
+    """Resolve o Target de um relacionamento em relação à pasta do arquivo de origem."""
+    if alvo.startswith("/"):
+        return alvo.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), alvo))
+
+def _relacionamentos(zin, caminho):
+    """Lê o arquivo .rels de uma parte do pacote e retorna {Id: (Type, caminho)}."""
+    pasta, nome = posixpath.split(caminho)
+    caminho_rels = posixpath.join(pasta, "_rels", nome + ".rels")
+    raiz = ET.fromstring(zin.read(caminho_rels))
+    return {
+        rel.get("Id"): (rel.get("Type", ""), _resolver_caminho(caminho, rel.get("Target", "")))
+        for rel in raiz.iter(f"{{{NS_PKG}}}Relationship")
+    }
+
+def _ler_strings_compartilhadas(zin, caminho, indices):
+    """Lê apenas as strings compartilhadas necessárias (até o maior índice pedido)."""
+    if not indices or caminho is None:
+        return {}
+    maior = max(indices)
+    strings = {}
+    posicao = 0
+    with zin.open(caminho) as arquivo:
+        for _, elemento in ET.iterparse(arquivo):
+            if elemento.tag != f"{{{NS_MAIN}}}si":
+                continue
+            if posicao in indices:
+                strings[posicao] = "".join(t.text or "" for t in elemento.iter(f"{{{NS_MAIN}}}t"))
+            elemento.clear()
+            posicao += 1
+            if posicao > maior:
+                break
+    return strings
+
+def _celulas(conteudo_linha):
+    """Retorna a lista de (coluna, atributos, conteúdo) das células de uma linha."""
+    celulas = []
+    for match in _RE_CELULA.finditer(conteudo_linha or b""):
+        atributos, conteudo = match.group(1), match.group(2) or b""
+        ref = _RE_REF.match((_atributo(atributos, rb"r") or "").encode())
+        if not ref:
+            raise DiarioIncompativel("Célula sem referência")
+        celulas.append((column_index_from_string(ref.group(1).decode()), atributos, conteudo))
+    return celulas
+
+def _tem_valor(conteudo_celula):
+    return bool(_RE_VALOR.search(conteudo_celula))
+
+def _ler_exato(origem, quantidade):
+    partes = []
+    while quantidade > 0:
+        bloco = origem.read(min(TAMANHO_BLOCO, quantidade))
+        if not bloco:
+            raise DiarioIncompativel("Fim inesperado da aba")
+        partes.append(bloco)
+        quantidade -= len(bloco)
+    return b"".join(partes)
+
+def _transferir(origem, destino, quantidade=None):
+    """Copia bytes da origem para o destino sem interpretá-los."""
+    while quantidade is None or quantidade > 0:
+        bloco = origem.read(TAMANHO_BLOCO if quantidade is None else min(TAMANHO_BLOCO, quantidade))
+        if not bloco:
+            if quantidade is None:
+                return
+            raise DiarioIncompativel("Fim inesperado da aba")
+        destino.write(bloco)
+        if quantidade is not None:
+            quantidade -= len(bloco)
+
+def _copiar_info(info):
+    """Cria um ZipInfo novo com o nome, data e compressão da entrada original."""
+    nova = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    nova.compress_type = info.compress_type
+    nova.external_attr = info.external_attr
+    return nova
+
+def _celula_xml(ref, valor, estilo):
+    """Gera o XML de uma célula com string inline (sem tocar no sharedStrings)."""
+    atributo_estilo = f' s="{estilo}"' if estilo else ""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)) or valor == "":
+        return f'<c r="{ref}"{atributo_estilo}/>' if estilo else ""
+    if isinstance(valor, bool):
+        return f'<c r="{ref}"{atributo_estilo} t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c r="{ref}"{atributo_estilo}><v>{valor}</v></c>'
+    texto = escape(ILLEGAL_CHARACTERS_RE.sub("", str(valor)))
+    preservar = ' xml:space="preserve"' if texto != texto.strip() else ""
+    return f'<c r="{ref}"{atributo_estilo} t="inlineStr"><is><t{preservar}>{texto}</t></is></c>'
+
+class AnexadorDiario:
+    """
+    Anexa linhas ao final de uma aba de um arquivo XLSX sem carregar o histórico.
+
+    A aba é percorrida como bytes: o conteúdo existente é copiado sem interpretação
+    e apenas as novas linhas são geradas. Somente o início (dimensão e cabeçalho) e
+    o final da aba (última linha com dados) são analisados. Os estilos de cor do
+    status são adicionados uma única vez ao styles.xml e compartilhados por todas
+    as novas células.
+
+    Qualquer estrutura inesperada gera DiarioIncompativel, para que o chamador use
+    o caminho completo via openpyxl.
+    """
+
+    def __init__(self, dados, nome_aba):
+        """
+        Args:
+            dados: bytes ou arquivo binário com posicionamento (seek) do XLSX
+            nome_aba: Nome da aba que receberá as linhas
+        """
+        try:
+            self.zin = zipfile.ZipFile(BytesIO(dados) if isinstance(dados, (bytes, bytearray, memoryview)) else dados)
+            self._localizar_partes(nome_aba)
+            self._analisar_aba()
+        except (zipfile.BadZipFile, KeyError, ET.ParseError, UnicodeDecodeError) as e:
+            raise DiarioIncompativel(str(e))
+
+    def _localizar_partes(self, nome_aba):
+        rels_pacote = ET.fromstring(self.zin.read("_rels/.rels"))
+        caminho_workbook = None
+        for rel in rels_pacote.iter(f"{{{NS_PKG}}}Relationship"):
+            if rel.get("Type", "").endswith("/officeDocument"):
+                caminho_workbook = _resolver_caminho("", rel.get("Target", ""))
+        if caminho_workbook is None:
+            raise DiarioIncompativel("Workbook não encontrado no pacote")
+
+        rels = _relacionamentos(self.zin, caminho_workbook)
+        workbook = ET.fromstring(self.zin.read(caminho_workbook))
+        self.caminho_aba = None
+        for sheet in workbook.iter(f"{{{NS_MAIN}}}sheet"):
+            if sheet.get("name") == nome_aba:
+                self.caminho_aba = rels[sheet.get(f"{{{NS_REL}}}id")][1]
+        if self.caminho_aba is None:
+            raise DiarioIncompativel(f"Aba '{nome_aba}' não encontrada")
+
+        self.caminho_estilos = None
+        self.caminho_strings = None
+        for tipo, caminho in rels.values():
+            if tipo.endswith("/styles"):
+                self.caminho_estilos = caminho
+            elif tipo.endswith("/sharedStrings"):
+                self.caminho_strings = caminho
+        if self.caminho_estilos is None:
+            raise DiarioIncompativel("styles.xml não encontrado")
+
+    def _analisar_aba(self):
+        """Lê a aba uma vez guardando apenas o início e a janela final."""
+        cabeca = bytearray()
+        cauda = deque()
+        tamanho_cauda = 0
+        total = 0
+        with self.zin.open(self.caminho_aba) as arquivo:
+            while True:
+                bloco = arquivo.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                if len(cabeca) < TAMANHO_CABECA:
+                    cabeca += bloco[:TAMANHO_CABECA - len(cabeca)]
+                cauda.append((total, bloco))
+                tamanho_cauda += len(bloco)
+                total += len(bloco)
+                while tamanho_cauda - len(cauda[0][1]) >= TAMANHO_CAUDA:
+                    tamanho_cauda -= len(cauda.popleft()[1])
+        self.tamanho_aba = total
+
+        # Início da aba: dimensão, abertura do sheetData e cabeçalho (linha 1)
+        cabeca = bytes(cabeca)
+        match = _RE_SHEETDATA.search(cabeca)
+        if not match or match.group(1):
+            raise DiarioIncompativel("sheetData não encontrado ou vazio")
+        self.inicio_dados = match.end()
+        self.dimensao = _RE_DIMENSAO.search(cabeca, 0, match.start())
+
+        primeira = _RE_LINHA.search(cabeca, self.inicio_dados)
+        if not primeira or _atributo(primeira.group(1), rb"r") != "1":
+            raise DiarioIncompativel("Cabeçalho não está na linha 1")
+        self.cabecalho = self._valores_celulas(_celulas(primeira.group(2)))
+
+        # Final da aba: localizar a última linha com valor na coluna A
+        inicio_cauda = cauda[0][0]
+        dados_cauda = b"".join(bloco for _, bloco in cauda)
+        fim = None
+        for match in _RE_FIM_SHEETDATA.finditer(dados_cauda):
+            fim = match
+        if fim is None:
+            raise DiarioIncompativel("Fim do sheetData não encontrado")
+        self.fim_dados = inicio_cauda + fim.start()
+
+        inicio_busca = self.inicio_dados - inicio_cauda if inicio_cauda == 0 else dados_cauda.find(b"<row")
+        if inicio_busca < 0:
+            raise DiarioIncompativel("Nenhuma linha encontrada no final da aba")
+
+        # Percorrer as linhas de trás para frente até achar uma com valor na coluna A
+        self.ultima_linha = None
+        self.fim_ultima_linha = None
+        self.linhas_reservadas = []
+        posicao = fim.start()
+        while self.ultima_linha is None:
+            inicio = dados_cauda.rfind(b"<row", inicio_busca, posicao)
+            if inicio < 0:
+                raise DiarioIncompativel("Última linha com dados fora da janela analisada")
+            match = _RE_LINHA.match(dados_cauda, inicio, posicao)
+            numero = _atributo(match.group(1), rb"r") if match else None
+            if numero is None:
+                raise DiarioIncompativel("Linha sem número")
+            celulas = _celulas(match.group(2))
+            if any(coluna == 1 and _tem_valor(conteudo) for coluna, _, conteudo in celulas):
+                self.ultima_linha = int(numero)
+                self.fim_ultima_linha = inicio_cauda + match.end()
+                self._celulas_ultima_linha = celulas
+            else:
+                self.linhas_reservadas.insert(0, (int(numero), match.group(0), celulas))
+            posicao = inicio
+
+    def valores_ultima_linha(self):
+        """Retorna os valores (como texto) da última linha com dados, na ordem das colunas."""
+        return self._valores_celulas(self._celulas_ultima_linha)
+
+    def _valores_celulas(self, celulas):
+        indices = set()
+        for _, atributos, conteudo in celulas:
+            if _atributo(atributos, rb"t") == "s":
+                valor = re.search(rb"<v>(\d+)</v>", conteudo)
+                if valor:
+                    indices.add(int(valor.group(1)))
+        strings = _ler_strings_compartilhadas(self.zin, self.caminho_strings, indices)
+
+        total_colunas = max((coluna for coluna, _, _ in celulas), default=0)
+        cabecalho = [None] * total_colunas
+        for coluna, atributos, conteudo in celulas:
+            tipo = _atributo(atributos, rb"t")
+            if tipo == "s":
+                valor = re.search(rb"<v>(\d+)</v>", conteudo)
+                cabecalho[coluna - 1] = strings.get(int(valor.group(1))) if valor else None
+            elif tipo == "inlineStr" or tipo == "str":
+                textos = re.findall(rb"<t\b[^>]*>([^<]*)</t>", conteudo) if tipo == "inlineStr" else re.findall(rb"<v>([^<]*)</v>", conteudo)
+                texto = ET.fromstring(b"<t>" + b"".join(textos) + b"</t>").text if textos else None
+                cabecalho[coluna - 1] = texto
+            else:
+                valor = re.search(rb"<v>([^<]*)</v>", conteudo)
+                cabecalho[coluna - 1] = valor.group(1).decode("utf-8") if valor else None
+        return cabecalho
+
+    def _preparar_estilos(self, bases, cores):
+        """
+        Adiciona ao styles.xml os preenchimentos e formatos de célula das cores de status.
+        Reaproveita entradas idênticas já existentes (de execuções anteriores).
+
+        Returns:
+            tuple: (novo conteúdo do styles.xml, {(xf base, rgb): índice do novo xf})
+        """
+        estilos = self.zin.read(self.caminho_estilos).decode("utf-8")
+
+        fills = re.search(r"<fills\b[^>]*>(.*?)</fills>", estilos, re.S)
+        xfs = re.search(r"<cellXfs\b[^>]*>(.*?)</cellXfs>", estilos, re.S)
+        if not fills or not xfs:
+            raise DiarioIncompativel("Estrutura de estilos não reconhecida")
+        lista_fills = re.findall(r"<fill\b[^>]*?(?:/>|>.*?</fill>)", fills.group(1), re.S)
+        lista_xfs = re.findall(r"<xf\b[^>]*?(?:/>|>.*?</xf>)", xfs.group(1), re.S)
+        normalizar = lambda xml: re.sub(r"\s+/>", "/>", xml)
+        fills_existentes = [normalizar(xml) for xml in lista_fills]
+        xfs_existentes = [normalizar(xml) for xml in lista_xfs]
+
+        novos_fills = []
+        indice_fill = {}
+        for rgb in sorted(set(cores.values())):
+            xml = (f'<fill><patternFill patternType="solid"><fgColor rgb="{rgb}"/>'
+                   f'<bgColor rgb="{rgb}"/></patternFill></fill>')
+            if xml in fills_existentes:
+                indice_fill[rgb] = fills_existentes.index(xml)
+            else:
+                indice_fill[rgb] = len(fills_existentes) + len(novos_fills)
+                novos_fills.append(xml)
+
+        novos_xfs = []
+        mapa = {}
+        for base in sorted(bases):
+            if base >= len(lista_xfs):
+                raise DiarioIncompativel(f"Estilo {base} inexistente")
+            abertura = re.match(r"<xf\b[^>]*?(?=/?>)", lista_xfs[base]).group(0)
+            resto = lista_xfs[base][len(abertura):]
+            abertura = re.sub(r'\s(fillId|applyFill)="[^"]*"', "", abertura)
+            for rgb, fill_id in indice_fill.items():
+                xml = normalizar(f'{abertura} fillId="{fill_id}" applyFill="1"{resto}')
+                if xml in xfs_existentes:
+                    mapa[(base, rgb)] = xfs_existentes.index(xml)
+                elif xml in novos_xfs:
+                    mapa[(base, rgb)] = len(xfs_existentes) + novos_xfs.index(xml)
+                else:
+                    mapa[(base, rgb)] = len(xfs_existentes) + len(novos_xfs)
+                    novos_xfs.append(xml)
+
+        def acrescentar(texto, match, itens, total):
+            abertura = re.sub(r'\scount="\d+"', "", texto[match.start():match.start(1)])
+            abertura = abertura[:-1] + f' count="{total}">'
+            return texto[:match.start()] + abertura + match.group(1) + "".join(itens) + texto[match.end(1):]
+
+        # Alterar do fim para o início para não invalidar as posições dos matches
+        if xfs.start() > fills.start():
+            estilos = acrescentar(estilos, xfs, novos_xfs, len(lista_xfs) + len(novos_xfs))
+            estilos = acrescentar(estilos, fills, novos_fills, len(lista_fills) + len(novos_fills))
+        else:
+            estilos = acrescentar(estilos, fills, novos_fills, len(lista_fills) + len(novos_fills))
+            estilos = acrescentar(estilos, xfs, novos_xfs, len(lista_xfs) + len(novos_xfs))
+        return estilos, mapa
+
+    def anexar(self, linhas, cores_status=None, coluna_status="Status"):
+        """
+        Gera o novo arquivo com as linhas anexadas após a última linha com dados.
+
+        Args:
+            linhas: Lista de linhas (listas de valores na ordem do cabeçalho)
+            cores_status (dict): Status -> cor RGB (ex.: 'Passed': '00C6EFCE')
+            coluna_status (str): Nome da coluna do cabeçalho que recebe a cor
+
+        Returns:
+            BytesIO: O arquivo XLSX resultante
+        """
+        cores_status = cores_status or {}
+        linhas = list(linhas)
+        ultima_nova = self.ultima_linha + len(linhas)
+
+        # Linhas já existentes (só formatação) que ocupam a posição das novas linhas
+        reservadas = {}
+        restantes = []
+        for numero, xml, celulas in self.linhas_reservadas:
+            if numero <= ultima_nova:
+                if any(_tem_valor(conteudo) for _, _, conteudo in celulas):
+                    raise DiarioIncompativel(f"Linha {numero} possui dados após a última linha preenchida")
+                reservadas[numero] = {
+                    coluna: int(_atributo(atributos, rb"s") or 0) for coluna, atributos, _ in celulas
+                }
+            else:
+                restantes.append(xml)
+
+        indice_status = self.cabecalho.index(coluna_status) + 1 if coluna_status in self.cabecalho else None
+        bases = {0} | {estilos.get(indice_status, 0) for estilos in reservadas.values()}
+        estilos_xml, mapa_estilos = self._preparar_estilos(bases, cores_status) if cores_status and indice_status else (None, {})
+
+        total_colunas = max(
+            len(self.cabecalho),
+            max((len(linha) for linha in linhas), default=0),
+            max((max(estilos, default=0) for estilos in reservadas.values()), default=0)
+        )
+        letras = [get_column_letter(coluna) for coluna in range(1, total_colunas + 1)]
+
+        saida = BytesIO()
+        # A aba é recomprimida com nível baixo: a compressão é o custo dominante da anexação
+        with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO_ABA) as zout:
+            for info in self.zin.infolist():
+                if info.filename == self.caminho_aba:
+                    with self.zin.open(info) as origem, zout.open(info.filename, "w", force_zip64=self.tamanho_aba > (1 << 31)) as destino:
+                        self._escrever_aba(origem, destino, linhas, letras, reservadas, restantes,
+                                           indice_status, cores_status, mapa_estilos, ultima_nova)
+                elif info.filename == self.caminho_estilos and estilos_xml is not None:
+                    zout.writestr(_copiar_info(info), estilos_xml.encode("utf-8"))
+                else:
+                    zout.writestr(_copiar_info(info), self.zin.read(info))
+        saida.seek(0)
+        return saida
+
+    def _escrever_aba(self, origem, destino, linhas, letras, reservadas, restantes,
+                      indice_status, cores_status, mapa_estilos, ultima_nova):
+        # Início da aba, com a dimensão atualizada
+        inicio = _ler_exato(origem, self.inicio_dados)
+        if self.dimensao:
+            coluna_final = self.dimensao.group(3) or self.dimensao.group(1)
+            linha_final = int(self.dimensao.group(4) or self.dimensao.group(2))
+            if column_index_from_string(coluna_final.decode()) < len(letras):
+                coluna_final = letras[-1].encode()
+            nova = b'<dimension ref="A1:' + coluna_final + str(max(linha_final, ultima_nova)).encode() + b'"/>'
+            inicio = inicio[:self.dimensao.start()] + nova + inicio[self.dimensao.end():]
+        destino.write(inicio)
+
+        # Histórico copiado sem interpretação até o fim da última linha com dados
+        _transferir(origem, destino, self.fim_ultima_linha - self.inicio_dados)
+        _ler_exato(origem, self.fim_dados - self.fim_ultima_linha)
+
+        partes = []
+        for deslocamento, linha in enumerate(linhas, 1):
+            numero = self.ultima_linha + deslocamento
+            estilos = reservadas.get(numero, {})
+            celulas = []
+            valores = list(linha) + [None] * (max(estilos, default=0) - len(linha))
+            for coluna, valor in enumerate(valores, 1):
+                estilo = estilos.get(coluna, 0)
+                if coluna == indice_status and valor is not None:
+                    rgb = cores_status.get(str(valor).strip().title())
+                    if rgb:
+                        estilo = mapa_estilos[(estilo, rgb)]
+                celulas.append(_celula_xml(f"{letras[coluna - 1]}{numero}", valor, estilo))
+            partes.append(f'<row r="{numero}">{"".join(celulas)}</row>')
+            if len(partes) >= 1000:
+                destino.write("".join(partes).encode("utf-8"))
+                partes = []
+        destino.write("".join(partes).encode("utf-8"))
+        for xml in restantes:
+            destino.write(xml)
+
+        # Restante da aba (</sheetData> e elementos seguintes)
+        _transferir(origem, destino)
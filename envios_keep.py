@@ -0,0 +1,246 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from hashlib import blake2b
+
+import pandas as pd
+from pytz import timezone
+
+from historico_chgs import DIRETORIO_HISTORICO, ESPERA_BLOQUEIO_MS, texto_celula
+from logger import registrar_log
+
+# Banco com as impressões digitais das CHGs de cada relatório do Keep enviado
+ARQUIVO_ENVIOS = "keep_enviados.sqlite3"
+
+# Envios mais antigos que isso são removidos a cada novo registro
+DIAS_ENVIOS_GUARDADOS = 30
+
+# Colunas de texto exibidas no relatório do Keep; com as datas de início e término e o
+# status, formam a impressão digital de cada CHG
+CAMPOS_IMPRESSAO = ['Descrição resumida', 'Tipo de Indisponibilidade', 'IC Impactado',
+                    'Grupo de atribuição', 'Observação (Time Mudanças)', 'Status']
+
+STATUS_CANCELADA = 'Cancelada'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS envios (
+    id INTEGER PRIMARY KEY,
+    dia TEXT NOT NULL,
+    enviado_em TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    chgs INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS envios_dia ON envios(dia, id);
+CREATE TABLE IF NOT EXISTS envios_chgs (
+    envio INTEGER NOT NULL,
+    numero TEXT NOT NULL,
+    impressao TEXT NOT NULL,
+    inicio TEXT,
+    termino TEXT,
+    campos TEXT NOT NULL,
+    PRIMARY KEY (envio, numero)
+) WITHOUT ROWID;
+"""
+
+def dia_keep():
+    """Data (YYYY-MM-DD, horário de Brasília) do Keep gerado agora, usada para agrupar os envios."""
+    return datetime.now(timezone('America/Sao_Paulo')).strftime('%Y-%m-%d')
+
+def _data_iso(valor):
+    data = pd.to_datetime(valor, errors='coerce')
+    return "" if pd.isna(data) else data.strftime('%Y-%m-%dT%H:%M:%S')
+
+def impressoes(df):
+    """
+    Calcula a impressão digital de cada CHG do relatório.
+
+    Args:
+        df: DataFrame de CHGs filtradas (processar_dados)
+
+    Returns:
+        dict: Número -> {"impressao", "inicio", "termino", "campos"}; a impressão é o hash
+        dos campos exibidos no relatório, das datas e do status
+    """
+    resultado = {}
+    if df.empty:
+        return resultado
+    colunas = {campo: df[campo].tolist() if campo in df.columns else [""] * len(df) for campo in CAMPOS_IMPRESSAO}
+    inicios = [_data_iso(valor) for valor in df['Data de início planejada']]
+    terminos = [_data_iso(valor) for valor in df['Data de término planejada']]
+    for i, numero in enumerate(df['Número']):
+        numero = texto_celula(numero)
+        if not numero:
+            continue
+        campos = {campo: texto_celula(valores[i]) for campo, valores in colunas.items()}
+        impressao = blake2b("\x1f".join([numero, inicios[i], terminos[i], *campos.values()]).encode("utf-8"),
+                            digest_size=8).hexdigest()
+        resultado[numero] = {"impressao": impressao, "inicio": inicios[i], "termino": terminos[i], "campos": campos}
+    return resultado
+
+def _contexto_chg(numero, chg):
+    """Monta o contexto de uma CHG para os layouts, com as datas como datetime (filtro data_hora)."""
+    return {
+        'Número': numero,
+        **chg["campos"],
+        'Data de início planejada': datetime.fromisoformat(chg["inicio"]) if chg["inicio"] else None,
+        'Data de término planejada': datetime.fromisoformat(chg["termino"]) if chg["termino"] else None,
+    }
+
+def calcular_delta(df, anterior):
+    """
+    Compara as CHGs atuais com as do último envio, pelo Número de cada CHG.
+
+    Args:
+        df: DataFrame de CHGs filtradas (processar_dados)
+        anterior: Envio anterior (RegistroEnvios.ultimo_envio)
+
+    Returns:
+        dict: Contexto do layout keep_chg_delta, com as seções "novas", "reagendadas",
+        "canceladas" e "alteradas" (None quando vazias) e a quantidade de CHGs inalteradas
+    """
+    atuais = impressoes(df)
+    enviadas = anterior["chgs"]
+    novas, reagendadas, canceladas, alteradas = [], [], [], []
+    inalteradas = 0
+
+    for numero, chg in atuais.items():
+        enviada = enviadas.get(numero)
+        cancelada = chg["campos"].get('Status') == STATUS_CANCELADA
+        if enviada is None:
+            # Uma CHG que já chega cancelada não precisa ser anunciada
+            if not cancelada:
+                novas.append(_contexto_chg(numero, chg))
+        elif enviada["impressao"] == chg["impressao"]:
+            inalteradas += 1
+        elif cancelada and enviada["campos"].get('Status') != STATUS_CANCELADA:
+            canceladas.append({**_contexto_chg(numero, chg), 'Motivo': 'Cancelada'})
+        elif (enviada["inicio"], enviada["termino"]) != (chg["inicio"], chg["termino"]):
+            reagendadas.append({
+                **_contexto_chg(numero, chg),
+                'Início anterior': _contexto_chg(numero, enviada)['Data de início planejada'],
+                'Término anterior': _contexto_chg(numero, enviada)['Data de término planejada'],
+            })
+        else:
+            alteradas.append({
+                **_contexto_chg(numero, chg),
+                'Campos alterados': ", ".join(campo for campo in CAMPOS_IMPRESSAO
+                                              if enviada["campos"].get(campo, "") != chg["campos"][campo]),
+            })
+
+    # CHGs que saíram do relatório: canceladas na planilha, reagendadas para fora da
+    # janela do Keep ou desmarcadas em "Enviar Keep"
+    for numero, enviada in enviadas.items():
+        if numero not in atuais and enviada["campos"].get('Status') != STATUS_CANCELADA:
+            canceladas.append({**_contexto_chg(numero, enviada), 'Motivo': 'Retirada do Keep'})
+
+    secao = lambda itens: {"itens": itens} if itens else None
+    return {
+        "enviado_em": datetime.fromisoformat(anterior["enviado_em"]),
+        "novas": secao(novas),
+        "reagendadas": secao(reagendadas),
+        "canceladas": secao(canceladas),
+        "alteradas": secao(alteradas),
+        "alteracoes": bool(novas or reagendadas or canceladas or alteradas),
+        "inalteradas": inalteradas,
+    }
+
+class RegistroEnvios:
+    """
+    Registro local dos relatórios do Keep enviados.
+
+    Cada envio guarda, por Número, a impressão digital da CHG (hash dos campos exibidos,
+    das datas e do status) e os campos necessários para citá-la depois. O relatório
+    seguinte do mesmo dia pode então listar apenas o que mudou (calcular_delta), sem
+    regerar e comparar o texto dos relatórios.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_HISTORICO):
+        """
+        Args:
+            diretorio: Pasta onde o banco dos envios é armazenado
+        """
+        self.caminho = os.path.join(diretorio, ARQUIVO_ENVIOS)
+        self._diretorio = diretorio
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        os.makedirs(self._diretorio, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=ESPERA_BLOQUEIO_MS / 1000)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.executescript(_ESQUEMA)
+        return conexao
+
+    def registrar(self, df, tipo="completo", dia=None):
+        """
+        Registra o envio de um relatório do Keep.
+        Mesmo quando o enviado foi só o delta, o envio guarda todas as CHGs atuais: é o
+        estado que quem recebeu os relatórios passa a conhecer.
+
+        Args:
+            df: DataFrame de CHGs filtradas usado no relatório
+            tipo: "completo" ou "delta"
+            dia: Dia do Keep (padrão: dia_keep())
+
+        Returns:
+            int: Identificador do envio
+        """
+        dia = dia or dia_keep()
+        chgs = impressoes(df)
+        enviado_em = datetime.now(timezone('America/Sao_Paulo')).replace(tzinfo=None).isoformat(timespec="microseconds")
+        limite = (datetime.fromisoformat(dia) - timedelta(days=DIAS_ENVIOS_GUARDADOS)).strftime('%Y-%m-%d')
+        with self._lock, closing(self._conectar()) as conexao:
+            with conexao:
+                envio = conexao.execute(
+                    "INSERT INTO envios (dia, enviado_em, tipo, chgs) VALUES (?, ?, ?, ?)",
+                    (dia, enviado_em, tipo, len(chgs))
+                ).lastrowid
+                conexao.executemany(
+                    "INSERT INTO envios_chgs VALUES (?, ?, ?, ?, ?, ?)",
+                    [(envio, numero, chg["impressao"], chg["inicio"], chg["termino"],
+                      json.dumps(chg["campos"], ensure_ascii=False)) for numero, chg in chgs.items()]
+                )
+                conexao.execute("DELETE FROM envios_chgs WHERE envio IN (SELECT id FROM envios WHERE dia < ?)", (limite,))
+                conexao.execute("DELETE FROM envios WHERE dia < ?", (limite,))
+        registrar_log(f"Envio do Keep de {dia} registrado ({tipo}, {len(chgs)} CHGs)", "info")
+        return envio
+
+    def ultimo_envio(self, dia=None):
+        """
+        Retorna o último envio registrado do dia.
+
+        Args:
+            dia: Dia do Keep (padrão: dia_keep())
+
+        Returns:
+            dict | None: {"id", "enviado_em", "tipo", "chgs"} com as impressões por Número,
+            ou None se o Keep do dia ainda não foi enviado
+        """
+        dia = dia or dia_keep()
+        with closing(self._conectar()) as conexao:
+            envio = conexao.execute(
+                "SELECT id, enviado_em, tipo FROM envios WHERE dia = ? ORDER BY id DESC LIMIT 1", (dia,)
+            ).fetchone()
+            if envio is None:
+                return None
+            chgs = {
+                numero: {"impressao": impressao, "inicio": inicio, "termino": termino, "campos": json.loads(campos)}
+                for numero, impressao, inicio, termino, campos in conexao.execute(
+                    "SELECT numero, impressao, inicio, termino, campos FROM envios_chgs WHERE envio = ?", (envio[0],)
+                )
+            }
+        return {"id": envio[0], "enviado_em": envio[1], "tipo": envio[2], "chgs": chgs}
+
+_registro = None
+_registro_lock = threading.Lock()
+
+def obter_registro_envios():
+    """Retorna o registro de envios do Keep do processo, criando-o na primeira chamada."""
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroEnvios()
+        return _registro
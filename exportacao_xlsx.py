@@ -0,0 +1,268 @@
+import datetime
+import math
+import zipfile
+from collections import deque
+from xml.sax.saxutils import quoteattr
+
+from openpyxl.utils.cell import get_column_letter
+from openpyxl.utils.datetime import to_excel
+
+from analise_incidentes import CATEGORIAS
+from chg_processor import COLUNAS_CHGS, map_status_emoji
+from diario_xlsx import NS_MAIN, NS_PKG, NS_REL, _celula_xml
+from gera_relatorio import extrair_funcionalidade, extrair_responsavel
+from logger import registrar_log
+
+# Bytes acumulados antes de entregar um bloco do arquivo a quem está baixando
+TAMANHO_BLOCO_EXPORTACAO = 64 * 1024
+
+# Nível de compressão zlib das abas (o mesmo usado na regravação do diário)
+NIVEL_COMPRESSAO_EXPORTACAO = 1
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Colunas exportadas das CHGs filtradas ('Enviar Keep' já foi usada no filtro)
+COLUNAS_EXPORTACAO_CHGS = [coluna for coluna in COLUNAS_CHGS if coluna != 'Enviar Keep']
+
+# Colunas exportadas dos incidentes: rótulo exibido e campo do JSON do ServiceNow
+CAMPOS_EXPORTACAO_INCIDENTES = {
+    "Número": "number",
+    "Prioridade": "priority",
+    "Estado": "state",
+    "Descrição resumida": "short_description",
+    "IC": "cmdb_ci",
+    "Grupo de atribuição": "assignment_group",
+    "Tipo de incidente": "u_incident_type",
+    "Aberto em": "opened_at",
+}
+
+# Índices de cellXfs em _ESTILOS
+ESTILO_CABECALHO = 1
+ESTILO_DATA_HORA = 2
+ESTILO_DATA = 3
+
+_TIPO_DOC = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{abas}</Types>'
+)
+
+_ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<styleSheet xmlns="{NS_MAIN}">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+class _Saida:
+    """Destino do zip sem posicionamento (seek): os bytes ficam na fila até serem entregues."""
+
+    def __init__(self):
+        self.blocos = deque()
+        self.tamanho = 0
+
+    def write(self, dados):
+        self.blocos.append(bytes(dados))
+        self.tamanho += len(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b"".join(self.blocos)
+        self.blocos.clear()
+        self.tamanho = 0
+        return dados
+
+def _valor_celula(valor):
+    """Converte um valor para _celula_xml, retornando (valor, estilo)."""
+    if valor is None:
+        return None, 0
+    if isinstance(valor, datetime.datetime):
+        # pd.NaT também é uma instância de datetime
+        if valor != valor:
+            return None, 0
+        if valor.tzinfo is not None:
+            valor = valor.replace(tzinfo=None)
+        return to_excel(valor), ESTILO_DATA_HORA
+    if isinstance(valor, datetime.date):
+        return to_excel(valor), ESTILO_DATA
+    if hasattr(valor, "item") and not isinstance(valor, str):
+        # Escalares do numpy (int64, float64, bool_)
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return (None if math.isnan(valor) else str(valor)), 0
+    return valor, 0
+
+def _linha_xml(numero, letras, valores, estilo_fixo=0):
+    celulas = []
+    for letra, valor in zip(letras, valores):
+        valor, estilo = _valor_celula(valor)
+        celulas.append(_celula_xml(f"{letra}{numero}", valor, estilo_fixo or estilo))
+    return f'<row r="{numero}">{"".join(celulas)}</row>'
+
+def gerar_xlsx(abas):
+    """
+    Gera um arquivo XLSX em blocos de bytes, aba por aba e linha por linha.
+
+    O zip é escrito sem posicionamento (com descritores de dados), então cada bloco pode
+    ser enviado assim que é produzido e a memória usada não depende do número de linhas.
+    As linhas são consumidas dos iteráveis à medida que o arquivo é gerado.
+
+    Args:
+        abas: Lista de (nome da aba, cabeçalho, iterável de linhas); cada linha é uma
+            sequência de valores na ordem do cabeçalho
+
+    Returns:
+        generator: Blocos de bytes do arquivo XLSX
+    """
+    saida = _Saida()
+    total_linhas = 0
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO_EXPORTACAO) as zout:
+        substituicoes = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(abas) + 1)
+        )
+        zout.writestr("[Content_Types].xml", _CONTENT_TYPES.format(abas=substituicoes))
+        zout.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<Relationships xmlns="{NS_PKG}">'
+            f'<Relationship Id="rId1" Type="{_TIPO_DOC}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        zout.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><sheets>'
+            + "".join(f'<sheet name={quoteattr(nome[:31])} sheetId="{i}" r:id="rId{i}"/>'
+                      for i, (nome, _, _) in enumerate(abas, 1))
+            + '</sheets></workbook>'
+        ))
+        zout.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<Relationships xmlns="{NS_PKG}">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{_TIPO_DOC}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                      for i in range(1, len(abas) + 1))
+            + f'<Relationship Id="rId{len(abas) + 1}" Type="{_TIPO_DOC}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ))
+        zout.writestr("xl/styles.xml", _ESTILOS)
+        yield saida.retirar()
+
+        for i, (nome, cabecalho, linhas) in enumerate(abas, 1):
+            letras = [get_column_letter(coluna) for coluna in range(1, len(cabecalho) + 1)]
+            larguras = "".join(
+                f'<col min="{coluna}" max="{coluna}" width="{max(12, min(60, len(str(titulo)) + 4))}" customWidth="1"/>'
+                for coluna, titulo in enumerate(cabecalho, 1)
+            )
+            with zout.open(f"xl/worksheets/sheet{i}.xml", "w") as aba:
+                aba.write((
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    f'<worksheet xmlns="{NS_MAIN}"><sheetViews><sheetView workbookViewId="0">'
+                    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                    f'</sheetView></sheetViews>{"<cols>" + larguras + "</cols>" if larguras else ""}<sheetData>'
+                    + _linha_xml(1, letras, [str(titulo) for titulo in cabecalho], ESTILO_CABECALHO)
+                ).encode("utf-8"))
+                numero = 1
+                for valores in linhas:
+                    numero += 1
+                    aba.write(_linha_xml(numero, letras, valores).encode("utf-8"))
+                    if saida.tamanho >= TAMANHO_BLOCO_EXPORTACAO:
+                        yield saida.retirar()
+                aba.write(b"</sheetData></worksheet>")
+            total_linhas += numero - 1
+            registrar_log(f"Aba {nome} exportada: {numero - 1} linhas", "info")
+            yield saida.retirar()
+    yield saida.retirar()
+    registrar_log(f"Exportação XLSX concluída: {len(abas)} aba(s), {total_linhas} linhas", "info")
+
+def escrever_xlsx(abas, destino):
+    """
+    Escreve um arquivo XLSX gerado por gerar_xlsx em um arquivo binário.
+
+    Args:
+        abas: Lista de (nome da aba, cabeçalho, iterável de linhas)
+        destino: Arquivo binário aberto para escrita
+
+    Returns:
+        int: Número de bytes escritos
+    """
+    total = 0
+    for bloco in gerar_xlsx(abas):
+        destino.write(bloco)
+        total += len(bloco)
+    return total
+
+def _linhas_chgs(df, colunas):
+    indice_status = colunas.index('Status') if 'Status' in colunas else None
+    # As colunas são percorridas diretamente: df[colunas] faria uma cópia do DataFrame
+    for valores in zip(*(df[coluna] for coluna in colunas)):
+        if indice_status is not None:
+            status = valores[indice_status]
+            emoji = map_status_emoji(status)
+            # Status vazio chega como NaN (e NaN != NaN): só recebe emoji um status conhecido
+            if isinstance(status, str) and emoji != status:
+                valores = list(valores)
+                valores[indice_status] = f"{emoji} {status}"
+        yield valores
+
+def abas_chgs(df):
+    """
+    Monta a aba de exportação das CHGs filtradas por processar_dados.
+
+    O status recebe o mesmo emoji do relatório do Keep (map_status_emoji).
+
+    Args:
+        df: DataFrame retornado por processar_dados
+
+    Returns:
+        list: Abas no formato aceito por gerar_xlsx
+    """
+    colunas = [coluna for coluna in COLUNAS_EXPORTACAO_CHGS if coluna in df.columns]
+    return [("CHGs", colunas, _linhas_chgs(df, colunas))]
+
+def _texto_campo(valor):
+    # Campos de referência do ServiceNow podem vir como {"display_value": ..., "value": ...}
+    if isinstance(valor, dict):
+        valor = valor.get("display_value") or valor.get("value")
+    return "" if valor is None else str(valor)
+
+def _linhas_incidentes(dados_processados):
+    for categoria, rotulo in CATEGORIAS.items():
+        for incident in dados_processados.get(categoria, []):
+            campos = [_texto_campo(incident.get(campo)) for campo in CAMPOS_EXPORTACAO_INCIDENTES.values()]
+            yield [rotulo, *campos, extrair_funcionalidade(incident), extrair_responsavel(incident)]
+
+def abas_incidentes(dados_processados):
+    """
+    Monta a aba de exportação dos incidentes categorizados por processar_json.
+
+    Args:
+        dados_processados (dict): Resultado de processar_json
+
+    Returns:
+        list: Abas no formato aceito por gerar_xlsx
+    """
+    cabecalho = ["Categoria", *CAMPOS_EXPORTACAO_INCIDENTES, "Funcionalidade", "Responsável"]
+    return [("Incidentes", cabecalho, _linhas_incidentes(dados_processados))]
@@ -1,8 +1,14 @@
+import argparse
 import json
 import datetime
 import sys
 import re
 from collections import defaultdict
+from templates_relatorio import compilar, registrar_filtro
+from perfilamento import perfilado
+from arquivo_enviado import como_arquivo_enviado
+from cache_compartilhado import hash_conteudo
+from pipeline import ErroEtapa, Etapa, Pipeline
 
 def formatar_periodo(data_personalizada=None):
     """
@@ -68,6 +74,7 @@ def extrair_responsavel(incident):
     # Retorna o responsável fixo conforme solicitação
     return "QD Sustentação"
 
+@perfilado("processar_json")
 def processar_json(json_data):
     """
     Processa os dados JSON e retorna as informações agrupadas por tipo de incidente.
@@ -107,65 +114,77 @@ def processar_json(json_data):
         "vips": vips
     }
 
-def formatar_texto(texto, max_length=70):
+def carregar_incidentes(arquivo):
     """
-    Formata o texto para não exceder o comprimento máximo.
-    Trunca textos longos e adiciona "..." no final.
+    Etapa do pipeline: lê o JSON de incidentes de um ArquivoEnviado.
+    
+    Raises:
+        ErroEtapa: O conteúdo não é um objeto JSON
     """
-    texto = texto.replace('\r\n', ' ').replace('\n', ' ')
-    if len(texto) <= max_length:
-        return texto
-    return texto[:max_length-3] + "..."
+    with arquivo.abrir() as entrada:
+        try:
+            json_data = json.load(entrada)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            json_data = None
+    if not isinstance(json_data, dict):
+        raise ErroEtapa("O JSON fornecido é inválido.")
+    return json_data
 
-def formatar_lista_funcionalidades(incidentes, prefixo=""):
-    """
-    Formata a lista de funcionalidades incluindo o número do incidente.
-    Cada incidente é mostrado em uma nova linha para maior clareza.
+# Os incidentes categorizados ficam guardados por conteúdo do arquivo; o relatório (que
+# depende da data escolhida) é sempre renderizado a partir deles
+PIPELINE_INCIDENTES = Pipeline("incidentes", [
+    Etapa("carregar", carregar_incidentes, persistir=False, erro="Erro ao ler o JSON"),
+    Etapa("categorizar", processar_json, erro="Erro ao categorizar os incidentes"),
+])
+
+def processar_arquivo_incidentes(origem):
     """
-    if not incidentes:
-        return ""  # Retorna string vazia em vez de "N/A"
+    Lê e categoriza o JSON de incidentes de um arquivo, reaproveitando o resultado do cache
+    do pipeline quando o mesmo conteúdo já foi processado.
     
-    # Formata cada incidente como "NÚMERO - FUNCIONALIDADE" em linhas separadas
-    itens_formatados = []
-    for incidente in incidentes:
-        numero = incidente.get("number", "Número Desconhecido")
-        funcionalidade = extrair_funcionalidade(incidente)
-        item_formatado = f"{numero} - {formatar_texto(funcionalidade)}"
-        itens_formatados.append(item_formatado)
+    Args:
+        origem: Arquivo enviado, ArquivoEnviado ou caminho do JSON
+    
+    Returns:
+        dict: Incidentes separados por categoria (como processar_json)
     
-    # Retorna todos os itens, um por linha
-    return "\n    * " + "\n    * ".join(itens_formatados)
+    Raises:
+        ErroEtapa: JSON inválido ou erro na categorização
+    """
+    arquivo = como_arquivo_enviado(origem)
+    return PIPELINE_INCIDENTES.executar(arquivo, hash_conteudo(arquivo.dados))
 
-def formatar_lista_responsaveis(responsaveis, prefixo=""):
+@registrar_filtro("truncar")
+def formatar_texto(texto, max_length=70):
     """
-    Formata uma lista de responsáveis para exibição.
-    Como temos apenas um responsável fixo, esta função foi simplificada.
+    Formata o texto para não exceder o comprimento máximo.
+    Trunca textos longos e adiciona "..." no final.
     """
-    if not responsaveis:
-        return ""  # Retorna string vazia em vez de "N/A"
-    
-    # Como todos os responsáveis são iguais, pegamos apenas o primeiro
-    return responsaveis[0] if responsaveis else ""
+    texto = texto.replace('\r\n', ' ').replace('\n', ' ')
+    if len(texto) <= max_length:
+        return texto
+    return texto[:max_length-3] + "..."
 
-def formatar_incidentes(incidentes):
+def montar_contexto_incidentes(incidentes):
     """
-    Formata os detalhes dos incidentes para o relatório.
-    Inclui quantidade, funcionalidades afetadas e responsáveis.
+    Monta o contexto de uma categoria de incidentes para o layout do relatório.
+    Inclui quantidade, número e funcionalidade de cada incidente e o responsável.
     """
-    if not incidentes:
-        return "* *Quantidade:* 0\n* *Funcionalidades:*\n* *Responsáveis:*"  # Remove "N/A"
-    
-    # Extrai responsáveis
-    responsaveis = [extrair_responsavel(inc) for inc in incidentes]
-    
-    # Formata a saída
-    quantidade = f"* *Quantidade:* {len(incidentes)}"
-    funcs = f"* *Funcionalidades:* {formatar_lista_funcionalidades(incidentes)}"
-    resps = f"* *Responsáveis:* {formatar_lista_responsaveis(responsaveis)}"
-    
-    return f"{quantidade}\n{funcs}\n{resps}"
+    return {
+        "quantidade": len(incidentes),
+        "itens": [
+            {
+                "numero": incidente.get("number", "Número Desconhecido"),
+                "funcionalidade": extrair_funcionalidade(incidente)
+            }
+            for incidente in incidentes
+        ],
+        # Como todos os responsáveis são iguais, pegamos apenas o primeiro
+        "responsavel": extrair_responsavel(incidentes[0]) if incidentes else ""
+    }
 
-def gerar_relatorio(json_data, data_personalizada=None):
+@perfilado("gerar_relatorio_incidentes")
+def gerar_relatorio(json_data, data_personalizada=None, saida=None, layout="incidentes_qd_apps", dados_processados=None):
     """
     Gera o relatório de incidentes no formato especificado.
     Inclui todas as categorias de incidentes no relatório.
@@ -174,82 +193,126 @@ def gerar_relatorio(json_data, data_personalizada=None):
         json_data (dict): Dados JSON dos incidentes.
         data_personalizada (datetime.date, opcional): Data personalizada para o relatório.
             Se None, usa a data atual.
+        saida (opcional): Objeto com método write onde o relatório será escrito
+            incrementalmente. Se None, o relatório é retornado como string.
+        layout (str): Nome do layout em layouts_relatorio.json.
+        dados_processados (dict, opcional): Resultado de processar_json já calculado;
+            quando informado, json_data não é lido.
     
     Returns:
-        str: O relatório formatado.
+        str: O relatório formatado (None quando saida é informada).
     """
-    dados = processar_json(json_data)
+    dados = dados_processados if dados_processados is not None else processar_json(json_data)
     
-    relatorio = f"""*Relatório de Incidentes QD APPs*
-
-*Período:* {formatar_periodo(data_personalizada)}
-
-*1. Incidentes Críticos*
-{formatar_incidentes(dados["criticos"])}
-
-*2. Incidentes Altos*
-{formatar_incidentes(dados["altos"])}
-
-*3. Incidentes Específicos*
-{formatar_incidentes(dados["especificos"])}
+    contexto = {
+        "periodo": formatar_periodo(data_personalizada),
+        **{categoria: montar_contexto_incidentes(incidentes) for categoria, incidentes in dados.items()}
+    }
+    return compilar(layout).renderizar(contexto, saida)
 
-*4- Incidentes VIPS*
-{formatar_incidentes(dados["vips"])}
+# Códigos de saída da CLI (seguem a convenção de sysexits.h)
+SAIDA_OK = 0
+SAIDA_JSON_INVALIDO = 65
+SAIDA_ARQUIVO_NAO_ENCONTRADO = 66
+SAIDA_ERRO_LEITURA = 74
+SAIDA_ERRO_ESCRITA = 73
+SAIDA_CANCELADO = 130
 
-*Observações*
+def ler_entrada(caminho):
+    """
+    Lê o conteúdo bruto de uma entrada em uma única leitura binária.
+    
+    Args:
+        caminho (str): Caminho do arquivo JSON ou "-" para ler do stdin.
+    
+    Returns:
+        bytes: O conteúdo lido, sem decodificação.
+    """
+    if caminho == "-":
+        return sys.stdin.buffer.read()
+    with open(caminho, "rb") as arquivo:
+        return arquivo.read()
 
-Att.
-Qd Spread
-"""
-    return relatorio
+def carregar_entradas(caminhos):
+    """
+    Carrega e combina os registros de uma ou mais entradas JSON.
+    
+    Args:
+        caminhos (list): Caminhos dos arquivos JSON ("-" representa o stdin).
+    
+    Returns:
+        dict: JSON no formato {"records": [...]} com os registros de todas as entradas.
+    """
+    if len(caminhos) == 1:
+        return json.loads(ler_entrada(caminhos[0]))
+    
+    registros = []
+    for caminho in caminhos:
+        registros.extend(json.loads(ler_entrada(caminho)).get("records", []))
+    return {"records": registros}
 
-def main():
+def main(argv=None):
     """
-    Função principal que processa o arquivo JSON fornecido.
-    Aceita o JSON como arquivo ou entrada direta.
+    Função principal da CLI.
+    Lê o JSON de incidentes de arquivos ou do stdin ("-") e escreve o relatório
+    no stdout ou no arquivo indicado em --saida.
+    
+    Returns:
+        int: Código de saída do processo.
     """
-    if len(sys.argv) > 1:
-        try:
-            # Se um arquivo for fornecido como argumento
-            with open(sys.argv[1], 'r', encoding='utf-8') as file:
-                json_data = json.load(file)
-                print(f"Arquivo carregado: {sys.argv[1]}")
-        except FileNotFoundError:
-            print(f"Erro: O arquivo '{sys.argv[1]}' não foi encontrado.")
-            return
-        except json.JSONDecodeError:
-            print(f"Erro: O arquivo '{sys.argv[1]}' não contém um JSON válido.")
-            return
-    else:
-        # Ler do stdin
-        print("Cole o JSON de incidentes (pressione Enter e Ctrl+D quando terminar):")
-        json_str = ""
-        try:
-            while True:
-                line = input()
-                json_str += line + "\n"
-        except EOFError:
-            pass
-        except KeyboardInterrupt:
-            print("\nOperação cancelada pelo usuário.")
-            return
-        
-        try:
-            json_data = json.loads(json_str)
-        except json.JSONDecodeError:
-            print("Erro: O JSON fornecido é inválido.")
-            return
+    parser = argparse.ArgumentParser(
+        description="Gera o relatório de incidentes QD APPs a partir de JSON exportado."
+    )
+    parser.add_argument(
+        "entradas", nargs="*", default=["-"],
+        help='Arquivos JSON de incidentes. Use "-" para ler do stdin (padrão).'
+    )
+    parser.add_argument(
+        "-o", "--saida", default=None,
+        help='Arquivo onde o relatório será salvo. Se omitido (ou "-"), escreve no stdout.'
+    )
+    args = parser.parse_args(argv)
     
-    # Gera e exibe o relatório
-    relatorio = gerar_relatorio(json_data)
-    print("\n" + relatorio)
+    if "-" in args.entradas and sys.stdin.isatty():
+        print("Cole o JSON de incidentes (pressione Enter e Ctrl+D quando terminar):", file=sys.stderr)
     
-    # Salva em um arquivo
-    nome_arquivo = "relatorio_incidentes.txt"
-    with open(nome_arquivo, "w", encoding="utf-8") as f:
-        f.write(relatorio)
+    try:
+        json_data = carregar_entradas(args.entradas)
+    except FileNotFoundError as e:
+        print(f"Erro: O arquivo '{e.filename}' não foi encontrado.", file=sys.stderr)
+        return SAIDA_ARQUIVO_NAO_ENCONTRADO
+    except OSError as e:
+        # Diretório, arquivo sem permissão de leitura, erro de E/S...
+        print(f"Erro: não foi possível ler '{e.filename}': {e.strerror}", file=sys.stderr)
+        return SAIDA_ERRO_LEITURA
+    except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+        print("Erro: O JSON fornecido é inválido.", file=sys.stderr)
+        return SAIDA_JSON_INVALIDO
+    except KeyboardInterrupt:
+        print("\nOperação cancelada pelo usuário.", file=sys.stderr)
+        return SAIDA_CANCELADO
+    
+    if not isinstance(json_data, dict):
+        print("Erro: O JSON fornecido é inválido.", file=sys.stderr)
+        return SAIDA_JSON_INVALIDO
+    
+    try:
+        if args.saida in (None, "-"):
+            # O stdout pode ter sido substituído (captura em StringIO, wrappers) sem reconfigure
+            if hasattr(sys.stdout, "reconfigure"):
+                sys.stdout.reconfigure(encoding="utf-8")
+            gerar_relatorio(json_data, saida=sys.stdout)
+            sys.stdout.flush()
+        else:
+            with open(args.saida, "w", encoding="utf-8") as arquivo:
+                gerar_relatorio(json_data, saida=arquivo)
+    except OSError as e:
+        print(f"Erro ao escrever o relatório: {e}", file=sys.stderr)
+        return SAIDA_ERRO_ESCRITA
     
-    print(f"Relatório salvo em '{nome_arquivo}'")
+    if args.saida not in (None, "-"):
+        print(f"Relatório salvo em '{args.saida}'", file=sys.stderr)
+    return SAIDA_OK
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
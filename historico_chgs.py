@@ -0,0 +1,351 @@
+import math
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from hashlib import blake2b
+
+import pandas as pd
+
+from logger import registrar_log
+
+# Banco SQLite do histórico de CHGs (uma tabela por mês de início planejado)
+DIRETORIO_HISTORICO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico_chgs")
+ARQUIVO_HISTORICO = "chgs.sqlite3"
+
+# Tempo (ms) que uma conexão espera por outra que está gravando
+ESPERA_BLOQUEIO_MS = 10000
+
+# Período padrão das consultas de tendência
+DIAS_PADRAO = 90
+
+# Colunas da planilha arquivadas e o nome da coluna correspondente no banco
+COLUNAS_HISTORICO = {
+    'Descrição resumida': 'descricao',
+    'Status': 'status',
+    'Tipo de Indisponibilidade': 'tipo_indisponibilidade',
+    'IC Impactado': 'ic',
+    'Grupo de atribuição': 'grupo',
+    'Observação (Time Mudanças)': 'observacao',
+    'Enviar Keep': 'enviar_keep',
+}
+
+# Colunas indexadas em cada partição (sempre com a data, para os filtros por período)
+COLUNAS_INDEXADAS = ('grupo', 'ic', 'tipo_indisponibilidade')
+
+_ESQUEMA_CATALOGO = """
+CREATE TABLE IF NOT EXISTS particoes (
+    nome TEXT PRIMARY KEY,
+    inicio TEXT NOT NULL,
+    fim TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS planilhas (
+    hash TEXT PRIMARY KEY,
+    nome TEXT,
+    arquivada_em TEXT NOT NULL,
+    linhas INTEGER NOT NULL,
+    novas INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versoes_atuais (
+    numero TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    versao TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS versoes_atuais_data ON versoes_atuais(data);
+"""
+
+_ESQUEMA_PARTICAO = """
+CREATE TABLE IF NOT EXISTS {tabela} (
+    data TEXT NOT NULL,
+    numero TEXT NOT NULL,
+    versao TEXT NOT NULL,
+    inicio TEXT NOT NULL,
+    termino TEXT,
+    {colunas},
+    com_indisponibilidade INTEGER NOT NULL,
+    arquivada_em TEXT NOT NULL,
+    PRIMARY KEY (data, numero, versao)
+) WITHOUT ROWID;
+{indices}
+"""
+
+def tem_indisponibilidade(tipo_indisponibilidade):
+    """Indica se o tipo de indisponibilidade da CHG é parcial ou total."""
+    tipo = str(tipo_indisponibilidade).lower()
+    return "indisponibilidade parcial" in tipo or "indisponibilidade total" in tipo
+
+def texto_celula(valor):
+    """Converte o valor de uma célula em texto (vazio para nulos, inteiros sem ".0")."""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+def _nome_particao(data_iso):
+    return f"chgs_{data_iso[:4]}_{data_iso[5:7]}"
+
+class HistoricoChgs:
+    """
+    Arquivo local, somente de acréscimos, das CHGs de todas as planilhas processadas.
+
+    As CHGs ficam em um banco SQLite particionado por mês da data de início planejada
+    (uma tabela por mês, registrada no catálogo "particoes"). Em cada partição a chave
+    é (data, Número, versão): a versão é o hash do conteúdo da linha, então reprocessar
+    a mesma planilha não duplica nada e uma CHG alterada (novo status, novo IC...) ganha
+    uma nova versão sem apagar a anterior.
+
+    A tabela "versoes_atuais" aponta, para cada Número, a (data, versão) da planilha
+    arquivada mais recente. As consultas usam apenas essa versão: uma CHG reagendada
+    conta só na data nova, e uma CHG que volta a um conteúdo já arquivado volta a
+    apontar para a versão antiga.
+
+    Cada partição tem índices por grupo de atribuição, IC e tipo de indisponibilidade.
+    As consultas de um período leem apenas as partições dos meses envolvidos.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_HISTORICO):
+        """
+        Args:
+            diretorio: Pasta onde o banco do histórico é armazenado
+        """
+        self.caminho = os.path.join(diretorio, ARQUIVO_HISTORICO)
+        self._diretorio = diretorio
+        self._lock = threading.Lock()
+        self._versoes_atuais_preenchidas = False
+
+    def _conectar(self):
+        os.makedirs(self._diretorio, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=ESPERA_BLOQUEIO_MS / 1000)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.executescript(_ESQUEMA_CATALOGO)
+        if not self._versoes_atuais_preenchidas:
+            self._preencher_versoes_atuais(conexao)
+            self._versoes_atuais_preenchidas = True
+        return conexao
+
+    def _preencher_versoes_atuais(self, conexao):
+        # Históricos criados antes da tabela versoes_atuais: aponta cada Número para a versão
+        # arquivada por último (uma única vez, em qualquer processo)
+        with conexao:
+            if conexao.execute("SELECT 1 FROM versoes_atuais LIMIT 1").fetchone():
+                return
+            tabelas = [nome for nome, in conexao.execute("SELECT nome FROM particoes")]
+            if not tabelas:
+                return
+            uniao = " UNION ALL ".join(f"SELECT data, numero, versao, arquivada_em FROM {tabela}" for tabela in tabelas)
+            conexao.execute(
+                "INSERT OR IGNORE INTO versoes_atuais SELECT numero, data, versao FROM ("
+                "SELECT *, ROW_NUMBER() OVER (PARTITION BY numero ORDER BY arquivada_em DESC, data DESC) AS ordem "
+                f"FROM ({uniao})) WHERE ordem = 1"
+            )
+
+    def _criar_particao(self, conexao, tabela, data_iso):
+        colunas = ",\n    ".join(f"{coluna} TEXT" for coluna in COLUNAS_HISTORICO.values())
+        indices = "\n".join(
+            f"CREATE INDEX IF NOT EXISTS {tabela}_{coluna} ON {tabela}({coluna}, data);"
+            for coluna in COLUNAS_INDEXADAS
+        )
+        # Comando a comando: executescript confirmaria a transação da gravação em andamento
+        for comando in _ESQUEMA_PARTICAO.format(tabela=tabela, colunas=colunas, indices=indices).split(";"):
+            if comando.strip():
+                conexao.execute(comando)
+        primeiro_dia = date(int(data_iso[:4]), int(data_iso[5:7]), 1)
+        ultimo_dia = (primeiro_dia + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        conexao.execute("INSERT OR IGNORE INTO particoes VALUES (?, ?, ?)",
+                        (tabela, primeiro_dia.isoformat(), ultimo_dia.isoformat()))
+
+    def ja_arquivada(self, hash_planilha):
+        """Indica se a planilha (pelo hash do conteúdo) já foi arquivada."""
+        with closing(self._conectar()) as conexao:
+            return conexao.execute("SELECT 1 FROM planilhas WHERE hash = ?", (hash_planilha,)).fetchone() is not None
+
+    def arquivar(self, df, hash_planilha, nome=None):
+        """
+        Acrescenta ao histórico as CHGs de uma planilha processada.
+
+        Args:
+            df: DataFrame com as colunas das abas CHGs e as datas de início/término já
+                convertidas (linhas sem data de início são ignoradas)
+            hash_planilha: Hash do conteúdo da planilha; planilhas já arquivadas são ignoradas
+            nome: Nome do arquivo, para consulta
+
+        Returns:
+            int: Quantidade de linhas novas (CHGs ou versões ainda não arquivadas)
+        """
+        if self.ja_arquivada(hash_planilha):
+            return 0
+
+        inicio_planejado = pd.to_datetime(df['Data de início planejada'], errors='coerce')
+        validas = inicio_planejado.notna() & df['Número'].notna()
+        df = df[validas]
+        inicio_planejado = inicio_planejado[validas]
+        termino_planejado = pd.to_datetime(df['Data de término planejada'], errors='coerce')
+
+        datas = inicio_planejado.dt.strftime('%Y-%m-%d').tolist()
+        inicios = inicio_planejado.dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+        terminos = termino_planejado.dt.strftime('%Y-%m-%dT%H:%M:%S').fillna("").tolist()
+        numeros = [texto_celula(valor) for valor in df['Número']]
+        colunas = [
+            [texto_celula(valor) for valor in df[coluna]] if coluna in df.columns else [""] * len(df)
+            for coluna in COLUNAS_HISTORICO
+        ]
+        # Com microssegundos, a versão mais recente de uma CHG é sempre a última arquivada
+        arquivada_em = datetime.now().isoformat(timespec="microseconds")
+
+        indice_tipo = 2 + list(COLUNAS_HISTORICO).index('Tipo de Indisponibilidade')
+        particoes = {}
+        atuais = []
+        for i, (data_iso, numero) in enumerate(zip(datas, numeros)):
+            valores = [inicios[i], terminos[i], *(coluna[i] for coluna in colunas)]
+            versao = blake2b("\x1f".join([numero, *valores]).encode("utf-8"), digest_size=8).hexdigest()
+            atuais.append((numero, data_iso, versao))
+            particoes.setdefault(_nome_particao(data_iso), []).append(
+                (data_iso, numero, versao, *valores, int(tem_indisponibilidade(valores[indice_tipo])), arquivada_em)
+            )
+
+        nomes_colunas = ", ".join(["data", "numero", "versao", "inicio", "termino", *COLUNAS_HISTORICO.values(),
+                                   "com_indisponibilidade", "arquivada_em"])
+        marcadores = ", ".join("?" * (len(COLUNAS_HISTORICO) + 7))
+        with self._lock, closing(self._conectar()) as conexao:
+            with conexao:
+                if conexao.execute("SELECT 1 FROM planilhas WHERE hash = ?", (hash_planilha,)).fetchone():
+                    return 0
+                novas = 0
+                for tabela, linhas in particoes.items():
+                    self._criar_particao(conexao, tabela, linhas[0][0])
+                    antes = conexao.total_changes
+                    conexao.executemany(f"INSERT OR IGNORE INTO {tabela} ({nomes_colunas}) VALUES ({marcadores})", linhas)
+                    novas += conexao.total_changes - antes
+                # A versão desta planilha passa a ser a atual, mesmo que já estivesse arquivada
+                conexao.executemany(
+                    "INSERT INTO versoes_atuais VALUES (?, ?, ?) "
+                    "ON CONFLICT(numero) DO UPDATE SET data = excluded.data, versao = excluded.versao",
+                    atuais
+                )
+                conexao.execute("INSERT INTO planilhas VALUES (?, ?, ?, ?, ?)",
+                                (hash_planilha, nome, arquivada_em, len(datas), novas))
+        registrar_log(f"Histórico de CHGs: {nome or hash_planilha[:12]} arquivada, "
+                      f"{len(datas)} linhas ({novas} novas) em {len(particoes)} partição(ões)", "info")
+        return novas
+
+    def _tabelas(self, conexao, inicio, fim):
+        # O catálogo é lido a cada consulta: outros processos (API) podem ter criado partições
+        return [nome for nome, in conexao.execute(
+            "SELECT nome FROM particoes WHERE inicio <= ? AND fim >= ? ORDER BY inicio", (fim, inicio)
+        )]
+
+    def _sql_atuais(self, conexao, inicio, fim, filtros):
+        """
+        Monta a CTE "atuais": a versão atual das CHGs cuja data (nessa versão) está no período,
+        filtrada pelos valores dessa versão.
+
+        Returns:
+            tuple: (SQL "WITH atuais AS (...) ", parâmetros)
+        """
+        filtros = {coluna: valor for coluna, valor in (filtros or {}).items() if valor}
+        tabelas = self._tabelas(conexao, inicio, fim)
+        if not tabelas:
+            # Sem partições no período: consulta uma tabela vazia para manter as colunas
+            uniao = ("SELECT NULL AS data, NULL AS numero, NULL AS versao, NULL AS inicio, NULL AS termino, "
+                     + ", ".join(f"NULL AS {coluna}" for coluna in COLUNAS_HISTORICO.values())
+                     + ", 0 AS com_indisponibilidade, NULL AS arquivada_em LIMIT 0")
+            return f"WITH atuais AS ({uniao}) ", []
+        uniao = " UNION ALL ".join(
+            f"SELECT {tabela}.* FROM versoes_atuais JOIN {tabela} USING (data, numero, versao) "
+            "WHERE versoes_atuais.data BETWEEN ? AND ?"
+            for tabela in tabelas
+        )
+        # Os filtros ficam fora das partições: valem para a versão atual, não para versões antigas
+        condicoes = " AND ".join(f"{coluna} = ?" for coluna in filtros)
+        sql = f"WITH atuais AS (SELECT * FROM ({uniao}){' WHERE ' + condicoes if condicoes else ''}) "
+        return sql, [*[inicio, fim] * len(tabelas), *filtros.values()]
+
+    def consultar(self, consulta, inicio, fim, filtros=None, parametros=()):
+        """
+        Executa uma consulta sobre a versão atual das CHGs do período.
+
+        Args:
+            consulta: SQL que lê da tabela "atuais" (com as colunas das partições)
+            inicio: Primeira data (date ou YYYY-MM-DD)
+            fim: Última data (date ou YYYY-MM-DD)
+            filtros: Dicionário {coluna indexada: valor} aplicado à versão atual (opcional)
+            parametros: Parâmetros adicionais da consulta
+
+        Returns:
+            DataFrame: Resultado da consulta
+        """
+        with closing(self._conectar()) as conexao:
+            sql, parametros_atuais = self._sql_atuais(conexao, str(inicio), str(fim), filtros)
+            return pd.read_sql_query(sql + consulta, conexao, params=[*parametros_atuais, *parametros])
+
+    def indisponibilidade_por_ic(self, inicio, fim, grupo=None):
+        """CHGs com indisponibilidade (parcial ou total) por IC no período, com o total de CHGs do IC."""
+        return self.consultar(
+            "SELECT ic AS 'IC Impactado', SUM(com_indisponibilidade) AS 'Com indisponibilidade', "
+            "COUNT(*) AS 'Total de CHGs', MAX(data) AS 'Última CHG' FROM atuais GROUP BY ic "
+            "HAVING SUM(com_indisponibilidade) > 0 ORDER BY 2 DESC, 3 DESC",
+            inicio, fim, {"grupo": grupo}
+        )
+
+    def chgs_por_grupo(self, inicio, fim, ic=None):
+        """CHGs por grupo de atribuição no período."""
+        return self.consultar(
+            "SELECT grupo AS 'Grupo de atribuição', COUNT(*) AS 'Total de CHGs', "
+            "SUM(com_indisponibilidade) AS 'Com indisponibilidade', COUNT(DISTINCT ic) AS 'ICs' "
+            "FROM atuais GROUP BY grupo ORDER BY 2 DESC",
+            inicio, fim, {"ic": ic}
+        )
+
+    def chgs_por_dia(self, inicio, fim, ic=None, grupo=None):
+        """CHGs por dia de início planejado no período."""
+        return self.consultar(
+            "SELECT data AS 'Data', COUNT(*) AS 'Total de CHGs', SUM(com_indisponibilidade) AS 'Com indisponibilidade' "
+            "FROM atuais GROUP BY data ORDER BY data",
+            inicio, fim, {"ic": ic, "grupo": grupo}
+        )
+
+    def buscar_chgs(self, inicio, fim, ic=None, grupo=None, tipo_indisponibilidade=None, limite=1000):
+        """CHGs do período (versão atual), das mais recentes para as mais antigas."""
+        return self.consultar(
+            "SELECT numero AS 'Número', inicio AS 'Início planejado', termino AS 'Término planejado', "
+            "descricao AS 'Descrição resumida', status AS 'Status', tipo_indisponibilidade AS 'Tipo de Indisponibilidade', "
+            "ic AS 'IC Impactado', grupo AS 'Grupo de atribuição' FROM atuais ORDER BY inicio DESC LIMIT ?",
+            inicio, fim, {"ic": ic, "grupo": grupo, "tipo_indisponibilidade": tipo_indisponibilidade}, (limite,)
+        )
+
+    def valores_distintos(self, coluna, inicio, fim):
+        """Valores distintos de uma coluna indexada na versão atual das CHGs do período (para os filtros da tela)."""
+        if coluna not in COLUNAS_INDEXADAS:
+            raise Exception(f"Coluna sem índice no histórico: {coluna}")
+        with closing(self._conectar()) as conexao:
+            sql, parametros = self._sql_atuais(conexao, str(inicio), str(fim), None)
+            valores = [valor for valor, in conexao.execute(f"{sql}SELECT DISTINCT {coluna} FROM atuais", parametros)]
+        return sorted(valor for valor in valores if valor)
+
+    def resumo(self):
+        """
+        Returns:
+            dict: Quantidade de planilhas arquivadas, de linhas e período coberto
+        """
+        with closing(self._conectar()) as conexao:
+            planilhas, linhas = conexao.execute("SELECT COUNT(*), COALESCE(SUM(novas), 0) FROM planilhas").fetchone()
+            tabelas = [nome for nome, in conexao.execute("SELECT nome FROM particoes ORDER BY inicio")]
+            inicio = fim = None
+            if tabelas:
+                inicio = conexao.execute(f"SELECT MIN(data) FROM {tabelas[0]}").fetchone()[0]
+                fim = conexao.execute(f"SELECT MAX(data) FROM {tabelas[-1]}").fetchone()[0]
+        return {"planilhas": planilhas, "linhas": linhas, "particoes": len(tabelas), "inicio": inicio, "fim": fim}
+
+_historico = None
+_historico_lock = threading.Lock()
+
+def obter_historico():
+    """Retorna o histórico de CHGs do processo, criando-o na primeira chamada."""
+    global _historico
+    with _historico_lock:
+        if _historico is None:
+            _historico = HistoricoChgs()
+        return _historico
@@ -0,0 +1,120 @@
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+from pytz import timezone
+
+from chg_processor import processar_dados
+from historico_chgs import DIAS_PADRAO, obter_historico
+
+PERIODOS = {"7 dias": 7, "30 dias": 30, "90 dias": DIAS_PADRAO, "180 dias": 180, "365 dias": 365}
+
+def arquivar_planilhas(arquivos):
+    """Processa planilhas antigas apenas para incluí-las no histórico."""
+    mensagens = []
+    for arquivo in arquivos:
+        processar_dados(arquivo, notificar_erro=lambda mensagem, nome=arquivo.name: mensagens.append(f"{nome}: {mensagem}"))
+    return mensagens
+
+def render_historico_page():
+    """
+    Renderiza a página do histórico de CHGs no Streamlit.
+
+    Esta função é responsável por:
+    1. Exibir o resumo do histórico (planilhas arquivadas e período coberto)
+    2. Consultar as tendências do período escolhido (indisponibilidade por IC, grupos, dias)
+    3. Permitir incluir no histórico planilhas processadas antes da criação dele
+    """
+    st.markdown("""
+        <div style="background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
+            <h2 style="color: #1f61d9; margin-bottom: 20px;">🗂️ Histórico de CHGs</h2>
+        </div>
+    """, unsafe_allow_html=True)
+
+    historico = obter_historico()
+    resumo = historico.resumo()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Planilhas arquivadas", resumo["planilhas"])
+    col2.metric("CHGs arquivadas", resumo["linhas"])
+    col3.metric(
+        "Período coberto",
+        f"{datetime.fromisoformat(resumo['inicio']):%d/%m/%Y} a {datetime.fromisoformat(resumo['fim']):%d/%m/%Y}"
+        if resumo["inicio"] else "-"
+    )
+
+    with st.expander("Arquivar planilhas anteriores"):
+        st.caption("Toda planilha processada no Gerador de Keep CHGs entra no histórico automaticamente. "
+                   "Use esta opção para incluir planilhas antigas.")
+        antigas = st.file_uploader(
+            "Planilhas de CHGs (XLSX ou ODS)",
+            type=["xlsx", "ods"],
+            accept_multiple_files=True,
+            key="historico_uploader"
+        )
+        if antigas and st.button("Arquivar", type="primary"):
+            with st.spinner("Arquivando planilhas..."):
+                mensagens = arquivar_planilhas(antigas)
+            for mensagem in mensagens:
+                st.error(mensagem)
+            st.rerun()
+
+    if not resumo["planilhas"]:
+        st.markdown("""
+            <div class="warning-message">
+                ⚠️ O histórico ainda está vazio. Processe uma planilha de CHGs para começar.
+            </div>
+        """, unsafe_allow_html=True)
+        return
+
+    # Filtros do período (a data final é hoje, ou a última data arquivada se for anterior)
+    col_periodo, col_ic, col_grupo = st.columns([1, 2, 2])
+    with col_periodo:
+        periodo = st.selectbox("Período", list(PERIODOS), index=list(PERIODOS).index("90 dias"))
+    hoje = datetime.now(timezone('America/Sao_Paulo')).date()
+    fim = max(hoje, datetime.fromisoformat(resumo["fim"]).date())
+    inicio = fim - timedelta(days=PERIODOS[periodo] - 1)
+    with col_ic:
+        ic = st.selectbox("IC Impactado", [""] + historico.valores_distintos("ic", inicio, fim),
+                          format_func=lambda valor: valor or "Todos")
+    with col_grupo:
+        grupo = st.selectbox("Grupo de atribuição", [""] + historico.valores_distintos("grupo", inicio, fim),
+                             format_func=lambda valor: valor or "Todos")
+
+    abas = st.tabs(["Indisponibilidade por IC", "Por grupo", "Por dia", "CHGs"])
+
+    with abas[0]:
+        consulta_inicio = time.perf_counter()
+        df_ic = historico.indisponibilidade_por_ic(inicio, fim, grupo=grupo)
+        if ic:
+            df_ic = df_ic[df_ic["IC Impactado"] == ic]
+        st.caption(f"CHGs com indisponibilidade parcial ou total por IC, de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} "
+                   f"({(time.perf_counter() - consulta_inicio) * 1000:.0f} ms)")
+        if df_ic.empty:
+            st.info("Nenhuma CHG com indisponibilidade no período.")
+        else:
+            st.bar_chart(df_ic.head(20), x="IC Impactado", y="Com indisponibilidade")
+            st.dataframe(df_ic, hide_index=True, use_container_width=True)
+
+    with abas[1]:
+        consulta_inicio = time.perf_counter()
+        df_grupo = historico.chgs_por_grupo(inicio, fim, ic=ic)
+        if grupo:
+            df_grupo = df_grupo[df_grupo["Grupo de atribuição"] == grupo]
+        st.caption(f"CHGs por grupo de atribuição ({(time.perf_counter() - consulta_inicio) * 1000:.0f} ms)")
+        st.dataframe(df_grupo, hide_index=True, use_container_width=True)
+
+    with abas[2]:
+        consulta_inicio = time.perf_counter()
+        df_dia = historico.chgs_por_dia(inicio, fim, ic=ic, grupo=grupo)
+        st.caption(f"CHGs por dia de início planejado ({(time.perf_counter() - consulta_inicio) * 1000:.0f} ms)")
+        if not df_dia.empty:
+            st.line_chart(df_dia, x="Data", y=["Total de CHGs", "Com indisponibilidade"])
+        st.dataframe(df_dia, hide_index=True, use_container_width=True)
+
+    with abas[3]:
+        consulta_inicio = time.perf_counter()
+        df_chgs = historico.buscar_chgs(inicio, fim, ic=ic, grupo=grupo)
+        st.caption(f"{len(df_chgs)} CHGs mais recentes do período, versão mais recente de cada uma "
+                   f"({(time.perf_counter() - consulta_inicio) * 1000:.0f} ms)")
+        st.dataframe(df_chgs, hide_index=True, use_container_width=True)
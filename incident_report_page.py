@@ -1,12 +1,18 @@
 import streamlit as st
-import json
 import traceback
 from datetime import datetime
 from pytz import timezone
 import pandas as pd
-from gera_relatorio import gerar_relatorio, processar_json
+from gera_relatorio import gerar_relatorio, processar_arquivo_incidentes
+from analise_incidentes import agregar_incidentes
 from logger import registrar_log
 
+def planilha_incidentes(dados_processados):
+    """Gera o XLSX dos incidentes categorizados; chamada pelo Streamlit apenas quando o download é pedido."""
+    # Importado aqui: a exportação depende do openpyxl, que a página inicial não precisa carregar
+    from exportacao_xlsx import abas_incidentes, gerar_xlsx
+    return b"".join(gerar_xlsx(abas_incidentes(dados_processados)))
+
 def render_incident_report_page():
     """
     Renderiza a página de relatório de incidentes no Streamlit.
@@ -73,9 +79,9 @@ def render_incident_report_page():
             if st.button("Processar JSON e Gerar Relatório", type="primary", use_container_width=True):
                 try:
                     with st.spinner('Processando arquivo JSON...'):
-                        # Carregar e processar o JSON
-                        json_content = uploaded_json.getvalue().decode('utf-8')
-                        json_data = json.loads(json_content)
+                        # Carregar e categorizar o JSON (reaproveitado do cache do pipeline
+                        # quando o mesmo arquivo já foi enviado)
+                        dados_processados = processar_arquivo_incidentes(uploaded_json)
                         
                         # Preparar a data para o relatório
                         data_para_relatorio = None
@@ -83,7 +89,7 @@ def render_incident_report_page():
                             data_para_relatorio = data_customizada
                         
                         # Gerar o relatório usando as funções do gera_relatorio.py
-                        relatorio = gerar_relatorio(json_data, data_para_relatorio)
+                        relatorio = gerar_relatorio(None, data_para_relatorio, dados_processados=dados_processados)
                         
                         # Feedback de sucesso
                         st.markdown(f"""
@@ -108,12 +114,19 @@ def render_incident_report_page():
                                     </p>
                                 </div>
                             """, unsafe_allow_html=True)
+                            
+                            # O resultado só existe nesta execução do botão, então o download
+                            # não pode provocar um novo rerun da página
+                            st.download_button(
+                                "📊 Baixar Incidentes (XLSX)",
+                                lambda: planilha_incidentes(dados_processados),
+                                "Incidentes.xlsx",
+                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                on_click="ignore"
+                            )
                         
                         # Aba de estatísticas e detalhes
                         with preview_tabs[1]:
-                            # Processar os dados para estatísticas
-                            dados_processados = processar_json(json_data)
-                            
                             # Calcular estatísticas
                             st.subheader("Contagem de Incidentes")
                             estatisticas = {
@@ -131,6 +144,19 @@ def render_incident_report_page():
                             st.table(pd.DataFrame(list(estatisticas.items()), 
                                                  columns=["Categoria", "Quantidade"]).set_index("Categoria"))
                             
+                            # Agregações por campo e por hora de abertura
+                            analise = agregar_incidentes(dados_processados)
+                            
+                            st.subheader("Incidentes por Hora de Abertura")
+                            st.bar_chart(analise["por_hora"])
+                            
+                            st.subheader("Mais Frequentes")
+                            cols_top = st.columns(2)
+                            for i, (rotulo, df_top) in enumerate(analise["top"].items()):
+                                with cols_top[i % 2]:
+                                    st.markdown(f"**{rotulo}**")
+                                    st.dataframe(df_top, hide_index=True, use_container_width=True)
+                            
                             # Mostrar exemplos de cada categoria
                             if dados_processados["criticos"]:
                                 with st.expander("Ver detalhes dos Incidentes Críticos"):
@@ -0,0 +1,180 @@
+import json
+import math
+import os
+import re
+from array import array
+from datetime import date, datetime
+from hashlib import blake2b
+
+from logger import registrar_log
+
+# Pasta onde ficam os índices das abas do arquivo diário (um par .idx/.json por aba)
+DIRETORIO_INDICES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "indices_diario")
+
+# Sufixo que a página de testes acrescenta ao nome do arquivo baixado
+SUFIXO_ATUALIZADO = "_atualizado"
+
+_RE_NOME_INVALIDO = re.compile(r"[^\w.-]+")
+
+def normalizar_valor(valor):
+    """Converte o valor de uma célula para a forma textual usada no hash da linha."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float):
+        if math.isnan(valor):
+            return ""
+        if valor.is_integer():
+            return str(int(valor))
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime('%d/%m/%Y')
+    return str(valor).strip()
+
+def hash_registro(valores):
+    """
+    Calcula o hash (64 bits) de um registro a partir dos valores das colunas chave.
+
+    Args:
+        valores: Valores das colunas chave, na ordem das colunas chave
+
+    Returns:
+        int: Hash do registro
+    """
+    texto = "\x1f".join(normalizar_valor(valor) for valor in valores)
+    return int.from_bytes(blake2b(texto.encode("utf-8"), digest_size=8).digest(), "little")
+
+class IndiceDiario:
+    """
+    Índice persistente com os hashes das linhas já gravadas em uma aba do arquivo diário.
+
+    Os hashes ficam em um arquivo binário (.idx) que só recebe acréscimos a cada
+    anexação; os metadados (.json) guardam as colunas chave e a assinatura da última
+    linha do arquivo (número e hash), usada para detectar se o arquivo diário foi
+    alterado fora da ferramenta. Nesse caso o índice é reconstruído a partir da aba.
+    """
+
+    def __init__(self, nome_diario, nome_aba, diretorio=DIRETORIO_INDICES):
+        """
+        Args:
+            nome_diario: Nome do arquivo diário (o sufixo "_atualizado" é ignorado)
+            nome_aba: Nome da aba indexada
+            diretorio: Pasta onde o índice é armazenado
+        """
+        base = os.path.splitext(os.path.basename(nome_diario))[0]
+        while base.endswith(SUFIXO_ATUALIZADO):
+            base = base[:-len(SUFIXO_ATUALIZADO)]
+        chave = _RE_NOME_INVALIDO.sub("_", f"{base}__{nome_aba}")
+        self.caminho_hashes = os.path.join(diretorio, chave + ".idx")
+        self.caminho_metadados = os.path.join(diretorio, chave + ".json")
+        self.hashes = set()
+        self.metadados = {}
+        self._carregar()
+
+    def _carregar(self):
+        try:
+            with open(self.caminho_metadados, "r", encoding="utf-8") as arquivo:
+                metadados = json.load(arquivo)
+            hashes = array("Q")
+            with open(self.caminho_hashes, "rb") as arquivo:
+                # Hashes além do total registrado (gravação interrompida) são descartados
+                hashes.frombytes(arquivo.read(metadados["total"] * hashes.itemsize))
+            if len(hashes) != metadados["total"]:
+                raise ValueError("Arquivo de hashes incompleto")
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            registrar_log(f"Índice do arquivo diário inválido, será reconstruído: {str(e)}", "aviso")
+            return
+        self.hashes = set(hashes)
+        self.metadados = metadados
+
+    def valido(self, colunas_chave, ultima_linha, valores_ultima_linha):
+        """
+        Verifica se o índice corresponde ao estado atual da aba.
+
+        Args:
+            colunas_chave: Colunas usadas no hash, na ordem
+            ultima_linha: Número da última linha com dados da aba
+            valores_ultima_linha: Valores das colunas chave da última linha
+
+        Returns:
+            bool: True se o índice pode ser usado sem reler a aba
+        """
+        return (
+            self.metadados.get("colunas") == list(colunas_chave)
+            and self.metadados.get("ultima_linha") == ultima_linha
+            and self.metadados.get("assinatura") == hash_registro(valores_ultima_linha)
+        )
+
+    def reconstruir(self, colunas_chave, linhas, ultima_linha, valores_ultima_linha):
+        """
+        Recria o índice a partir de todas as linhas da aba.
+
+        Args:
+            colunas_chave: Colunas usadas no hash, na ordem
+            linhas: Iterável com os valores das colunas chave de cada linha existente
+            ultima_linha: Número da última linha com dados da aba
+            valores_ultima_linha: Valores das colunas chave da última linha
+        """
+        self.hashes = {
+            hash_registro(valores) for valores in linhas
+            if any(normalizar_valor(valor) for valor in valores)
+        }
+        registrar_log(f"Índice do arquivo diário reconstruído: {len(self.hashes)} registros", "info")
+        self._salvar(colunas_chave, array("Q", self.hashes), "wb", ultima_linha, valores_ultima_linha)
+
+    def filtrar(self, registros):
+        """
+        Separa os registros que ainda não existem na aba.
+        Registros repetidos dentro do próprio lote também são descartados.
+
+        Args:
+            registros: Iterável com os valores das colunas chave de cada registro novo
+
+        Returns:
+            tuple: (lista de booleanos indicando os registros novos, hashes dos registros novos)
+        """
+        vistos = set()
+        manter = []
+        novos = []
+        for valores in registros:
+            chave = hash_registro(valores)
+            novo = chave not in self.hashes and chave not in vistos
+            if novo:
+                vistos.add(chave)
+                novos.append(chave)
+            manter.append(novo)
+        return manter, novos
+
+    def registrar(self, colunas_chave, hashes, ultima_linha, valores_ultima_linha):
+        """
+        Acrescenta ao índice os hashes das linhas anexadas.
+
+        Args:
+            colunas_chave: Colunas usadas no hash, na ordem
+            hashes: Hashes das linhas anexadas
+            ultima_linha: Número da última linha com dados após a anexação
+            valores_ultima_linha: Valores das colunas chave da nova última linha
+        """
+        self.hashes.update(hashes)
+        self._salvar(colunas_chave, array("Q", hashes), "ab", ultima_linha, valores_ultima_linha)
+
+    def _salvar(self, colunas_chave, hashes, modo, ultima_linha, valores_ultima_linha):
+        try:
+            os.makedirs(os.path.dirname(self.caminho_hashes), exist_ok=True)
+            with open(self.caminho_hashes, modo) as arquivo:
+                if modo == "ab":
+                    # Descarta hashes gravados além do total registrado
+                    arquivo.truncate(self.metadados.get("total", 0) * hashes.itemsize)
+                arquivo.write(hashes.tobytes())
+            self.metadados = {
+                "colunas": list(colunas_chave),
+                "ultima_linha": ultima_linha,
+                "assinatura": hash_registro(valores_ultima_linha),
+                "total": len(self.hashes),
+            }
+            temporario = self.caminho_metadados + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                json.dump(self.metadados, arquivo)
+            os.replace(temporario, self.caminho_metadados)
+        except OSError as e:
+            registrar_log(f"Não foi possível gravar o índice do arquivo diário: {str(e)}", "aviso")
@@ -0,0 +1,360 @@
+import math
+import zipfile
+from xml.parsers import expat
+
+import pandas as pd
+
+from leitor_xlsx import LeitorPlanilha, PlanilhaIncompativel
+
+MIMETYPE_ODS = b"application/vnd.oasis.opendocument.spreadsheet"
+
+NS_OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+NS_TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+NS_TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+# O expat é criado com namespace_separator="}", então os nomes chegam como "{uri}nome" sem a "{" inicial
+_TAG_TABLE = f"{NS_TABLE}}}table"
+_TAG_ROW = f"{NS_TABLE}}}table-row"
+_TAG_CELL = f"{NS_TABLE}}}table-cell"
+_TAG_COVERED = f"{NS_TABLE}}}covered-table-cell"
+_TAG_ANNOTATION = f"{NS_OFFICE}}}annotation"
+_TAG_S = f"{NS_TEXT}}}s"
+_ATTR_NAME = f"{NS_TABLE}}}name"
+_ATTR_ROWS_REPEATED = f"{NS_TABLE}}}number-rows-repeated"
+_ATTR_COLUMNS_REPEATED = f"{NS_TABLE}}}number-columns-repeated"
+_ATTR_VALUE_TYPE = f"{NS_OFFICE}}}value-type"
+_ATTR_VALUE = f"{NS_OFFICE}}}value"
+_ATTR_DATE_VALUE = f"{NS_OFFICE}}}date-value"
+_ATTR_C = f"{NS_TEXT}}}c"
+
+# Tamanho dos blocos do content.xml entregues ao expat quando a leitura começa no meio do arquivo
+TAMANHO_BLOCO = 1024 * 1024
+
+class _FimLeitura(Exception):
+    """Interrompe o expat quando a aba pedida (ou o número de linhas pedido) já foi lido."""
+
+def eh_ods(arquivo):
+    """
+    Verifica pelo conteúdo se o arquivo é uma planilha OpenDocument (.ods).
+
+    Args:
+        arquivo: Caminho ou arquivo binário com posicionamento (seek)
+
+    Returns:
+        bool: True se o pacote declara o mimetype de planilha ODS
+    """
+    try:
+        with zipfile.ZipFile(arquivo) as zin:
+            return zin.read("mimetype").strip() == MIMETYPE_ODS
+    except (zipfile.BadZipFile, KeyError):
+        return False
+    finally:
+        if hasattr(arquivo, "seek"):
+            arquivo.seek(0)
+
+class LeitorOds(LeitorPlanilha):
+    """
+    Leitor de abas ODS em streaming, sem o DOM do odfpy.
+
+    O content.xml é percorrido com o expat e as repetições de células e de linhas
+    (number-columns-repeated e number-rows-repeated) só são expandidas quando há algum
+    valor depois delas, de modo que as linhas e colunas vazias repetidas até o fim da aba
+    (comuns em arquivos do LibreOffice) não custam nada. Os valores recebem as mesmas
+    conversões do pd.read_excel(engine="odf") e são tipados pelo mesmo parser do pandas.
+
+    Se o arquivo tiver uma estrutura que o leitor não reconhece, a leitura passa a usar
+    pd.ExcelFile (odf) a partir do mesmo arquivo.
+    """
+
+    ENGINE = "odf"
+    ERROS_LEITURA = LeitorPlanilha.ERROS_LEITURA + (expat.ExpatError,)
+
+    def __init__(self, arquivo):
+        """
+        Args:
+            arquivo: Caminho ou arquivo binário com posicionamento (seek) do ODS
+        """
+        super().__init__(arquivo)
+        self._zin = None
+        self._abas = None
+        # Posições (em bytes do content.xml descompactado) já vistas: início da primeira aba
+        # e início/fim de cada aba, para que a leitura de outra aba não percorra as anteriores
+        self._prefixo = None
+        self._inicios = {}
+        self._fins = {}
+        self._parser = None
+        self._salto = None
+        try:
+            self._zin = zipfile.ZipFile(arquivo)
+            if self._zin.read("mimetype").strip() != MIMETYPE_ODS:
+                raise PlanilhaIncompativel("O arquivo não é uma planilha ODS")
+        except (zipfile.BadZipFile,) + self.ERROS_LEITURA as e:
+            self._usar_pandas(e)
+
+    def _percorrer(self, inicio, fim=None, texto=None, nome_aba=None):
+        """
+        Percorre o content.xml com os manipuladores do expat informados.
+
+        Quando nome_aba é informado e a posição dela (ou de uma aba anterior) já é conhecida,
+        o expat recebe o início do documento até a primeira aba, que abre os elementos que
+        contêm as abas, seguido do conteúdo a partir daquela posição; o trecho intermediário
+        é apenas descompactado.
+        """
+        parser = expat.ParserCreate(namespace_separator="}")
+        parser.buffer_text = True
+        parser.StartElementHandler = inicio
+        if fim is not None:
+            parser.EndElementHandler = fim
+        if texto is not None:
+            parser.CharacterDataHandler = texto
+        retomada = self._ponto_de_retomada(nome_aba)
+        self._parser = parser
+        self._salto = None
+        with self._zin.open("content.xml") as arquivo:
+            try:
+                if retomada is None:
+                    parser.ParseFile(arquivo)
+                else:
+                    self._alimentar_a_partir(parser, arquivo, *retomada)
+            except _FimLeitura:
+                pass
+            finally:
+                self._parser = None
+
+    def _ponto_de_retomada(self, nome_aba):
+        """Retorna (posição, após a tag de fim) de onde a leitura da aba pode começar, ou None."""
+        if nome_aba is None or self._prefixo is None:
+            return None
+        if nome_aba in self._inicios:
+            return self._inicios[nome_aba], False
+        # Aba ainda não vista: ela só pode estar depois das já vistas
+        pontos = [(posicao, False) for posicao in self._inicios.values()]
+        pontos += [(posicao, True) for posicao in self._fins.values()]
+        return max(pontos)
+
+    def _alimentar_a_partir(self, parser, arquivo, posicao, apos_tag):
+        restante = self._prefixo
+        while restante > 0:
+            bloco = arquivo.read(min(restante, TAMANHO_BLOCO))
+            if not bloco:
+                break
+            parser.Parse(bloco, False)
+            restante -= len(bloco)
+        restante = posicao - self._prefixo
+        while restante > 0:
+            bloco = arquivo.read(min(restante, TAMANHO_BLOCO))
+            if not bloco:
+                break
+            restante -= len(bloco)
+
+        bloco = arquivo.read(TAMANHO_BLOCO)
+        if apos_tag:
+            # A posição é o início de </table:table>: o conteúdo segue após o fim da tag
+            while bloco and b">" not in bloco:
+                posicao += len(bloco)
+                bloco = arquivo.read(TAMANHO_BLOCO)
+            fim_tag = bloco.find(b">") + 1
+            posicao += fim_tag
+            bloco = bloco[fim_tag:]
+
+        self._salto = (self._prefixo, posicao)
+        while bloco:
+            parser.Parse(bloco, False)
+            bloco = arquivo.read(TAMANHO_BLOCO)
+        parser.Parse(b"", True)
+
+    def _posicao_atual(self):
+        """Posição do evento atual no content.xml, descontando o trecho não entregue ao expat."""
+        indice = self._parser.CurrentByteIndex
+        if self._salto is not None and indice >= self._salto[0]:
+            return self._salto[1] + indice - self._salto[0]
+        return indice
+
+    def _registrar_inicio_aba(self, nome):
+        posicao = self._posicao_atual()
+        if self._prefixo is None:
+            self._prefixo = posicao
+        self._inicios.setdefault(nome, posicao)
+
+    def _registrar_fim_aba(self, nome):
+        self._fins.setdefault(nome, self._posicao_atual())
+
+    def _nomes_abas(self):
+        if self._abas is None:
+            nomes = []
+            abertas = []  # Nomes das tabelas abertas (mais de uma quando há tabela dentro de célula)
+
+            def inicio(tag, atributos):
+                if tag == _TAG_TABLE:
+                    nomes.append(atributos.get(_ATTR_NAME))
+                    abertas.append(nomes[-1])
+                    if len(abertas) == 1:
+                        self._registrar_inicio_aba(nomes[-1])
+
+            def fim(tag):
+                if tag == _TAG_TABLE:
+                    nome = abertas.pop()
+                    if not abertas:
+                        self._registrar_fim_aba(nome)
+
+            self._percorrer(inicio, fim)
+            self._abas = nomes
+        return list(self._abas)
+
+    def _ler_linhas(self, nome_aba, mapa, ultima_linha=None):
+        linhas = []
+        vazia = [""] * len(mapa) if mapa is not None else []
+        estado = {
+            "tabelas": 0,          # Profundidade de table:table (tabelas dentro de células não são suportadas)
+            "na_aba": False,
+            "encontrada": False,
+            "linhas_vazias": 0,    # Linhas vazias ainda não gravadas (só entram se houver valor depois)
+            "largura": 0,
+        }
+        linha = {}
+        celula = {}
+
+        def inicio(tag, atributos):
+            if tag == _TAG_TABLE:
+                estado["tabelas"] += 1
+                if estado["tabelas"] > 1:
+                    if estado["na_aba"]:
+                        raise PlanilhaIncompativel("Tabela dentro de célula")
+                    return
+                estado["nome"] = atributos.get(_ATTR_NAME)
+                self._registrar_inicio_aba(estado["nome"])
+                if nome_aba is None or estado["nome"] == nome_aba:
+                    estado["na_aba"] = estado["encontrada"] = True
+                return
+            if not estado["na_aba"]:
+                return
+            if tag == _TAG_ROW:
+                linha.clear()
+                linha["repetir"] = int(atributos.get(_ATTR_ROWS_REPEATED, 1))
+                linha["valores"] = [] if mapa is None else list(vazia)
+                linha["coluna"] = 1          # Próxima coluna (1-based)
+                linha["celulas_vazias"] = 0  # Células vazias ainda não gravadas (modo com todas as colunas)
+                linha["tem_valor"] = False
+            elif tag == _TAG_CELL or tag == _TAG_COVERED:
+                celula.clear()
+                celula["coberta"] = tag == _TAG_COVERED
+                celula["repetir"] = int(atributos.get(_ATTR_COLUMNS_REPEATED, 1))
+                celula["tipo"] = atributos.get(_ATTR_VALUE_TYPE)
+                celula["valor"] = atributos.get(_ATTR_VALUE)
+                celula["data"] = atributos.get(_ATTR_DATE_VALUE)
+                celula["texto"] = []      # Todo o texto, como str() do odfpy
+                celula["string"] = []     # Texto sem anotações e com os espaços de <text:s>
+                celula["pendente"] = []   # Trecho de texto entre duas tags
+                celula["anotacao"] = 0
+            elif "texto" in celula:
+                descarregar_texto()
+                if tag == _TAG_ANNOTATION:
+                    celula["anotacao"] += 1
+                elif tag == _TAG_S and not celula["anotacao"]:
+                    celula["string"].append(" " * int(atributos.get(_ATTR_C, 1)))
+
+        def texto(dados):
+            if "texto" in celula:
+                celula["pendente"].append(dados)
+
+        def descarregar_texto():
+            # Como no odfpy, o texto entre duas tags forma um único nó; no valor da string
+            # (fora das anotações) cada nó perde as quebras de linha das pontas, como no pandas
+            if celula["pendente"]:
+                trecho = "".join(celula["pendente"])
+                celula["pendente"].clear()
+                celula["texto"].append(trecho)
+                if not celula["anotacao"]:
+                    celula["string"].append(trecho.strip("\n"))
+
+        def fim(tag):
+            if tag == _TAG_TABLE:
+                estado["tabelas"] -= 1
+                if estado["tabelas"] == 0:
+                    self._registrar_fim_aba(estado["nome"])
+                    if estado["na_aba"]:
+                        raise _FimLeitura()
+                return
+            if not estado["na_aba"]:
+                return
+            if "texto" in celula:
+                descarregar_texto()
+            if tag == _TAG_CELL or tag == _TAG_COVERED:
+                self._fechar_celula(celula, linha, mapa)
+                celula.clear()
+            elif tag == _TAG_ANNOTATION and "texto" in celula:
+                celula["anotacao"] -= 1
+            elif tag == _TAG_ROW:
+                valores = linha["valores"]
+                if mapa is None:
+                    estado["largura"] = max(estado["largura"], len(valores))
+                if not linha["tem_valor"]:
+                    estado["linhas_vazias"] += linha["repetir"]
+                else:
+                    linhas.extend(list(vazia) for _ in range(estado["linhas_vazias"]))
+                    estado["linhas_vazias"] = 0
+                    linhas.append(valores)
+                    linhas.extend(list(valores) for _ in range(linha["repetir"] - 1))
+                if ultima_linha is not None and len(linhas) >= ultima_linha:
+                    raise _FimLeitura()
+
+        self._percorrer(inicio, fim, texto, nome_aba)
+        if not estado["encontrada"]:
+            raise ValueError(f"Worksheet named '{nome_aba}' not found")
+        return linhas, estado["largura"]
+
+    def _fechar_celula(self, celula, linha, mapa):
+        """Converte a célula e a grava na linha, expandindo as repetições apenas se houver valor."""
+        repetir = celula["repetir"]
+        coluna = linha["coluna"]
+        linha["coluna"] = coluna + repetir
+        valor = "" if celula["coberta"] else self._converter(celula)
+        if valor == "":
+            if mapa is None:
+                linha["celulas_vazias"] += repetir
+            return
+
+        linha["tem_valor"] = True
+        if mapa is None:
+            valores = linha["valores"]
+            if linha["celulas_vazias"]:
+                valores.extend([""] * linha["celulas_vazias"])
+                linha["celulas_vazias"] = 0
+            valores.extend([valor] * repetir)
+        elif repetir == 1:
+            posicao = mapa.get(coluna)
+            if posicao is not None:
+                linha["valores"][posicao] = valor
+        else:
+            for coluna_pedida, posicao in mapa.items():
+                if coluna <= coluna_pedida < coluna + repetir:
+                    linha["valores"][posicao] = valor
+
+    def _converter(self, celula):
+        """Converte o valor de uma célula como o pd.read_excel(engine="odf")."""
+        texto = "".join(celula["texto"])
+        if texto == "#N/A":
+            return math.nan
+        tipo = celula["tipo"]
+        if tipo is None:
+            return ""
+        if tipo == "float":
+            numero = float(celula["valor"])
+            inteiro = int(numero)
+            return inteiro if inteiro == numero else numero
+        if tipo == "string":
+            return "".join(celula["string"])
+        if tipo in ("percentage", "currency"):
+            return float(celula["valor"])
+        if tipo == "date":
+            return pd.Timestamp(celula["data"])
+        if tipo == "boolean":
+            return texto == "TRUE"
+        if tipo == "time":
+            return pd.Timestamp(texto).time()
+        raise PlanilhaIncompativel(f"Tipo de célula desconhecido: {tipo}")
+
+    def fechar(self):
+        if self._zin is not None:
+            self._zin.close()
+        super().fechar()
@@ -0,0 +1,447 @@
+import math
+import zipfile
+from xml.etree import ElementTree as ET
+
+import pandas as pd
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, from_ISO8601
+from pandas.io.parsers import TextParser
+
+from diario_xlsx import NS_MAIN, NS_PKG, NS_REL, _relacionamentos, _resolver_caminho
+from logger import registrar_log
+
+_TAG_SHEETDATA = f"{{{NS_MAIN}}}sheetData"
+_TAG_ROW = f"{{{NS_MAIN}}}row"
+_TAG_V = f"{{{NS_MAIN}}}v"
+_TAG_IS = f"{{{NS_MAIN}}}is"
+_TAG_T = f"{{{NS_MAIN}}}t"
+_TAG_R = f"{{{NS_MAIN}}}r"
+_TAG_SI = f"{{{NS_MAIN}}}si"
+
+class PlanilhaIncompativel(Exception):
+    """O arquivo não tem a estrutura esperada pelo leitor em streaming."""
+
+def _conteudo_texto(elemento):
+    """Texto de um <si> ou <is>, sem formatação: o <t> simples seguido dos <t> de cada <r>
+    (as anotações fonéticas <rPh> são ignoradas, como no openpyxl)."""
+    partes = []
+    for filho in elemento:
+        if filho.tag == _TAG_T:
+            partes.append(filho.text or "")
+        elif filho.tag == _TAG_R:
+            t = filho.find(_TAG_T)
+            if t is not None:
+                partes.append(t.text or "")
+    return "".join(partes)
+
+def _nomes_colunas(cabecalho):
+    """Nomes das colunas como o pandas gera: "Unnamed: i" para células vazias e sufixos
+    ".1", ".2"... para nomes repetidos."""
+    nomes = [f"Unnamed: {i}" if valor == "" else valor for i, valor in enumerate(cabecalho)]
+    contagem = {}
+    for i, nome in enumerate(nomes):
+        atual = contagem.get(nome, 0)
+        while atual > 0:
+            contagem[nome] = atual + 1
+            nome = f"{nome}.{atual}"
+            atual = contagem.get(nome, 0)
+        nomes[i] = nome
+        contagem[nome] = atual + 1
+    return nomes
+
+class LeitorPlanilha:
+    """
+    Base dos leitores de planilha em streaming (LeitorXlsx e LeitorOds).
+
+    As subclasses percorrem a aba e devolvem as linhas já com os valores convertidos como
+    no pd.read_excel (_ler_linhas); aqui ficam o cabeçalho, a seleção de colunas e a
+    tipagem pelo mesmo parser do pandas, além da volta para pd.ExcelFile quando o
+    arquivo não tem a estrutura esperada.
+    """
+
+    # Engine do pd.ExcelFile usado quando a leitura em streaming não é possível
+    ENGINE = None
+    # Erros de leitura que levam ao uso do pd.ExcelFile
+    ERROS_LEITURA = (KeyError, ET.ParseError, PlanilhaIncompativel)
+
+    def __init__(self, arquivo):
+        """
+        Args:
+            arquivo: Caminho ou arquivo binário com posicionamento (seek) da planilha
+        """
+        self._arquivo = arquivo
+        self._excel = None
+        self._cabecalhos = {}
+
+    def _usar_pandas(self, motivo):
+        registrar_log(f"Leitura em streaming indisponível ({str(motivo)}), usando pandas ({self.ENGINE})", "aviso")
+        if hasattr(self._arquivo, "seek"):
+            self._arquivo.seek(0)
+        self._excel = pd.ExcelFile(self._arquivo, engine=self.ENGINE)
+
+    @property
+    def abas(self):
+        """Nomes das abas, na ordem do arquivo."""
+        if self._excel is None:
+            try:
+                return self._nomes_abas()
+            except self.ERROS_LEITURA as e:
+                self._usar_pandas(e)
+        return list(self._excel.sheet_names)
+
+    def _nomes_abas(self):
+        raise NotImplementedError
+
+    def _ler_linhas(self, nome_aba, mapa, ultima_linha=None):
+        """
+        Percorre a aba e retorna as linhas com os valores convertidos.
+
+        Args:
+            nome_aba: Nome da aba (None para a primeira)
+            mapa: {coluna (1-based): posição na linha} das colunas pedidas; None para todas
+            ultima_linha: Interrompe a leitura após esta linha (opcional)
+
+        Returns:
+            tuple: (linhas até a última com algum valor, largura da linha mais longa quando mapa é None)
+        """
+        raise NotImplementedError
+
+    def cabecalho(self, nome_aba=None):
+        """
+        Retorna os nomes das colunas da aba (primeira linha), como em pd.read_excel(nrows=0).
+
+        Args:
+            nome_aba: Nome da aba (padrão: primeira aba)
+
+        Returns:
+            list: Nomes das colunas
+        """
+        if self._excel is None:
+            try:
+                if nome_aba not in self._cabecalhos:
+                    linhas, largura = self._ler_linhas(nome_aba, None, ultima_linha=1)
+                    primeira = linhas[0] + [""] * (largura - len(linhas[0])) if linhas else []
+                    self._cabecalhos[nome_aba] = _nomes_colunas(primeira)
+                return list(self._cabecalhos[nome_aba])
+            except self.ERROS_LEITURA as e:
+                self._usar_pandas(e)
+        return pd.read_excel(self._excel, sheet_name=nome_aba or 0, nrows=0).columns.tolist()
+
+    def ler_aba(self, nome_aba=None, colunas=None, como_texto=False):
+        """
+        Lê as colunas pedidas de uma aba.
+
+        Args:
+            nome_aba: Nome da aba (padrão: primeira aba)
+            colunas: Nomes das colunas (como em cabecalho()); None para todas
+            como_texto: Se True, os valores são lidos como texto (dtype=str)
+
+        Returns:
+            DataFrame: As colunas pedidas, na ordem da aba, com os tipos inferidos pelo pandas
+        """
+        if self._excel is None:
+            try:
+                return self._ler_aba_streaming(nome_aba, colunas, como_texto)
+            except self.ERROS_LEITURA as e:
+                self._usar_pandas(e)
+        if colunas is not None:
+            cabecalho = pd.read_excel(self._excel, sheet_name=nome_aba or 0, nrows=0).columns.tolist()
+            colunas = [cabecalho.index(nome) for nome in colunas]
+        return pd.read_excel(self._excel, sheet_name=nome_aba or 0, usecols=colunas,
+                             dtype=str if como_texto else None)
+
+    def _ler_aba_streaming(self, nome_aba, colunas, como_texto):
+        mapa = None
+        if colunas is not None:
+            nomes_cabecalho = self.cabecalho(nome_aba)
+            faltantes = [nome for nome in colunas if nome not in nomes_cabecalho]
+            if faltantes:
+                raise ValueError(f"Colunas não encontradas na aba: {', '.join(map(str, faltantes))}")
+            indices = sorted({nomes_cabecalho.index(nome) + 1 for nome in colunas})
+            mapa = {coluna: posicao for posicao, coluna in enumerate(indices)}
+
+        linhas, largura = self._ler_linhas(nome_aba, mapa)
+        if not linhas:
+            return pd.DataFrame()
+        if mapa is None:
+            linhas = [linha + [""] * (largura - len(linha)) if len(linha) < largura else linha for linha in linhas]
+            nomes = _nomes_colunas(linhas[0])
+        else:
+            nomes = [nomes_cabecalho[coluna - 1] for coluna in mapa]
+
+        parser = TextParser(linhas[1:], names=nomes, header=None, skip_blank_lines=False,
+                            dtype=str if como_texto else None)
+        return parser.read()
+
+    def fechar(self):
+        if self._excel is not None:
+            self._excel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+class LeitorXlsx(LeitorPlanilha):
+    """
+    Leitor de abas XLSX em streaming, sem o modelo de células do openpyxl.
+
+    A aba é percorrida com iterparse, uma linha por vez, e apenas as colunas pedidas são
+    convertidas; das strings compartilhadas são lidas somente as usadas por essas colunas.
+    Os valores recebem as mesmas conversões do pd.read_excel (números inteiros, datas pelo
+    formato do estilo, erros como NaN) e as colunas são tipadas pelo mesmo parser do pandas,
+    de modo que o resultado é igual ao de pd.read_excel(..., usecols=colunas).
+
+    Se o arquivo tiver uma estrutura que o leitor não reconhece, a leitura passa a usar
+    pd.ExcelFile (openpyxl) a partir do mesmo arquivo.
+    """
+
+    ENGINE = "openpyxl"
+
+    def __init__(self, arquivo):
+        """
+        Args:
+            arquivo: Caminho ou arquivo binário com posicionamento (seek) do XLSX
+        """
+        super().__init__(arquivo)
+        self._zin = None
+        try:
+            self._zin = zipfile.ZipFile(arquivo)
+            self._localizar_partes()
+        except (zipfile.BadZipFile,) + self.ERROS_LEITURA as e:
+            self._usar_pandas(e)
+
+    def _localizar_partes(self):
+        rels_pacote = ET.fromstring(self._zin.read("_rels/.rels"))
+        caminho_workbook = None
+        for rel in rels_pacote.iter(f"{{{NS_PKG}}}Relationship"):
+            if rel.get("Type", "").endswith("/officeDocument"):
+                caminho_workbook = _resolver_caminho("", rel.get("Target", ""))
+        if caminho_workbook is None:
+            raise PlanilhaIncompativel("Workbook não encontrado no pacote")
+
+        rels = _relacionamentos(self._zin, caminho_workbook)
+        workbook = ET.fromstring(self._zin.read(caminho_workbook))
+        self._abas = {}
+        for sheet in workbook.iter(f"{{{NS_MAIN}}}sheet"):
+            rel = rels.get(sheet.get(f"{{{NS_REL}}}id"))
+            if rel is not None:
+                self._abas[sheet.get("name")] = rel[1]
+        if not self._abas:
+            raise PlanilhaIncompativel("Nenhuma aba encontrada")
+        propriedades = workbook.find(f"{{{NS_MAIN}}}workbookPr")
+        data1904 = propriedades is not None and propriedades.get("date1904") in ("1", "true")
+        self._epoca = MAC_EPOCH if data1904 else WINDOWS_EPOCH
+
+        self._caminho_strings = None
+        caminho_estilos = None
+        for tipo, caminho in rels.values():
+            if tipo.endswith("/sharedStrings"):
+                self._caminho_strings = caminho
+            elif tipo.endswith("/styles"):
+                caminho_estilos = caminho
+        self._ler_estilos(caminho_estilos)
+
+    def _ler_estilos(self, caminho):
+        """Identifica os estilos de célula (cellXfs) com formato de data ou de duração."""
+        self._estilos_data = set()
+        self._estilos_duracao = set()
+        if caminho is None:
+            return
+        estilos = ET.fromstring(self._zin.read(caminho))
+        formatos = dict(BUILTIN_FORMATS)
+        for numfmt in estilos.iter(f"{{{NS_MAIN}}}numFmt"):
+            formatos[int(numfmt.get("numFmtId"))] = numfmt.get("formatCode", "")
+        xfs = estilos.find(f"{{{NS_MAIN}}}cellXfs")
+        for indice, xf in enumerate(xfs if xfs is not None else ()):
+            formato = formatos.get(int(xf.get("numFmtId", 0)))
+            if formato is None:
+                continue
+            if is_date_format(formato):
+                self._estilos_data.add(indice)
+            if is_timedelta_format(formato):
+                self._estilos_duracao.add(indice)
+
+    def _nomes_abas(self):
+        return list(self._abas)
+
+    def _caminho_aba(self, nome_aba):
+        if nome_aba is None:
+            return next(iter(self._abas.values()))
+        if nome_aba not in self._abas:
+            raise ValueError(f"Worksheet named '{nome_aba}' not found")
+        return self._abas[nome_aba]
+
+    def _ler_linhas(self, nome_aba, mapa, ultima_linha=None):
+        caminho = self._caminho_aba(nome_aba)
+        linhas = []
+        vazia = [""] * len(mapa) if mapa is not None else []
+        strings = []          # (linha, posição, índice) das strings compartilhadas pedidas
+        strings_outras = []   # (número da linha, índice) das demais, usadas só para saber se a linha tem valor
+        ultima_com_valor = 0
+        colunas_cache = {}
+        numero = 0
+
+        with self._zin.open(caminho) as arquivo:
+            dados_aba = None
+            for evento, elemento in ET.iterparse(arquivo, events=("start", "end")):
+                if evento == "start":
+                    if elemento.tag == _TAG_SHEETDATA:
+                        dados_aba = elemento
+                    continue
+                if elemento.tag != _TAG_ROW:
+                    continue
+
+                r = elemento.get("r")
+                numero = int(r) if r else numero + 1
+                if ultima_linha is not None and numero > ultima_linha:
+                    break
+                while len(linhas) < numero - 1:
+                    linhas.append(list(vazia))
+                linha = list(vazia)
+                linhas.append(linha)
+
+                coluna = 0
+                for c in elemento:
+                    ref = c.get("r")
+                    if ref:
+                        letras = ref.rstrip("0123456789")
+                        coluna = colunas_cache.get(letras)
+                        if coluna is None:
+                            coluna = colunas_cache[letras] = column_index_from_string(letras)
+                    else:
+                        coluna += 1
+
+                    if mapa is None:
+                        posicao = coluna - 1
+                    else:
+                        posicao = mapa.get(coluna)
+
+                    tipo = c.get("t", "n")
+                    if posicao is None:
+                        # Coluna não pedida: apenas verifica se a linha tem algum valor
+                        if tipo == "inlineStr":
+                            is_ = c.find(_TAG_IS)
+                            tem_valor = is_ is not None and _conteudo_texto(is_) != ""
+                        elif tipo == "s":
+                            v = c.findtext(_TAG_V)
+                            if v and numero > ultima_com_valor:
+                                strings_outras.append((numero, int(v)))
+                            tem_valor = False
+                        else:
+                            tem_valor = bool(c.findtext(_TAG_V)) or tipo == "e"
+                        if tem_valor:
+                            ultima_com_valor = numero
+                        continue
+
+                    if tipo == "s":
+                        v = c.findtext(_TAG_V)
+                        valor = ""
+                        if v:
+                            strings.append((numero, linha, posicao, int(v)))
+                    else:
+                        valor = self._converter(c, tipo)
+                    if mapa is None and posicao >= len(linha):
+                        linha.extend([""] * (posicao + 1 - len(linha)))
+                    linha[posicao] = valor
+                    if valor != "":
+                        ultima_com_valor = numero
+
+                if dados_aba is not None:
+                    dados_aba.clear()
+
+        # Strings compartilhadas: lidas apenas até o maior índice necessário
+        indices = {indice for _, _, _, indice in strings}
+        indices.update(indice for numero, indice in strings_outras if numero > ultima_com_valor)
+        textos = self._ler_strings(indices)
+        for numero, linha, posicao, indice in strings:
+            linha[posicao] = textos[indice]
+            if textos[indice] != "":
+                ultima_com_valor = max(ultima_com_valor, numero)
+        for numero, indice in strings_outras:
+            if numero > ultima_com_valor and textos[indice] != "":
+                ultima_com_valor = numero
+
+        # Como no pandas: linhas vazias no final são descartadas e, lendo todas as colunas,
+        # a largura é a da linha mais longa sem as células vazias à direita
+        linhas = linhas[:ultima_com_valor]
+        largura = 0
+        if mapa is None:
+            for linha in linhas:
+                while linha and linha[-1] == "":
+                    linha.pop()
+                largura = max(largura, len(linha))
+        return linhas, largura
+
+    def _converter(self, c, tipo):
+        """Converte o valor de uma célula (exceto string compartilhada) como o pd.read_excel."""
+        if tipo == "inlineStr":
+            is_ = c.find(_TAG_IS)
+            return _conteudo_texto(is_) if is_ is not None else ""
+        v = c.findtext(_TAG_V)
+        if not v:
+            return ""
+        if tipo == "n":
+            numero = float(v) if ("." in v or "e" in v or "E" in v) else int(v)
+            estilo = c.get("s")
+            if estilo and int(estilo) in self._estilos_data:
+                try:
+                    return from_excel(numero, self._epoca, timedelta=int(estilo) in self._estilos_duracao)
+                except (OverflowError, ValueError):
+                    return math.nan
+            if isinstance(numero, float) and numero.is_integer():
+                return int(numero)
+            return numero
+        if tipo == "str":
+            return v
+        if tipo == "b":
+            return bool(int(v))
+        if tipo == "e":
+            return math.nan
+        if tipo == "d":
+            return from_ISO8601(v)
+        raise PlanilhaIncompativel(f"Tipo de célula desconhecido: {tipo}")
+
+    def _ler_strings(self, indices):
+        """Lê o texto das strings compartilhadas pedidas (até o maior índice)."""
+        if not indices:
+            return {}
+        if self._caminho_strings is None:
+            raise PlanilhaIncompativel("sharedStrings não encontrado")
+        maior = max(indices)
+        textos = {}
+        posicao = 0
+        with self._zin.open(self._caminho_strings) as arquivo:
+            for _, elemento in ET.iterparse(arquivo):
+                if elemento.tag != _TAG_SI:
+                    continue
+                if posicao in indices:
+                    textos[posicao] = _conteudo_texto(elemento).replace("x005F_", "")
+                elemento.clear()
+                posicao += 1
+                if posicao > maior:
+                    break
+        if posicao <= maior:
+            raise PlanilhaIncompativel("Índice de string compartilhada inexistente")
+        return textos
+
+    def fechar(self):
+        if self._zin is not None:
+            self._zin.close()
+        super().fechar()
+
+def abrir_planilha(arquivo):
+    """
+    Retorna o leitor em streaming adequado ao conteúdo do arquivo.
+
+    Args:
+        arquivo: Caminho ou arquivo binário com posicionamento (seek) de um XLSX ou ODS
+
+    Returns:
+        LeitorPlanilha: LeitorOds para planilhas OpenDocument, LeitorXlsx para as demais
+    """
+    # Importado aqui porque leitor_ods depende deste módulo
+    from leitor_ods import LeitorOds, eh_ods
+    return LeitorOds(arquivo) if eh_ods(arquivo) else LeitorXlsx(arquivo)
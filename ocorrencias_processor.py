@@ -0,0 +1,224 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from arquivo_enviado import como_arquivo_enviado
+from logger import registrar_log
+from perfilamento import perfilado
+
+COLUNAS_OCORRENCIAS = [
+    'Número', 'Incidentes secundários', 'Aberto', 'Prioridade', 'Estado',
+    'Descrição resumida', 'Descrição', 'Aberto por', 'Atribuído a',
+    'Canal impactado', 'IC Impactado', 'IC Causador', 'Problema', 'Status',
+    'Sub Status', 'Código de resolução', 'Causa Origem', 'Causa provável',
+    'Causado pela mudança', 'Anotações de resolução', 'Resolvido', 'Encerrado',
+    'u_rpt_tempo_total_de_impacto'
+]
+
+# Coluna usada como chave no modo de atualização por chave (upsert)
+COLUNA_CHAVE = COLUNAS_OCORRENCIAS[0]
+
+# Modos de atualização das abas da planilha base
+MODO_SUBSTITUIR = "substituir"
+MODO_UPSERT = "upsert"
+
+# Estado gravado nos incidentes que saíram da extração (upsert com marcar_encerrados)
+ESTADO_ENCERRADO = "Encerrado"
+
+# Abas de origem de cada extração, em ordem de preferência
+ABAS_EXTRACAO_FUNCIONAIS = ["extração funcionais"]
+ABAS_EXTRACAO_CRITICOS = ["extração criticos", "extração críticos"]
+
+# Abaixo deste tamanho (soma das extrações) o custo de iniciar os processos supera o ganho
+TAMANHO_MINIMO_PARALELO = 1 << 20
+
+def ler_extracao(arquivo, nomes_aba):
+    """Lê as linhas de dados (sem o cabeçalho) de uma aba de extração em modo somente leitura.
+    A primeira aba de nomes_aba presente no arquivo é usada. Executada também nos processos
+    auxiliares, por isso recebe um ArquivoEnviado (enviado pelo caminho quando mapeado em
+    memória) e retorna apenas as tuplas de valores.
+    """
+    wb = load_workbook(arquivo.abrir(), read_only=True, data_only=True)
+    try:
+        nome_aba = next((nome for nome in nomes_aba if nome in wb.sheetnames), nomes_aba[0])
+        return list(wb[nome_aba].iter_rows(min_row=2, values_only=True))
+    finally:
+        wb.close()
+
+def carregar_planilhas(planilha_base, planilha_funcionais, planilha_criticos, paralelo=None):
+    """Carrega a planilha base e lê as duas extrações.
+    Em modo paralelo as extrações são lidas em processos auxiliares enquanto a planilha base,
+    que precisa ser mantida inteira para ser salva com a formatação, é carregada neste processo.
+    As planilhas podem ser arquivos, ArquivoEnviado, bytes ou caminhos.
+    Se paralelo for None, o modo é escolhido pelo tamanho das extrações.
+    Retorna (workbook base, linhas funcionais, linhas críticos).
+    """
+    base = como_arquivo_enviado(planilha_base)
+    funcionais = como_arquivo_enviado(planilha_funcionais)
+    criticos = como_arquivo_enviado(planilha_criticos)
+    if paralelo is None:
+        paralelo = funcionais.tamanho + criticos.tamanho >= TAMANHO_MINIMO_PARALELO
+    if not paralelo:
+        wb_base = load_workbook(base.abrir())
+        return (wb_base, ler_extracao(funcionais, ABAS_EXTRACAO_FUNCIONAIS),
+                ler_extracao(criticos, ABAS_EXTRACAO_CRITICOS))
+
+    # "spawn" evita copiar o estado (threads) do servidor Streamlit para os processos
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futuro_funcionais = pool.submit(ler_extracao, funcionais, ABAS_EXTRACAO_FUNCIONAIS)
+        futuro_criticos = pool.submit(ler_extracao, criticos, ABAS_EXTRACAO_CRITICOS)
+        wb_base = load_workbook(base.abrir())
+        return wb_base, futuro_funcionais.result(), futuro_criticos.result()
+
+def _escrever_linha(ws, i, valores, max_col, modelo=None):
+    """Escreve os valores da linha i apenas nas células cujo valor mudou.
+    Se modelo for informado ({coluna: estilo}), as células recebem esses estilos.
+    Retorna a quantidade de células alteradas.
+    """
+    celulas = ws._cells
+    alteradas = 0
+    for j in range(1, max_col + 1):
+        valor = valores[j - 1] if j <= len(valores) else None
+        cell = celulas.get((i, j))
+        if modelo and j in modelo:
+            cell = ws.cell(row=i, column=j)
+            cell._style = copy(modelo[j])
+        atual = cell.value if cell is not None else None
+        if valor == atual and type(valor) is type(atual):
+            continue
+        if cell is None:
+            cell = ws.cell(row=i, column=j)
+        cell.value = valor
+        alteradas += 1
+    return alteradas
+
+def _estilos_linha(ws, i, max_col):
+    """Retorna {coluna: estilo} das células com formatação da linha i."""
+    modelo = {}
+    for j in range(1, max_col + 1):
+        template = ws._cells.get((i, j))
+        if template is not None and template.has_style:
+            modelo[j] = template._style
+    return modelo
+
+def atualizar_aba_ocorrencias(ws, novos_dados):
+    """Substitui os dados de uma aba da planilha base escrevendo apenas as células cujo valor mudou.
+    Linhas que sobrarem são esvaziadas (mantendo a formatação) e as novas linhas recebem a
+    formatação da última linha existente, lida uma única vez.
+    Retorna a quantidade de células alteradas.
+    """
+    # Salva o número original de linhas formatadas (considerando que a 1ª linha é o cabeçalho)
+    old_max = ws.max_row
+    max_col = max([ws.max_column] + [len(linha) for linha in novos_dados])
+
+    # Estilos da linha modelo, reutilizados em todas as novas linhas
+    modelo = _estilos_linha(ws, old_max, max_col) if len(novos_dados) > old_max - 1 else {}
+
+    alteradas = 0
+    for i in range(2, max(old_max, len(novos_dados) + 1) + 1):
+        linha = novos_dados[i - 2] if i - 2 < len(novos_dados) else ()
+        alteradas += _escrever_linha(ws, i, linha, max_col, modelo if i > old_max else None)
+    return alteradas
+
+def upsert_aba_ocorrencias(ws, novos_dados, marcar_encerrados=False):
+    """Atualiza uma aba da planilha base usando o Número do incidente como chave.
+    Incidentes já existentes têm apenas as células alteradas reescritas e os novos são
+    acrescentados após a última linha com dados, com a formatação dessa linha (quando a linha
+    de destino ainda não tiver formatação). Se marcar_encerrados for True, os incidentes
+    que não estão mais na extração recebem o Estado ESTADO_ENCERRADO.
+    Retorna um dicionário com as quantidades de inseridos, atualizados, inalterados e encerrados.
+    """
+    cabecalho = [cell.value for cell in ws[1]]
+    coluna_chave = cabecalho.index(COLUNA_CHAVE) + 1 if COLUNA_CHAVE in cabecalho else 1
+    coluna_estado = (cabecalho.index('Estado') if 'Estado' in cabecalho
+                     else COLUNAS_OCORRENCIAS.index('Estado')) + 1
+    max_col = max([ws.max_column] + [len(linha) for linha in novos_dados])
+
+    # Índice em memória: Número -> linha da aba
+    celulas = ws._cells
+    indice = {}
+    ultima_linha = 1
+    for i in range(2, ws.max_row + 1):
+        cell = celulas.get((i, coluna_chave))
+        if cell is not None and cell.value not in (None, ""):
+            indice[cell.value] = i
+            ultima_linha = i
+    modelo = _estilos_linha(ws, ultima_linha, max_col)
+
+    resumo = {"inseridos": 0, "atualizados": 0, "inalterados": 0, "encerrados": 0}
+    vistos = set()
+    for linha in novos_dados:
+        chave = linha[coluna_chave - 1] if coluna_chave <= len(linha) else None
+        if chave in (None, ""):
+            continue
+        vistos.add(chave)
+        if chave in indice:
+            if _escrever_linha(ws, indice[chave], linha, max_col):
+                resumo["atualizados"] += 1
+            else:
+                resumo["inalterados"] += 1
+        else:
+            ultima_linha += 1
+            # Linhas vazias já formatadas na planilha base mantêm a própria formatação
+            ja_formatada = any(
+                cell is not None and cell.has_style
+                for cell in (celulas.get((ultima_linha, j)) for j in range(1, max_col + 1))
+            )
+            _escrever_linha(ws, ultima_linha, linha, max_col, None if ja_formatada else modelo)
+            indice[chave] = ultima_linha
+            resumo["inseridos"] += 1
+
+    if marcar_encerrados:
+        for chave, i in indice.items():
+            if chave in vistos:
+                continue
+            cell = ws.cell(row=i, column=coluna_estado)
+            if cell.value != ESTADO_ENCERRADO:
+                cell.value = ESTADO_ENCERRADO
+                resumo["encerrados"] += 1
+    return resumo
+
+@perfilado("atualizar_ocorrencias")
+def atualizar_ocorrencias(planilha_base, planilha_funcionais, planilha_criticos, paralelo=None,
+                          modo=MODO_SUBSTITUIR, marcar_encerrados=False):
+    """Atualiza a planilha de ocorrências com os dados das extrações, mantendo a formatação original.
+    A aba "Funcionais" da planilha base será atualizada com os dados da aba "extração funcionais" do arquivo de extração funcionais,
+    e a aba "Criticos NOW" será atualizada com os dados da aba "extração criticos" do arquivo de extração criticos.
+    As extrações são lidas em modo somente leitura (em paralelo, para arquivos grandes) e apenas
+    as células alteradas da planilha base são escritas.
+    No modo MODO_UPSERT os incidentes são casados pelo Número: os existentes são atualizados,
+    os novos são acrescentados e, com marcar_encerrados, os ausentes da extração são marcados
+    como encerrados. As quantidades de cada caso são registradas no log.
+    Retorna (BytesIO da planilha atualizada, total de registros das extrações, resumos por aba):
+    no modo MODO_UPSERT, {nome da aba: resumo de upsert_aba_ocorrencias}; no modo MODO_SUBSTITUIR,
+    um dicionário vazio.
+    """
+    try:
+        wb_base, dados_funcionais, dados_criticos = carregar_planilhas(
+            planilha_base, planilha_funcionais, planilha_criticos, paralelo
+        )
+
+        # Atualiza as abas 'Funcionais' e 'Criticos NOW'
+        resumos = {}
+        for nome_aba, dados in (("Funcionais", dados_funcionais), ("Criticos NOW", dados_criticos)):
+            if modo == MODO_UPSERT:
+                resumo = resumos[nome_aba] = upsert_aba_ocorrencias(wb_base[nome_aba], dados, marcar_encerrados)
+                registrar_log(
+                    f"Aba {nome_aba}: {resumo['inseridos']} inseridos, {resumo['atualizados']} atualizados, "
+                    f"{resumo['inalterados']} inalterados, {resumo['encerrados']} encerrados", "info"
+                )
+            else:
+                alteradas = atualizar_aba_ocorrencias(wb_base[nome_aba], dados)
+                registrar_log(f"Aba {nome_aba}: {len(dados)} registros, {alteradas} células alteradas", "info")
+
+        output = BytesIO()
+        wb_base.save(output)
+        output.seek(0)
+        total_registros = len(dados_funcionais) + len(dados_criticos)
+        return output, total_registros, resumos
+    except Exception as e:
+        registrar_log(f"Erro crítico ao atualizar ocorrências: {str(e)}", "erro")
+        raise
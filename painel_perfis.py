@@ -0,0 +1,55 @@
+import streamlit as st
+from perfilamento import definir_perfilamento, listar_perfis, perfilamento_ativo, pontos_criticos
+
+def _alternar_perfilamento():
+    definir_perfilamento(st.session_state.perfilamento)
+
+def render_painel_perfis():
+    """
+    Exibe na barra lateral a opção de perfilamento das execuções e, com ela ativa,
+    os perfis salvos: tabela das funções com maior tempo próprio e download do arquivo
+    .prof (para abrir com pstats, snakeviz etc.).
+    """
+    st.toggle(
+        "Perfilar execuções",
+        value=perfilamento_ativo(),
+        key="perfilamento",
+        on_change=_alternar_perfilamento,
+        help="Grava um perfil (cProfile) de cada processamento. Vale para todas as sessões "
+             "enquanto estiver ativo e deixa as execuções mais lentas."
+    )
+    perfis = listar_perfis()
+    if not perfilamento_ativo() and not perfis:
+        return
+
+    if not perfis:
+        st.caption("Nenhum perfil gravado ainda. Execute um processamento para gerar o primeiro.")
+        return
+
+    perfil = st.selectbox(
+        "Perfil",
+        perfis,
+        format_func=lambda p: f"{p['data']:%d/%m %H:%M:%S} · {p['nome']} · {p['hash'][:8]}",
+        key="perfil_selecionado"
+    )
+    try:
+        duracao, linhas = pontos_criticos(perfil["caminho"])
+    except (OSError, EOFError, ValueError) as e:
+        st.warning(f"Não foi possível ler o perfil: {str(e)}")
+        return
+
+    st.caption(f"Tempo total perfilado: {duracao:.2f}s · entrada {perfil['hash']}")
+    st.dataframe(linhas, hide_index=True, use_container_width=True)
+
+    def ler_perfil():
+        with open(perfil["caminho"], "rb") as arquivo:
+            return arquivo.read()
+
+    st.download_button(
+        "⬇️ Baixar perfil (.prof)",
+        ler_perfil,
+        perfil["arquivo"],
+        mime="application/octet-stream",
+        on_click="ignore",
+        use_container_width=True
+    )
@@ -0,0 +1,30 @@
+import streamlit as st
+
+# Intervalo (segundos) de atualização do progresso das tarefas em andamento
+INTERVALO_ATUALIZACAO = 1.0
+
+def acompanhar_tarefa(tarefa):
+    """
+    Exibe o progresso de uma tarefa em segundo plano.
+    Enquanto a tarefa executa, apenas o painel de progresso é atualizado periodicamente;
+    ao terminar, o script inteiro é reexecutado para exibir o resultado.
+    
+    Args:
+        tarefa: Tarefa do executor de tarefas
+        
+    Returns:
+        bool: True se a tarefa já terminou (com resultado ou erro)
+    """
+    if tarefa.finalizada:
+        for mensagem in tarefa.mensagens:
+            st.error(mensagem)
+        return True
+    
+    @st.fragment(run_every=INTERVALO_ATUALIZACAO)
+    def painel_progresso():
+        if tarefa.finalizada:
+            st.rerun()
+        st.progress(tarefa.progresso, text=f"{tarefa.nome}: {tarefa.etapa}")
+    
+    painel_progresso()
+    return False
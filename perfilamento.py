@@ -0,0 +1,176 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from logger import registrar_log
+
+# Variável de ambiente que liga o perfilamento ao iniciar o processo (Streamlit, API ou CLI)
+VARIAVEL_PERFILAMENTO = "KEEP_PERFILAMENTO"
+
+DIRETORIO_PERFIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfis")
+
+# Perfis mantidos em disco (os mais antigos são removidos)
+MAX_PERFIS_GUARDADOS = 100
+
+# Funções exibidas na tabela de pontos críticos
+TOP_PONTOS_CRITICOS = 20
+
+_RE_NOME_PERFIL = re.compile(r"^(\d{8}-\d{6}-\d{6})_(.+)_([0-9a-f]+|sem-hash)\.prof$")
+
+_ativo = os.environ.get(VARIAVEL_PERFILAMENTO, "").strip().lower() in ("1", "true", "sim")
+_execucao = threading.local()
+
+def perfilamento_ativo():
+    return _ativo
+
+def definir_perfilamento(ativo):
+    """Liga ou desliga o perfilamento de todas as execuções do processo (todas as sessões)."""
+    global _ativo
+    if ativo != _ativo:
+        registrar_log(f"Perfilamento {'ativado' if ativo else 'desativado'}", "info")
+    _ativo = ativo
+
+def hash_entrada(*args):
+    """
+    Calcula o hash das entradas de uma execução, para associar o perfil ao arquivo processado.
+    Aceita ArquivoEnviado, arquivos enviados, bytes, caminhos, dicionários (JSON), DataFrames e
+    listas desses valores; None é ignorado.
+    """
+    from cache_compartilhado import hash_conteudo
+
+    partes = []
+    for valor in args:
+        if valor is None:
+            continue
+        if isinstance(valor, (list, tuple)):
+            partes.append(hash_entrada(*valor))
+        elif hasattr(valor, "dados"):
+            partes.append(valor.dados)
+        elif isinstance(valor, (bytes, bytearray, memoryview, str)):
+            if isinstance(valor, str) and os.path.isfile(valor):
+                with open(valor, "rb") as arquivo:
+                    valor = arquivo.read()
+            partes.append(valor)
+        elif hasattr(valor, "getvalue"):
+            partes.append(valor.getvalue())
+        elif isinstance(valor, dict):
+            partes.append(json.dumps(valor, sort_keys=True, default=str))
+        elif hasattr(valor, "to_csv"):
+            import pandas as pd
+            partes.append(pd.util.hash_pandas_object(valor).to_numpy().tobytes())
+    return hash_conteudo(*partes) if partes else "sem-hash"
+
+def _salvar_perfil(perfil, nome, hash_execucao):
+    os.makedirs(DIRETORIO_PERFIS, exist_ok=True)
+    carimbo = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    caminho = os.path.join(DIRETORIO_PERFIS, f"{carimbo}_{nome}_{hash_execucao[:16]}.prof")
+    perfil.dump_stats(caminho)
+
+    antigos = sorted(arquivo for arquivo in os.listdir(DIRETORIO_PERFIS) if _RE_NOME_PERFIL.match(arquivo))
+    for arquivo in antigos[:max(0, len(antigos) - MAX_PERFIS_GUARDADOS)]:
+        try:
+            os.unlink(os.path.join(DIRETORIO_PERFIS, arquivo))
+        except OSError:
+            pass
+    return caminho
+
+def perfilado(nome):
+    """
+    Decorador que, com o perfilamento ativo, executa a função sob o cProfile e salva o
+    perfil em DIRETORIO_PERFIS com o nome da execução e o hash das entradas.
+
+    Chamadas aninhadas na mesma thread (por exemplo, processar_testes chamando
+    processar_testes_lote) ficam no perfil da chamada mais externa.
+
+    Args:
+        nome: Nome da execução usado no arquivo do perfil
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if not _ativo or getattr(_execucao, "perfilando", False):
+                return funcao(*args, **kwargs)
+
+            import cProfile
+
+            try:
+                hash_execucao = hash_entrada(*args, *kwargs.values())
+            except Exception as e:
+                registrar_log(f"Não foi possível calcular o hash da entrada de {nome}: {str(e)}", "aviso")
+                hash_execucao = "sem-hash"
+
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError as e:
+                # Outro profiler já está ativo (por exemplo, um depurador)
+                registrar_log(f"Perfilamento de {nome} indisponível: {str(e)}", "aviso")
+                return funcao(*args, **kwargs)
+
+            _execucao.perfilando = True
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                perfil.disable()
+                _execucao.perfilando = False
+                duracao = time.perf_counter() - inicio
+                try:
+                    caminho = _salvar_perfil(perfil, nome, hash_execucao)
+                    registrar_log(f"Perfil de {nome} ({duracao:.2f}s) salvo em {caminho}", "info")
+                except OSError as e:
+                    registrar_log(f"Não foi possível salvar o perfil de {nome}: {str(e)}", "erro")
+        return envolvida
+    return decorador
+
+def listar_perfis(limite=MAX_PERFIS_GUARDADOS):
+    """
+    Lista os perfis salvos, do mais recente para o mais antigo.
+
+    Returns:
+        list: Dicionários com caminho, nome da execução, hash da entrada e data
+    """
+    if not os.path.isdir(DIRETORIO_PERFIS):
+        return []
+    perfis = []
+    for arquivo in sorted(os.listdir(DIRETORIO_PERFIS), reverse=True):
+        encontrado = _RE_NOME_PERFIL.match(arquivo)
+        if not encontrado:
+            continue
+        carimbo, nome, hash_execucao = encontrado.groups()
+        perfis.append({
+            "caminho": os.path.join(DIRETORIO_PERFIS, arquivo),
+            "arquivo": arquivo,
+            "nome": nome,
+            "hash": hash_execucao,
+            "data": datetime.strptime(carimbo, "%Y%m%d-%H%M%S-%f"),
+        })
+        if len(perfis) >= limite:
+            break
+    return perfis
+
+def pontos_criticos(caminho, top=TOP_PONTOS_CRITICOS):
+    """
+    Lê um perfil salvo e retorna as funções com maior tempo próprio.
+
+    Returns:
+        tuple: (duração total em segundos, lista de dicionários com Função, Chamadas,
+        Tempo próprio (s) e Tempo acumulado (s))
+    """
+    import pstats
+
+    estatisticas = pstats.Stats(caminho)
+    linhas = sorted(estatisticas.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    return estatisticas.total_tt, [
+        {
+            "Função": f"{os.path.basename(arquivo)}:{linha}({funcao})",
+            "Chamadas": chamadas_totais,
+            "Tempo próprio (s)": round(tempo_proprio, 4),
+            "Tempo acumulado (s)": round(tempo_acumulado, 4),
+        }
+        for (arquivo, linha, funcao), (_, chamadas_totais, tempo_proprio, tempo_acumulado, _) in linhas
+    ]
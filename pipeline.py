@@ -0,0 +1,280 @@
+import json
+import os
+import pickle
+import threading
+import time
+import traceback
+
+from cache_compartilhado import hash_conteudo, obter_cache
+from logger import registrar_log
+
+# Pasta com as saídas das etapas guardadas em disco (uma subpasta por pipeline)
+DIRETORIO_ETAPAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_etapas")
+
+# Espaço máximo ocupado pelas saídas em disco; as usadas há mais tempo são removidas
+ORCAMENTO_DISCO_BYTES = 1024 * 1024 * 1024
+
+class ErroEtapa(Exception):
+    """
+    Erro de uma etapa do pipeline, com a mensagem que pode ser exibida ao usuário.
+
+    inesperado é True quando a etapa falhou com uma exceção qualquer (e não com um
+    ErroEtapa previsto, como uma entrada inválida).
+    """
+
+    def __init__(self, mensagem, etapa=None, inesperado=False):
+        super().__init__(mensagem)
+        self.etapa = etapa
+        self.inesperado = inesperado
+
+class Etapa:
+    """
+    Etapa declarada de um pipeline.
+
+    A função recebe a saída da etapa anterior (ou a entrada do pipeline) e os valores de
+    configuração listados em config, e retorna a saída da etapa. Ela não deve alterar o
+    valor recebido, que pode ter vindo do cache.
+    """
+
+    def __init__(self, nome, funcao, config=(), persistir=True, efeito=False, progresso=None,
+                 erro=None, versao=1):
+        """
+        Args:
+            nome: Nome da etapa (parte da chave de cache e dos logs)
+            funcao: funcao(valor, **config) que produz a saída da etapa
+            config: Nomes dos valores de configuração usados pela etapa; entram na chave
+                de cache desta etapa e, portanto, de todas as seguintes
+            persistir: Se True, a saída é guardada no cache em memória e em disco
+            efeito: Etapa executada apenas pelo efeito (arquivar, registrar...): a saída da
+                etapa anterior segue adiante, nada é guardado e a etapa não entra nas chaves
+            progresso: (fração, texto) informados ao iniciar a etapa
+            erro: Prefixo da mensagem quando a etapa falha com um erro inesperado
+            versao: Deve ser incrementada quando a função mudar de forma que invalide as
+                saídas já guardadas
+        """
+        self.nome = nome
+        self.funcao = funcao
+        self.config = tuple(config)
+        self.persistir = persistir and not efeito
+        self.efeito = efeito
+        self.progresso = progresso
+        self.erro = erro or f"Erro na etapa {nome}"
+        self.versao = versao
+
+class Pipeline:
+    """
+    Sequência de etapas com as saídas guardadas por conteúdo.
+
+    A chave de cada etapa é o hash da chave da etapa anterior (para a primeira, o hash da
+    entrada), do nome e da versão da etapa e dos valores de configuração que ela declara.
+    Como as chaves não dependem das saídas, todas são calculadas antes da execução: o
+    pipeline procura, da última para a primeira, a etapa persistida cuja saída já está no
+    cache (em memória, depois em disco) e executa somente as etapas seguintes. Assim, quando
+    muda apenas a configuração de uma etapa tardia (a janela de horário do Keep, a data do
+    relatório), só ela e as posteriores são executadas.
+
+    Erros inesperados das etapas são registrados no log com o traceback e relançados como
+    ErroEtapa, com a mensagem prefixada pelo erro declarado da etapa.
+    """
+
+    def __init__(self, nome, etapas, diretorio=DIRETORIO_ETAPAS, orcamento_bytes=ORCAMENTO_DISCO_BYTES):
+        """
+        Args:
+            nome: Nome do pipeline (parte das chaves e pasta das saídas em disco)
+            etapas: Lista de Etapa, na ordem de execução
+            diretorio: Pasta das saídas em disco
+            orcamento_bytes: Espaço máximo ocupado pelas saídas em disco (todos os pipelines)
+        """
+        self.nome = nome
+        self.etapas = list(etapas)
+        self.diretorio = diretorio
+        self.orcamento_bytes = orcamento_bytes
+        self._lock = threading.Lock()
+
+    def chaves(self, hash_entrada, config=None):
+        """
+        Calcula a chave de cache de cada etapa (None para as etapas de efeito).
+
+        Args:
+            hash_entrada: Hash do conteúdo da entrada
+            config: Valores de configuração das etapas
+
+        Returns:
+            list: Uma chave por etapa, na ordem das etapas
+        """
+        config = config or {}
+        chaves = []
+        anterior = hash_entrada
+        for etapa in self.etapas:
+            if etapa.efeito:
+                chaves.append(None)
+                continue
+            valores = json.dumps([[nome, config.get(nome)] for nome in etapa.config], default=str)
+            anterior = hash_conteudo(self.nome, etapa.nome, str(etapa.versao), anterior, valores)
+            chaves.append(anterior)
+        return chaves
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, self.nome, chave + ".pkl")
+
+    def _ler_disco(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "rb") as arquivo:
+                valor = pickle.load(arquivo)
+        except FileNotFoundError:
+            return None, False
+        except Exception as e:
+            # Arquivo truncado ou gravado por outra versão das bibliotecas: é descartado
+            registrar_log(f"Pipeline {self.nome}: saída em disco ilegível descartada ({str(e)})", "aviso")
+            try:
+                os.unlink(caminho)
+            except OSError:
+                pass
+            return None, False
+        try:
+            # A data de modificação marca o último uso, para a limpeza por orçamento
+            os.utime(caminho)
+        except OSError:
+            pass
+        return valor, True
+
+    def _gravar_disco(self, chave, valor):
+        caminho = self._caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(temporario, "wb") as arquivo:
+                pickle.dump(valor, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+            # A troca é atômica: outros processos (API) nunca leem uma saída pela metade
+            os.replace(temporario, caminho)
+        except Exception as e:
+            registrar_log(f"Pipeline {self.nome}: não foi possível gravar a saída em disco ({str(e)})", "aviso")
+            try:
+                os.unlink(temporario)
+            except OSError:
+                pass
+            return
+        self._limpar_disco()
+
+    def _limpar_disco(self):
+        with self._lock:
+            arquivos = []
+            for raiz, _, nomes in os.walk(self.diretorio):
+                for nome in nomes:
+                    if nome.endswith(".pkl"):
+                        caminho = os.path.join(raiz, nome)
+                        try:
+                            info = os.stat(caminho)
+                        except OSError:
+                            continue
+                        arquivos.append((info.st_mtime, info.st_size, caminho))
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.orcamento_bytes:
+                    break
+                try:
+                    os.unlink(caminho)
+                except OSError:
+                    pass
+                total -= tamanho
+
+    def _guardada(self, chave):
+        """Indica se a saída está no cache em memória ou em disco, sem contabilizar acerto ou falha."""
+        return obter_cache().contem(("etapa", self.nome, chave)) or os.path.exists(self._caminho(chave))
+
+    def _buscar(self, chave):
+        """Procura a saída no cache em memória e depois em disco (promovendo-a para a memória)."""
+        cache = obter_cache()
+        ausente = object()
+        valor = cache.obter(("etapa", self.nome, chave), ausente)
+        if valor is not ausente:
+            return valor, "memória"
+        valor, encontrado = self._ler_disco(chave)
+        if encontrado:
+            cache.guardar(("etapa", self.nome, chave), valor)
+            return valor, "disco"
+        return None, None
+
+    def em_cache(self, hash_entrada, config=None, ate=None):
+        """
+        Indica se a saída de uma etapa persistida já está guardada (em memória ou em disco).
+
+        Args:
+            hash_entrada: Hash do conteúdo da entrada
+            config: Valores de configuração das etapas
+            ate: Nome da etapa (padrão: a última etapa persistida)
+        """
+        chaves = self.chaves(hash_entrada, config)
+        for indice in reversed(range(self._indice(ate) + 1)):
+            if self.etapas[indice].persistir:
+                return self._guardada(chaves[indice])
+        return False
+
+    def _indice(self, nome):
+        if nome is None:
+            return len(self.etapas) - 1
+        for indice, etapa in enumerate(self.etapas):
+            if etapa.nome == nome:
+                return indice
+        raise ValueError(f"Etapa '{nome}' não existe no pipeline {self.nome}")
+
+    def executar(self, entrada, hash_entrada=None, config=None, progresso=None, ate=None):
+        """
+        Executa o pipeline, reaproveitando a saída da etapa persistida mais avançada já guardada.
+
+        Args:
+            entrada: Valor recebido pela primeira etapa
+            hash_entrada: Hash do conteúdo da entrada; se None, nada é lido ou guardado no cache
+            config: Valores de configuração das etapas
+            progresso: Função progresso(fração, etapa) chamada ao iniciar cada etapa (opcional)
+            ate: Nome da última etapa executada (padrão: todas)
+
+        Returns:
+            Saída da última etapa executada
+
+        Raises:
+            ErroEtapa: Falha em uma das etapas
+        """
+        config = config or {}
+        progresso = progresso or (lambda fracao, etapa: None)
+        fim = self._indice(ate)
+        chaves = self.chaves(hash_entrada, config) if hash_entrada else [None] * len(self.etapas)
+
+        valor, inicio = entrada, 0
+        persistidas = [indice for indice in reversed(range(fim + 1)) if self.etapas[indice].persistir]
+        if hash_entrada and persistidas:
+            # As etapas são sondadas sem contabilizar; só a etapa reaproveitada (ou, sem nenhuma
+            # guardada, a mais avançada) é buscada, para que cada execução conte um único acerto
+            # ou falha no cache em memória
+            indice = next((i for i in persistidas if self._guardada(chaves[i])), persistidas[0])
+            guardado, origem = self._buscar(chaves[indice])
+            if origem:
+                registrar_log(f"Pipeline {self.nome}: etapa {self.etapas[indice].nome} reaproveitada do cache ({origem})", "info")
+                valor, inicio = guardado, indice + 1
+
+        for indice in range(inicio, fim + 1):
+            etapa = self.etapas[indice]
+            if etapa.progresso:
+                progresso(*etapa.progresso)
+            parametros = {nome: config.get(nome) for nome in etapa.config}
+            comeco = time.perf_counter()
+            try:
+                saida = etapa.funcao(valor, **parametros)
+            except ErroEtapa as e:
+                # Erro previsto (entrada inválida): a etapa já registrou o motivo no log
+                if e.etapa is None:
+                    e.etapa = etapa.nome
+                raise
+            except Exception as e:
+                registrar_log(f"Pipeline {self.nome}: {etapa.erro}: {str(e)}", "erro")
+                registrar_log(f"Detalhes do erro: {traceback.format_exc()}", "erro")
+                raise ErroEtapa(f"{etapa.erro}: {str(e)}", etapa.nome, inesperado=True) from e
+            registrar_log(f"Pipeline {self.nome}: etapa {etapa.nome} concluída em {time.perf_counter() - comeco:.3f}s", "info")
+            if etapa.efeito:
+                continue
+            valor = saida
+            if etapa.persistir and chaves[indice]:
+                obter_cache().guardar(("etapa", self.nome, chaves[indice]), valor)
+                self._gravar_disco(chaves[indice], valor)
+        return valor
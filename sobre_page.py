@@ -0,0 +1,46 @@
+import streamlit as st
+from cache_compartilhado import obter_cache
+
+def render_sobre_page():
+    """
+    Renderiza a página "Sobre" com as informações do sistema.
+    """
+    st.markdown("""
+        <div style="background-color: #f8f9fa; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
+            <h2 style="color: #1f61d9; margin-bottom: 20px;">⚙️ Sobre o Sistema</h2>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("""
+        <div style="background-color: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <h3 style="color: #1f61d9; margin-bottom: 20px;">QD Apps - Sustentação</h3>
+            <h4 style="color: #666; margin-bottom: 15px;">Versão 2.5</h4>
+            <p style="color: #444; margin-bottom: 20px;">Sistema desenvolvido para auxiliar na gestão e controle das CHGs do time de Sustentação QD Apps.</p>
+            <h4 style="color: #666; margin-bottom: 15px;">Funcionalidades Disponíveis:</h4>
+            <ul style="list-style-type: none; padding-left: 0;">
+                <li style="margin-bottom: 10px;">✨ Geração automática de relatórios de CHGs para o Keep</li>
+                <li style="margin-bottom: 10px;">📅 Controle diário de CHGs agendadas</li>
+                <li style="margin-bottom: 10px;">📱 Interface moderna e intuitiva</li>
+            </ul>
+            <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;">
+                <p style="color: #666; font-size: 0.9em;">© 2024 Time de Sustentação QD Apps - Spread</p>
+                <p style="color: #666; font-size: 0.9em; margin-top: 10px;">Desenvolvido por Mateus</p>
+            </div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # Uso do cache compartilhado de arquivos interpretados (todas as sessões)
+    estatisticas = obter_cache().estatisticas()
+    consultas = estatisticas["acertos"] + estatisticas["falhas"]
+    st.subheader("Cache de arquivos")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Acertos", estatisticas["acertos"])
+    col2.metric("Falhas", estatisticas["falhas"])
+    col3.metric("Taxa de acerto", f"{estatisticas['acertos'] / consultas:.0%}" if consultas else "-")
+    col4.metric("Descartes", estatisticas["descartes"])
+    st.caption(
+        f"{estatisticas['itens']} arquivo(s) em cache ocupando "
+        f"{estatisticas['bytes'] / 1024 ** 2:.1f} MB de {estatisticas['orcamento_bytes'] / 1024 ** 2:.0f} MB. "
+        "Cada processamento conta um acerto ou uma falha; o que é reaproveitado do disco "
+        "(cache_etapas/) conta como falha da memória."
+    )
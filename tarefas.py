@@ -0,0 +1,139 @@
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from logger import registrar_log
+
+# Tarefas executadas ao mesmo tempo; as demais aguardam na fila
+MAX_TRABALHADORES = 4
+
+# Tarefas finalizadas mantidas no registro (as mais antigas são descartadas)
+MAX_TAREFAS_FINALIZADAS = 50
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+ERRO = "erro"
+
+class Tarefa:
+    """
+    Execução em segundo plano de uma função, identificada por uma chave derivada da entrada.
+
+    A função recebe a própria tarefa como primeiro argumento para informar o progresso
+    (tarefa.atualizar) e mensagens para o usuário (tarefa.avisar).
+    """
+
+    def __init__(self, chave, nome):
+        self.chave = chave
+        self.nome = nome
+        self.estado = PENDENTE
+        self.progresso = 0.0
+        self.etapa = "Aguardando na fila"
+        self.mensagens = []
+        self.resultado = None
+        self.erro = None
+        self.detalhes = None
+        self.criada_em = time.time()
+        self.finalizada_em = None
+        self._lock = threading.Lock()
+
+    @property
+    def finalizada(self):
+        return self.estado in (CONCLUIDA, ERRO)
+
+    def atualizar(self, progresso, etapa=None):
+        """Registra o progresso (0 a 1) e, opcionalmente, a etapa atual."""
+        with self._lock:
+            self.progresso = max(0.0, min(1.0, progresso))
+            if etapa is not None:
+                self.etapa = etapa
+
+    def avisar(self, mensagem):
+        """Guarda uma mensagem de erro/aviso para ser exibida quando a tarefa for acompanhada."""
+        with self._lock:
+            self.mensagens.append(str(mensagem))
+
+    def _executar(self, funcao, args, kwargs):
+        self.estado = EXECUTANDO
+        self.atualizar(0.0, "Iniciando")
+        inicio = time.perf_counter()
+        try:
+            self.resultado = funcao(self, *args, **kwargs)
+            self.atualizar(1.0, "Concluído")
+            self.estado = CONCLUIDA
+            registrar_log(f"Tarefa {self.nome} concluída em {time.perf_counter() - inicio:.1f}s", "info")
+        except Exception as e:
+            self.erro = str(e)
+            self.detalhes = traceback.format_exc()
+            self.estado = ERRO
+            registrar_log(f"Erro na tarefa {self.nome}: {str(e)}", "erro")
+            registrar_log(f"Detalhes: {self.detalhes}", "erro")
+        finally:
+            self.finalizada_em = time.time()
+
+class ExecutorTarefas:
+    """
+    Fila de tarefas compartilhada por todas as sessões do Streamlit (um por processo).
+
+    Tarefas com a mesma chave não são executadas de novo enquanto estiverem no registro:
+    uma reexecução do script, ou outro usuário enviando o mesmo arquivo, recebe a
+    tarefa já existente. Tarefas que terminaram com erro são executadas novamente.
+    """
+
+    def __init__(self, max_trabalhadores=MAX_TRABALHADORES, max_finalizadas=MAX_TAREFAS_FINALIZADAS):
+        self._pool = ThreadPoolExecutor(max_workers=max_trabalhadores, thread_name_prefix="tarefa")
+        self._tarefas = OrderedDict()
+        self._max_finalizadas = max_finalizadas
+        self._lock = threading.Lock()
+
+    def submeter(self, chave, nome, funcao, *args, **kwargs):
+        """
+        Enfileira funcao(tarefa, *args, **kwargs), ou retorna a tarefa existente com a mesma chave.
+
+        Args:
+            chave: Identificador da entrada (por exemplo, tipo de processamento + hash do arquivo)
+            nome: Descrição da tarefa para logs e exibição
+            funcao: Função executada em segundo plano; recebe a tarefa como primeiro argumento
+
+        Returns:
+            Tarefa: A tarefa nova ou já existente
+        """
+        with self._lock:
+            tarefa = self._tarefas.get(chave)
+            if tarefa is not None and tarefa.estado != ERRO:
+                self._tarefas.move_to_end(chave)
+                return tarefa
+            tarefa = Tarefa(chave, nome)
+            self._tarefas[chave] = tarefa
+            self._descartar_antigas()
+        registrar_log(f"Tarefa {nome} enfileirada", "info")
+        self._pool.submit(tarefa._executar, funcao, args, kwargs)
+        return tarefa
+
+    def obter(self, chave):
+        """Retorna a tarefa registrada com a chave, ou None."""
+        with self._lock:
+            return self._tarefas.get(chave)
+
+    def listar(self):
+        """Retorna as tarefas registradas, da mais antiga para a mais recente."""
+        with self._lock:
+            return list(self._tarefas.values())
+
+    def _descartar_antigas(self):
+        finalizadas = [chave for chave, tarefa in self._tarefas.items() if tarefa.finalizada]
+        for chave in finalizadas[:max(0, len(finalizadas) - self._max_finalizadas)]:
+            del self._tarefas[chave]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def obter_executor():
+    """Retorna o executor de tarefas do processo, criando-o na primeira chamada."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ExecutorTarefas()
+        return _executor
@@ -0,0 +1,166 @@
+import io
+import json
+import os
+import re
+from functools import lru_cache
+
+# Arquivo com os layouts de relatório. Novos layouts podem ser adicionados
+# diretamente neste JSON, sem alteração de código.
+ARQUIVO_LAYOUTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts_relatorio.json")
+
+# Sintaxe (inspirada em mustache):
+#   {{campo}}            valor do campo no contexto atual (procura também nos contextos externos)
+#   {{campo|filtro}}     valor do campo transformado por um filtro registrado
+#   {{#campo}}...{{/campo}}  repete o trecho para cada item da lista, ou exibe uma vez se o valor for verdadeiro
+#   {{^campo}}...{{/campo}}  exibe o trecho apenas se o valor for falso ou lista vazia
+#   {{>layout}}          inclui outro layout do mesmo arquivo
+_RE_TAG = re.compile(r"\{\{([#^/>]?)\s*([^{}|]+?)\s*(?:\|\s*(\w+)\s*)?\}\}")
+
+FILTROS = {}
+
+def registrar_filtro(nome):
+    """Decorador que registra uma função como filtro utilizável nos layouts ({{campo|nome}})."""
+    def decorador(funcao):
+        FILTROS[nome] = funcao
+        return funcao
+    return decorador
+
+@registrar_filtro("data_hora")
+def formatar_data_hora(valor):
+    """Formata datas como DD/MM/YYYY HH:MM, retornando "[Data inválida]" se não for possível."""
+    try:
+        return valor.strftime('%d/%m/%Y %H:%M')
+    except Exception:
+        return "[Data inválida]"
+
+def carregar_layouts(caminho=ARQUIVO_LAYOUTS):
+    """
+    Lê o arquivo de layouts.
+    Cada layout pode ser uma string ou uma lista de linhas (unidas com "\\n").
+
+    Returns:
+        dict: nome do layout -> texto do layout.
+    """
+    with open(caminho, "r", encoding="utf-8") as arquivo:
+        layouts = json.load(arquivo)
+    return {
+        nome: "\n".join(texto) if isinstance(texto, list) else texto
+        for nome, texto in layouts.items()
+    }
+
+def _compilar_texto(texto, layouts, incluidos=()):
+    """Converte o texto do layout em uma lista de operações já resolvidas."""
+    raiz = []
+    pilha = [(None, raiz)]
+    posicao = 0
+
+    for match in _RE_TAG.finditer(texto):
+        operacoes = pilha[-1][1]
+        if match.start() > posicao:
+            operacoes.append(("texto", texto[posicao:match.start()]))
+        posicao = match.end()
+
+        tipo, nome, filtro = match.groups()
+        if tipo == "":
+            if filtro and filtro not in FILTROS:
+                raise ValueError(f"Filtro '{filtro}' não registrado")
+            operacoes.append(("campo", nome, filtro))
+        elif tipo in ("#", "^"):
+            filhos = []
+            operacoes.append(("secao" if tipo == "#" else "invertida", nome, filhos))
+            pilha.append((nome, filhos))
+        elif tipo == "/":
+            if pilha[-1][0] != nome:
+                raise ValueError(f"Fechamento '{{{{/{nome}}}}}' sem abertura correspondente")
+            pilha.pop()
+        elif tipo == ">":
+            if nome not in layouts:
+                raise ValueError(f"Layout '{nome}' não encontrado")
+            if nome in incluidos:
+                raise ValueError(f"Inclusão recursiva do layout '{nome}'")
+            operacoes.extend(_compilar_texto(layouts[nome], layouts, incluidos + (nome,)))
+
+    if len(pilha) > 1:
+        raise ValueError(f"Seção '{pilha[-1][0]}' não foi fechada")
+    if posicao < len(texto):
+        raiz.append(("texto", texto[posicao:]))
+    return raiz
+
+def _buscar(contextos, nome):
+    """Procura o campo do contexto mais interno para o mais externo."""
+    for contexto in reversed(contextos):
+        if isinstance(contexto, dict) and nome in contexto:
+            return contexto[nome]
+    return None
+
+class Modelo:
+    """Layout compilado, pronto para ser renderizado várias vezes."""
+
+    def __init__(self, nome, operacoes):
+        self.nome = nome
+        self.operacoes = operacoes
+
+    def renderizar(self, contexto, saida=None):
+        """
+        Renderiza o layout com os dados do contexto.
+
+        Args:
+            contexto (dict): Dados disponíveis para o layout.
+            saida: Objeto com método write (StringIO, arquivo aberto, stdout).
+                Se None, o relatório é montado em memória e retornado.
+
+        Returns:
+            str | None: O texto renderizado quando saida é None.
+        """
+        if saida is None:
+            buffer = io.StringIO()
+            self._executar(self.operacoes, [contexto], buffer.write)
+            return buffer.getvalue()
+        self._executar(self.operacoes, [contexto], saida.write)
+        return None
+
+    def _executar(self, operacoes, contextos, escrever):
+        for operacao in operacoes:
+            tipo = operacao[0]
+            if tipo == "texto":
+                escrever(operacao[1])
+            elif tipo == "campo":
+                valor = _buscar(contextos, operacao[1])
+                if operacao[2]:
+                    valor = FILTROS[operacao[2]](valor)
+                escrever("" if valor is None else str(valor))
+            elif tipo == "secao":
+                valor = _buscar(contextos, operacao[1])
+                if isinstance(valor, (list, tuple)):
+                    for item in valor:
+                        contextos.append(item)
+                        self._executar(operacao[2], contextos, escrever)
+                        contextos.pop()
+                elif valor:
+                    contextos.append(valor)
+                    self._executar(operacao[2], contextos, escrever)
+                    contextos.pop()
+            elif tipo == "invertida":
+                if not _buscar(contextos, operacao[1]):
+                    self._executar(operacao[2], contextos, escrever)
+
+@lru_cache(maxsize=None)
+def compilar(nome, caminho=ARQUIVO_LAYOUTS):
+    """
+    Compila o layout uma única vez; as chamadas seguintes reutilizam o modelo em cache.
+
+    Args:
+        nome (str): Nome do layout no arquivo de layouts.
+        caminho (str): Arquivo de layouts.
+
+    Returns:
+        Modelo: O layout compilado.
+    """
+    layouts = carregar_layouts(caminho)
+    if nome not in layouts:
+        raise ValueError(f"Layout '{nome}' não encontrado em {caminho}")
+    return Modelo(nome, _compilar_texto(layouts[nome], layouts, (nome,)))
+
+def renderizar(nome, contexto, saida=None):
+    """Atalho para compilar (com cache) e renderizar um layout."""
+    return compilar(nome).renderizar(contexto, saida)
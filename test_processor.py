@@ -4,10 +4,22 @@ from datetime import datetime
 from pytz import timezone
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 from io import BytesIO
 import traceback
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from logger import registrar_log
+from diario_xlsx import AnexadorDiario, DiarioIncompativel
+from indice_diario import IndiceDiario
+from cache_compartilhado import hash_conteudo
+from arquivo_enviado import como_arquivo_enviado
+from leitor_xlsx import abrir_planilha
+from perfilamento import perfilado
+from pipeline import ErroEtapa, Etapa, Pipeline
 
 # Apenas os 3 status válidos que serão aceitos no processamento final
 STATUS_VALIDOS_FINAIS = ['Passed', 'Not Executed', 'Failed']
@@ -29,6 +41,9 @@ CORES_STATUS = {
     'Failed': PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
 }
 
+# Cores em RGB usadas pela anexação em streaming
+CORES_STATUS_RGB = {status: fill.fgColor.rgb for status, fill in CORES_STATUS.items()}
+
 # Para o mapeamento de cores, criar aliases para diferentes formas de escrita
 for status in ['passed', 'PASSED']:
     CORES_STATUS[status] = CORES_STATUS['Passed']
@@ -39,6 +54,9 @@ for status in ['not executed', 'NOT EXECUTED', 'Not executed']:
 for status in ['failed', 'FAILED']:
     CORES_STATUS[status] = CORES_STATUS['Failed']
 
+# Última linha de uma planilha do Excel (limite da formatação condicional de status)
+MAX_LINHAS_EXCEL = 1048576
+
 # Colunas a serem ignoradas no processamento
 COLUNAS_IGNORAR = ['ID Fluxo', 'Planejamento', 'Prioridade', 'Obervação']
 
@@ -59,273 +77,580 @@ COLUNAS_DESTINO = [
     'Resultado esperado', 'Status', 'N° INC'
 ]
 
-def processar_testes(arquivo_caderno, arquivo_diario, data_manual=None):
+# Abas do caderno de testes processadas, em ordem
+ABAS_CADERNO = ['Caderno App Vivo', 'Caderno Web B2C']
+
+# Colunas (já com o nome padronizado) lidas do caderno: as de destino e as padronizadas
+# pelo mapeamento. 'Data' não é lida pois é sempre preenchida pelo processamento.
+COLUNAS_CARREGADAS = (set(COLUNAS_DESTINO) | set(MAPEAMENTO_COLUNAS.values())) - {'Data'}
+
+def selecionar_colunas(cabecalho):
     """
-    Processa e mescla os arquivos de teste no arquivo diário existente.
+    Identifica, a partir do cabeçalho de uma aba, quais colunas devem ser carregadas.
     
     Args:
-        arquivo_caderno: Arquivo Excel contendo os testes nas abas "Caderno App Vivo" e "Caderno Web B2C"
-        arquivo_diario: Arquivo Excel de acompanhamento diário com a aba "B2C"
-        data_manual: Data no formato DD/MM/YYYY para os registros (opcional)
+        cabecalho: Nomes das colunas da aba, na ordem da planilha
         
     Returns:
-        tuple: (BytesIO do arquivo processado, quantidade de registros adicionados)
+        tuple: (posições das colunas a carregar, nome da coluna de status ou None)
+    """
+    posicoes = []
+    coluna_status = None
+    for posicao, col in enumerate(cabecalho):
+        nome_padrao = MAPEAMENTO_COLUNAS.get(col, col)
+        if nome_padrao in COLUNAS_IGNORAR:
+            continue
+        if nome_padrao == 'Status':
+            # Apenas a primeira coluna de status reconhecida é considerada
+            if coluna_status is not None or col not in MAPEAMENTO_COLUNAS:
+                continue
+            coluna_status = col
+        if nome_padrao in COLUNAS_CARREGADAS:
+            posicoes.append(posicao)
+    return posicoes, coluna_status
+
+def normalizar_status(valor):
+    """
+    Resolve um valor bruto de status para um dos STATUS_VALIDOS_FINAIS.
+    
+    Args:
+        valor: Valor da coluna Status como veio do caderno
         
-    Raises:
-        Exception: Erro durante o processamento dos arquivos
+    Returns:
+        str: Status padronizado, ou None se o registro deve ser descartado
+    """
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        valor = ''
+    status = str(valor).strip().title()
+    
+    # Normalizar valores para os três status válidos finais
+    minusculo = status.lower()
+    if 'not executed' in minusculo:
+        status = 'Not Executed'
+    
+    # Status "A validar" e variações são sempre excluídos
+    if any(excluido.lower() in status.lower() for excluido in STATUS_EXCLUIDOS):
+        return None
+    return status if status in STATUS_VALIDOS_FINAIS else None
+
+def normalizar_coluna_status(serie):
+    """
+    Normaliza a coluna Status em uma única passada.
+    Cada valor distinto é resolvido uma vez por normalizar_status e o resultado
+    é aplicado a todas as linhas através dos códigos do pd.factorize.
+    
+    Args:
+        serie: Coluna Status com os valores brutos
+        
+    Returns:
+        tuple: (Series categórica com STATUS_VALIDOS_FINAIS como categorias e NaN nos
+                registros descartados, dict valor bruto -> status resolvido)
+    """
+    codigos, valores_unicos = pd.factorize(serie, use_na_sentinel=False)
+    resolvidos = {valor: normalizar_status(valor) for valor in valores_unicos}
+    tabela = np.array(
+        [-1 if resolvidos[valor] is None else STATUS_VALIDOS_FINAIS.index(resolvidos[valor]) for valor in valores_unicos],
+        dtype=np.int8
+    )
+    categorias = pd.Categorical.from_codes(tabela[codigos], categories=STATUS_VALIDOS_FINAIS)
+    return pd.Series(categorias, index=serie.index, name=serie.name), resolvidos
+
+def mapear_colunas(df_filtrado, header):
+    """Reordena as colunas do DataFrame para corresponder ao cabeçalho do arquivo diário."""
+    if list(df_filtrado.columns) == list(header):
+        # Já alinhado ao cabeçalho na leitura do caderno
+        return df_filtrado
+    try:
+        return df_filtrado.reindex(columns=header, fill_value='')
+    except Exception as e:
+        registrar_log(f"Erro ao mapear colunas: {str(e)}", "erro")
+        # Tentar corrigir problemas de índice
+        registrar_log("Tentando abordagem alternativa para mapear colunas", "info")
+        df_mapped = pd.DataFrame(columns=header)
+        for col in header:
+            if col in df_filtrado.columns:
+                df_mapped[col] = df_filtrado[col]
+        return df_mapped
+
+def aplicar_cores_status(ws, header):
+    """
+    Garante uma formatação condicional na coluna Status com as cores de CORES_STATUS.
+    A regra cobre a coluna inteira e só é adicionada se ainda não existir no arquivo.
+    
+    Args:
+        ws: Aba do openpyxl
+        header: Cabeçalho da aba
+    """
+    if 'Status' not in header:
+        return
+    letra = get_column_letter(header.index('Status') + 1)
+    faixa = f"{letra}2:{letra}{MAX_LINHAS_EXCEL}"
+    
+    formulas_existentes = set()
+    for formatacao in ws.conditional_formatting:
+        if str(formatacao.sqref) == faixa:
+            formulas_existentes.update(tuple(regra.formula or ()) for regra in formatacao.rules)
+    
+    for status in STATUS_VALIDOS_FINAIS:
+        formula = [f'"{status}"']
+        if tuple(formula) not in formulas_existentes:
+            # A comparação "igual" do Excel não diferencia maiúsculas de minúsculas
+            ws.conditional_formatting.add(faixa, CellIsRule(operator='equal', formula=formula, fill=CORES_STATUS[status]))
+
+def remover_duplicados(df_filtrado, indice, header, ultima_linha, valores_ultima_linha, ler_historico):
+    """
+    Remove os registros que já existem no arquivo diário, consultando o índice de hashes.
+    O histórico da aba só é lido quando o índice está ausente ou desatualizado.
+    
+    Args:
+        df_filtrado: DataFrame com os registros a adicionar (já com a coluna Data)
+        indice: IndiceDiario da aba
+        header: Cabeçalho da aba
+        ultima_linha: Número da última linha com dados da aba
+        valores_ultima_linha: Valores da última linha com dados, na ordem do cabeçalho
+        ler_historico: Função que retorna as linhas existentes (valores na ordem do cabeçalho)
+        
+    Returns:
+        tuple: (DataFrame sem duplicados, colunas chave, hashes dos registros mantidos)
     """
+    # Chave do registro: a data e as colunas de destino presentes no arquivo diário
+    colunas_chave = [col for col in COLUNAS_DESTINO if col in header]
+    posicoes = [header.index(col) for col in colunas_chave]
+    
+    def chave(linha):
+        return [linha[posicao] if posicao < len(linha) else None for posicao in posicoes]
+    
+    if not indice.valido(colunas_chave, ultima_linha, chave(valores_ultima_linha)):
+        registrar_log("Índice do arquivo diário ausente ou desatualizado, lendo histórico", "info")
+        indice.reconstruir(colunas_chave, (chave(linha) for linha in ler_historico()),
+                           ultima_linha, chave(valores_ultima_linha))
+    
+    registros = df_filtrado.reindex(columns=colunas_chave, fill_value='').itertuples(index=False, name=None)
+    manter, hashes = indice.filtrar(registros)
+    duplicados = len(manter) - len(hashes)
+    if duplicados:
+        registrar_log(f"{duplicados} registro(s) já existente(s) no arquivo diário ignorado(s)", "aviso")
+    return df_filtrado[manter], colunas_chave, hashes
+
+def registrar_no_indice(indice, colunas_chave, hashes, df_filtrado, ultima_linha):
+    """Acrescenta ao índice os registros anexados após a última linha com dados."""
+    if indice is None or not hashes:
+        return
+    ultimo_registro = df_filtrado.reindex(columns=colunas_chave, fill_value='').iloc[-1].tolist()
+    indice.registrar(colunas_chave, hashes, ultima_linha + len(df_filtrado), ultimo_registro)
+
+def anexar_com_openpyxl(diario, df_filtrado, indice=None):
+    """
+    Anexa os registros à aba "B2C" carregando o arquivo diário inteiro com openpyxl.
+    Usado quando o arquivo não é compatível com a anexação em streaming.
+    
+    Args:
+        diario: ArquivoEnviado do arquivo diário
+        df_filtrado: DataFrame com os registros a adicionar (já com a coluna Data)
+        indice: IndiceDiario usado para ignorar registros já existentes (opcional)
+        
+    Returns:
+        tuple: (BytesIO do arquivo processado, DataFrame mapeado para o cabeçalho)
+    """
+    # Carregar o arquivo diário
     try:
-        registrar_log("Iniciando processamento de arquivos de teste", "info")
-        all_data = []  # Usar uma lista para armazenar todos os registros
+        registrar_log("Carregando arquivo diário", "info")
+        wb = load_workbook(diario.abrir())
+        
+        # Verificar se a aba B2C existe
+        if 'B2C' not in wb.sheetnames:
+            msg = "Aba 'B2C' não encontrada no arquivo diário!"
+            registrar_log(msg, "erro")
+            raise Exception(msg)
+            
+        ws = wb['B2C']
+        registrar_log("Aba B2C encontrada e carregada", "info")
+    except Exception as e:
+        registrar_log(f"Erro ao carregar arquivo diário: {str(e)}", "erro")
+        raise Exception(f"Erro ao carregar arquivo diário: {str(e)}")
+    
+    # Encontrar a última linha com dados
+    ultima_linha = ws.max_row
+    while ultima_linha > 0 and ws.cell(row=ultima_linha, column=1).value is None:
+        ultima_linha -= 1
+        
+    registrar_log(f"Última linha com dados: {ultima_linha}", "info")
+    
+    # Obter cabeçalho do arquivo diário
+    header = [cell.value for cell in ws[1]]
+    registrar_log(f"Cabeçalho obtido: {len(header)} colunas", "info")
+    
+    if indice is not None:
+        df_filtrado, colunas_chave, hashes = remover_duplicados(
+            df_filtrado, indice, header, ultima_linha,
+            [cell.value for cell in ws[ultima_linha]] if ultima_linha > 0 else [],
+            lambda: ws.iter_rows(min_row=2, max_row=ultima_linha, values_only=True)
+        )
+    
+    # Mapear as colunas do DataFrame para corresponder ao cabeçalho do arquivo
+    df_mapped = mapear_colunas(df_filtrado, header)
+    
+    # Adicionar os novos registros ao arquivo
+    registrar_log(f"Adicionando {len(df_mapped)} novos registros", "info")
+    for r_idx, row in enumerate(dataframe_to_rows(df_mapped, index=False, header=False), 1):
+        nova_linha = ultima_linha + r_idx
+        for c_idx, value in enumerate(row, 1):
+            ws.cell(row=nova_linha, column=c_idx, value=value)
+    
+    # A cor do status vem de uma formatação condicional única na coluna, sem estilo por célula
+    aplicar_cores_status(ws, header)
+    
+    # Salvar o resultado
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    
+    if indice is not None:
+        registrar_no_indice(indice, colunas_chave, hashes, df_filtrado, ultima_linha)
+    return output, df_mapped
+
+def ler_caderno(arquivo_caderno):
+    """
+    Lê as abas de um caderno de testes, apenas com as colunas usadas no arquivo diário
+    e já renomeadas pelo MAPEAMENTO_COLUNAS.
+    
+    Args:
+        arquivo_caderno: Planilha (XLSX ou ODS) contendo os testes nas abas de ABAS_CADERNO
+        
+    Returns:
+        list: Um DataFrame por aba lida
+        
+    Raises:
+        ErroEtapa: Nenhuma aba válida
+    """
+    frames = []  # Um DataFrame por aba, concatenados coluna a coluna ao final
+    
+    # Abrir o caderno uma única vez; todas as abas são lidas deste mesmo objeto
+    with abrir_planilha(arquivo_caderno) as leitor:
+        available_sheets = leitor.abas
         
         # Processar cada aba do caderno de testes
-        for sheet_name in ['Caderno App Vivo', 'Caderno Web B2C']:
+        for sheet_name in ABAS_CADERNO:
             try:
                 registrar_log(f"Processando aba {sheet_name}", "info")
-                try:
-                    # Tentar ler a aba específica
-                    df = pd.read_excel(
-                        arquivo_caderno,
-                        sheet_name=sheet_name,
-                        engine='openpyxl',
-                        dtype=str
-                    )
-                except Exception as sheet_error:
-                    registrar_log(f"Erro ao ler aba {sheet_name}: {str(sheet_error)}", "erro")
-                    # Tentar identificar todas as abas disponíveis
-                    xls = pd.ExcelFile(arquivo_caderno)
-                    available_sheets = xls.sheet_names
+                aba = sheet_name
+                if aba not in available_sheets:
+                    registrar_log(f"Erro ao ler aba {sheet_name}: aba não encontrada", "erro")
                     registrar_log(f"Abas disponíveis no arquivo: {', '.join(available_sheets)}", "info")
                     
                     # Se não conseguir encontrar a aba específica, tente usar a primeira aba
                     if len(available_sheets) > 0:
-                        registrar_log(f"Tentando usar a primeira aba disponível: {available_sheets[0]}", "info")
-                        df = pd.read_excel(
-                            arquivo_caderno,
-                            sheet_name=available_sheets[0],
-                            engine='openpyxl',
-                            dtype=str
-                        )
+                        aba = available_sheets[0]
+                        registrar_log(f"Tentando usar a primeira aba disponível: {aba}", "info")
                     else:
                         raise Exception(f"Não foi possível encontrar nenhuma aba válida no arquivo!")
                 
-                # Registrar as colunas encontradas para diagnóstico
-                registrar_log(f"Colunas encontradas na aba {sheet_name}: {', '.join(df.columns.tolist())}", "info")
-                
-                # Verificar se há alguma coluna de status
-                coluna_status = None
-                for col in df.columns:
-                    if col in MAPEAMENTO_COLUNAS and MAPEAMENTO_COLUNAS[col] == 'Status':
-                        coluna_status = col
-                        registrar_log(f"Coluna de status encontrada: '{col}'", "info")
-                        break
+                # Ler apenas o cabeçalho para decidir se a aba é utilizável
+                cabecalho = leitor.cabecalho(aba)
+                registrar_log(f"Colunas encontradas na aba {sheet_name}: {', '.join(map(str, cabecalho))}", "info")
                 
+                posicoes, coluna_status = selecionar_colunas(cabecalho)
                 if not coluna_status:
                     registrar_log(f"Nenhuma coluna de status reconhecida na aba {sheet_name}", "aviso")
                     continue
+                registrar_log(f"Coluna de status encontrada: '{coluna_status}'", "info")
                 
-                # Renomear as colunas com base no mapeamento
-                colunas_renomeadas = {}
-                for col in df.columns:
-                    if col in MAPEAMENTO_COLUNAS:
-                        colunas_renomeadas[col] = MAPEAMENTO_COLUNAS[col]
-                
-                # Aplicar renomeação e remover colunas ignoradas
-                df = df.rename(columns=colunas_renomeadas)
-                for col in COLUNAS_IGNORAR:
-                    if col in df.columns:
-                        df = df.drop(columns=[col])
+                # Carregar somente as colunas que serão usadas no arquivo diário
+                df = leitor.ler_aba(aba, [cabecalho[i] for i in posicoes], como_texto=True)
                 
-                # Verificar e tratar valores nulos no status
-                if 'Status' in df.columns:
-                    # Preencher valores nulos e converter para string
-                    df['Status'] = df['Status'].fillna('').astype(str)
-                    registrar_log(f"Valores nulos na coluna Status tratados", "info")
+                # Renomear as colunas com base no mapeamento
+                df = df.rename(columns={col: MAPEAMENTO_COLUNAS[col] for col in df.columns if col in MAPEAMENTO_COLUNAS})
                 
-                # Resolver problema com índices duplicados: converter para dicionário e depois para lista
-                df_records = df.to_dict('records')
-                all_data.extend(df_records)
+                # Colunas que passam a ter o mesmo nome após o mapeamento: prevalece a última
+                df = df.loc[:, ~df.columns.duplicated(keep='last')]
+                frames.append(df)
                 
-                registrar_log(f"Aba {sheet_name} processada: {len(df_records)} linhas", "info")
+                registrar_log(f"Aba {sheet_name} processada: {len(df)} linhas", "info")
                 
             except Exception as e:
                 registrar_log(f"Erro ao processar aba {sheet_name}: {str(e)}", "erro")
                 registrar_log(f"Detalhes: {traceback.format_exc()}", "erro")
                 continue
+    
+    # Verificar se há dados para processar
+    if not any(len(df) for df in frames):
+        msg = "Nenhuma aba válida encontrada no caderno de testes!"
+        registrar_log(msg, "erro")
+        raise ErroEtapa(msg)
+    return frames
+
+def montar_caderno(frames, data=None, colunas=None):
+    """
+    Junta as abas lidas do caderno e retorna os registros com status válido, já normalizados.
+    
+    Args:
+        frames: Abas lidas por ler_caderno (não são alteradas)
+        data: Data (DD/MM/YYYY) gravada na coluna Data dos registros (opcional)
+        colunas: Colunas do arquivo diário. Quando informado, as abas já são alinhadas
+            neste layout na concatenação, sem uma reordenação posterior
         
-        # Verificar se há dados para processar
-        if not all_data:
-            msg = "Nenhuma aba válida encontrada no caderno de testes!"
-            registrar_log(msg, "erro")
-            raise Exception(msg)
-            
-        # Criar um novo DataFrame a partir dos registros combinados
-        df_combined = pd.DataFrame(all_data)
-        registrar_log(f"Total de linhas combinadas: {len(df_combined)}", "info")
+    Returns:
+        DataFrame: Registros com status em STATUS_VALIDOS_FINAIS
         
-        # Verificar se a coluna Status existe
-        if 'Status' not in df_combined.columns:
-            msg = "Coluna 'Status' não encontrada nos dados. Verifique se o arquivo tem as colunas corretas."
-            registrar_log(msg, "erro")
-            raise Exception(msg)
+    Raises:
+        ErroEtapa: Coluna Status ausente ou nenhum teste com status válido
+    """
+    if colunas is not None:
+        # A coluna Status é mantida mesmo que o arquivo diário não a tenha, pois é usada no filtro
+        layout = list(colunas) + (['Status'] if 'Status' not in colunas else [])
+        frames = [df.reindex(columns=layout, fill_value='') for df in frames]
         
-        # Tratamento de valores nulos/vazios na coluna Status
-        registrar_log(f"Verificando valores nulos na coluna Status", "info")
-        valores_nulos = df_combined['Status'].isna().sum()
-        if valores_nulos > 0:
-            registrar_log(f"Encontrados {valores_nulos} valores nulos na coluna Status", "aviso")
-            df_combined['Status'] = df_combined['Status'].fillna('')
-            
-        # Verificar tipos de dados na coluna Status
-        tipos_status = df_combined['Status'].apply(type).unique()
-        registrar_log(f"Tipos de dados na coluna Status: {[t.__name__ for t in tipos_status]}", "info")
+    # Concatenar as abas alinhadas pelo conjunto unificado de colunas, com novo índice
+    df_combined = pd.concat(frames, ignore_index=True, sort=False) if len(frames) > 1 else frames[0].reset_index(drop=True)
+    if data is not None:
+        df_combined['Data'] = data
+    registrar_log(f"Total de linhas combinadas: {len(df_combined)}", "info")
+    
+    # Verificar se a coluna Status existe
+    if 'Status' not in df_combined.columns:
+        msg = "Coluna 'Status' não encontrada nos dados. Verifique se o arquivo tem as colunas corretas."
+        registrar_log(msg, "erro")
+        raise ErroEtapa(msg)
+    
+    # Normalizar e filtrar o status em uma única etapa
+    registrar_log(f"Filtrando apenas pelos status: {', '.join(STATUS_VALIDOS_FINAIS)}", "info")
+    df_combined['Status'], resolvidos = normalizar_coluna_status(df_combined['Status'])
+    registrar_log(f"Valores únicos de status encontrados: {', '.join([str(s) for s in resolvidos])}", "info")
+    
+    # Registrar os status descartados para diagnóstico
+    status_descartados = sorted({str(valor).strip().title() for valor, status in resolvidos.items() if status is None})
+    if status_descartados:
+        registrar_log(f"Status indesejados encontrados e que serão excluídos: {', '.join(status_descartados)}", "aviso")
+    
+    df_filtrado = df_combined[df_combined['Status'].notna()]
+    registrar_log(f"Linhas com status válido: {len(df_filtrado)} de {len(df_combined)} total", "info")
+    
+    status_finais = df_filtrado['Status'].unique().tolist()
+    registrar_log(f"Status após filtragem final: {', '.join([str(s) for s in status_finais])}", "info")
+    
+    if df_filtrado.empty:
+        msg = f"Nenhum teste com status válido encontrado para processar! Aceitos apenas: {', '.join(STATUS_VALIDOS_FINAIS)}"
+        registrar_log(msg, "aviso")
         
-        # Garantir que Status seja string antes de processar
-        df_combined['Status'] = df_combined['Status'].astype(str)
+        # Mostrar os status encontrados para ajudar no diagnóstico
+        if status_descartados:
+            msg += f" Status encontrados: {', '.join(status_descartados)}"
         
-        # Padronizar status (remover espaços extras e normalizar case)
-        df_combined['Status'] = df_combined['Status'].str.strip().str.title()
+        raise ErroEtapa(msg)
+    
+    return df_filtrado
+
+def preparar_caderno(arquivo_caderno, data=None, colunas=None):
+    """
+    Lê um caderno de testes e retorna os registros com status válido, já normalizados
+    (ler_caderno seguido de montar_caderno, sem cache).
+    
+    Args:
+        arquivo_caderno: Planilha (XLSX ou ODS) contendo os testes nas abas de ABAS_CADERNO
+        data: Data (DD/MM/YYYY) gravada na coluna Data dos registros (opcional)
+        colunas: Colunas do arquivo diário
         
-        # Registrar valores únicos de status para diagnóstico
-        status_valores = df_combined['Status'].unique().tolist()
-        registrar_log(f"Valores únicos de status encontrados: {', '.join([str(s) for s in status_valores])}", "info")
+    Returns:
+        DataFrame: Registros com status em STATUS_VALIDOS_FINAIS
+    """
+    return montar_caderno(ler_caderno(arquivo_caderno), data, colunas)
+
+def ler_caderno_enviado(arquivo):
+    """Etapa do pipeline: ler_caderno a partir de um ArquivoEnviado."""
+    return ler_caderno(arquivo.abrir())
+
+# A leitura do caderno fica guardada por conteúdo; outra data ou outro layout do arquivo
+# diário só refazem a montagem dos registros
+PIPELINE_CADERNO = Pipeline("caderno", [
+    Etapa("ler", ler_caderno_enviado),
+    Etapa("montar", montar_caderno, config=("data", "colunas"), persistir=False),
+])
+
+def executar_caderno(arquivo, hash_arquivo, data=None, colunas=None):
+    """Prepara um caderno (ArquivoEnviado) pelo PIPELINE_CADERNO; usada também nos processos do
+    lote, que recebem os arquivos mapeados em memória apenas pelo caminho."""
+    return PIPELINE_CADERNO.executar(arquivo, hash_arquivo, {"data": data, "colunas": colunas})
+
+def ler_historico_diario(diario, ultima_linha):
+    """Percorre as linhas de dados da aba "B2C" em modo somente leitura."""
+    wb = load_workbook(diario.abrir(), read_only=True)
+    try:
+        yield from wb['B2C'].iter_rows(min_row=2, max_row=ultima_linha, values_only=True)
+    finally:
+        wb.close()
+
+def ler_cabecalho_diario(diario, modo_anexar=True):
+    """
+    Lê o cabeçalho da aba "B2C" antes do processamento dos cadernos.
+    
+    Args:
+        diario: ArquivoEnviado do arquivo diário
+        modo_anexar: Se True, tenta preparar a anexação em streaming
         
-        # Normalizar valores específicos (caso 'not executed' esteja escrito diferente) de forma segura
+    Returns:
+        tuple: (cabeçalho ou None se não puder ser lido, AnexadorDiario ou None)
+    """
+    if modo_anexar:
         try:
-            # Normalizar valores para os três status válidos finais
-            # Primeiro, normaliza 'Not Executed'
-            mask = df_combined['Status'].str.lower().str.contains('not executed', na=False)
-            df_combined.loc[mask, 'Status'] = 'Not Executed'
-            
-            # Normaliza 'Passed'
-            mask = df_combined['Status'].str.lower() == 'passed'
-            df_combined.loc[mask, 'Status'] = 'Passed'
-            
-            # Normaliza 'Failed'
-            mask = df_combined['Status'].str.lower() == 'failed'
-            df_combined.loc[mask, 'Status'] = 'Failed'
-            
-            # Registro para debug
-            status_apos_normalizacao = df_combined['Status'].unique().tolist()
-            registrar_log(f"Status após normalização: {', '.join([str(s) for s in status_apos_normalizacao])}", "info")
-            
-            # Verificar presença de status indesejados
-            status_indesejados = [s for s in status_apos_normalizacao if s not in STATUS_VALIDOS_FINAIS]
-            if status_indesejados:
-                registrar_log(f"Status indesejados encontrados e que serão excluídos: {', '.join(status_indesejados)}", "aviso")
-                
-            # Verificar explicitamente se temos status "A validar" ou variações
-            status_a_validar = [s for s in status_apos_normalizacao if any(excluido.lower() in s.lower() for excluido in STATUS_EXCLUIDOS)]
-            if status_a_validar:
-                registrar_log(f"Status 'A validar' encontrados e que serão excluídos: {', '.join(status_a_validar)}", "aviso")
-        except Exception as e:
-            registrar_log(f"Erro ao normalizar valores de status: {str(e)}", "erro")
-            # Continuar o processamento mesmo que a normalização falhe
+            anexador = AnexadorDiario(diario.abrir(), 'B2C')
+            return anexador.cabecalho, anexador
+        except DiarioIncompativel as e:
+            registrar_log(f"Anexação em streaming indisponível ({str(e)}), usando openpyxl", "aviso")
+    try:
+        wb = load_workbook(diario.abrir(), read_only=True)
+        try:
+            if 'B2C' in wb.sheetnames:
+                return list(next(wb['B2C'].iter_rows(max_row=1, values_only=True), ())), None
+        finally:
+            wb.close()
+    except Exception as e:
+        # O erro é reportado ao gravar no arquivo diário
+        registrar_log(f"Não foi possível ler o cabeçalho do arquivo diário: {str(e)}", "aviso")
+    return None, None
+
+def gravar_no_diario(df_filtrado, diario, modo_anexar=True, nome_diario=None, anexador=None):
+    """
+    Grava os registros na aba "B2C" do arquivo diário.
+    
+    Args:
+        df_filtrado: DataFrame com os registros a adicionar (já com a coluna Data)
+        diario: ArquivoEnviado do arquivo diário
+        modo_anexar: Se True, anexa as linhas sem carregar o histórico do arquivo diário
+            (com retorno automático para openpyxl quando o arquivo não for compatível)
+        nome_diario: Nome do arquivo diário. Quando informado, registros que já existem
+            no arquivo são ignorados, consultando o índice persistente da aba
+        anexador: AnexadorDiario já aberto para estes dados (opcional)
         
-        # Filtrar APENAS pelos três status válidos finais com checagem estrita
-        registrar_log(f"Filtrando apenas pelos status: {', '.join(STATUS_VALIDOS_FINAIS)}", "info")
+    Returns:
+        tuple: (BytesIO do arquivo processado, quantidade de registros adicionados)
+    """
+    indice = IndiceDiario(nome_diario, 'B2C') if nome_diario else None
+    output = None
+    if modo_anexar:
+        try:
+            if anexador is None:
+                anexador = AnexadorDiario(diario.abrir(), 'B2C')
+            registrar_log(f"Anexação em streaming: última linha com dados {anexador.ultima_linha}", "info")
+            if indice is not None:
+                df_filtrado, colunas_chave, hashes = remover_duplicados(
+                    df_filtrado, indice, anexador.cabecalho, anexador.ultima_linha,
+                    anexador.valores_ultima_linha(),
+                    lambda: ler_historico_diario(diario, anexador.ultima_linha)
+                )
+            df_mapped = mapear_colunas(df_filtrado, anexador.cabecalho)
+            registrar_log(f"Adicionando {len(df_mapped)} novos registros", "info")
+            output = anexador.anexar(
+                dataframe_to_rows(df_mapped, index=False, header=False),
+                cores_status=CORES_STATUS_RGB
+            )
+            if indice is not None:
+                registrar_no_indice(indice, colunas_chave, hashes, df_filtrado, anexador.ultima_linha)
+        except DiarioIncompativel as e:
+            registrar_log(f"Anexação em streaming indisponível ({str(e)}), usando openpyxl", "aviso")
+    
+    if output is None:
+        output, df_mapped = anexar_com_openpyxl(diario, df_filtrado, indice)
+    
+    registrar_log(f"Processamento concluído com sucesso: {len(df_mapped)} registros adicionados", "info")
+    return output, len(df_mapped)
+
+@perfilado("processar_testes")
+def processar_testes(arquivo_caderno, arquivo_diario, data_manual=None, modo_anexar=True, ignorar_duplicados=True):
+    """
+    Processa e mescla os arquivos de teste no arquivo diário existente.
+    
+    Args:
+        arquivo_caderno: Planilha (XLSX ou ODS) contendo os testes nas abas de ABAS_CADERNO
+        arquivo_diario: Arquivo Excel de acompanhamento diário com a aba "B2C"
+        data_manual: Data no formato DD/MM/YYYY para os registros (opcional)
+        modo_anexar: Se True, anexa as linhas sem carregar o histórico do arquivo diário
+            (com retorno automático para openpyxl quando o arquivo não for compatível)
+        ignorar_duplicados: Se True, registros que já existem no arquivo diário não são anexados
         
-        # Antes de filtrar, garantir que nenhum status excluído seja erroneamente incluído
-        for status_excluido in STATUS_EXCLUIDOS:
-            # Remover explicitamente qualquer registro com status a ser excluído
-            mask_excluir = df_combined['Status'].str.contains(status_excluido, case=False, na=False)
-            if mask_excluir.any():
-                qtd_excluidos = mask_excluir.sum()
-                registrar_log(f"Excluindo {qtd_excluidos} registros com status '{status_excluido}'", "info")
-                df_combined = df_combined[~mask_excluir].copy()
+    Returns:
+        tuple: (BytesIO do arquivo processado, quantidade de registros adicionados)
         
-        # Agora aplicar o filtro de status válidos
-        df_filtrado = df_combined[df_combined['Status'].isin(STATUS_VALIDOS_FINAIS)].copy()
-        registrar_log(f"Linhas com status válido: {len(df_filtrado)} de {len(df_combined)} total", "info")
+    Raises:
+        Exception: Erro durante o processamento dos arquivos
+    """
+    return processar_testes_lote([arquivo_caderno], arquivo_diario, data_manual, modo_anexar,
+                                 ignorar_duplicados=ignorar_duplicados)
+
+@perfilado("processar_testes")
+def processar_testes_lote(arquivos_caderno, arquivo_diario, data_manual=None, modo_anexar=True, max_workers=None,
+                          ignorar_duplicados=True, progresso=None):
+    """
+    Processa vários cadernos de teste e mescla todos no arquivo diário com uma única gravação.
+    Os cadernos são lidos em paralelo em um pool de processos.
+    
+    Args:
+        arquivos_caderno: Lista de cadernos de testes em XLSX ou ODS (arquivos, ArquivoEnviado ou caminhos)
+        arquivo_diario: Arquivo Excel de acompanhamento diário com a aba "B2C" (arquivo, ArquivoEnviado ou caminho)
+        data_manual: Data no formato DD/MM/YYYY para os registros (opcional)
+        modo_anexar: Se True, anexa as linhas sem carregar o histórico do arquivo diário
+        max_workers: Número máximo de processos (padrão: um por caderno, limitado às CPUs)
+        ignorar_duplicados: Se True, registros que já existem no arquivo diário (ou repetidos
+            entre os cadernos) não são anexados. O índice da aba é identificado pelo nome
+            do arquivo diário
+        progresso: Função progresso(fração, etapa) chamada a cada etapa (opcional)
         
-        # Verificação final para garantir que não temos status indesejados
-        status_finais = df_filtrado['Status'].unique().tolist()
-        registrar_log(f"Status após filtragem final: {', '.join([str(s) for s in status_finais])}", "info")
+    Returns:
+        tuple: (BytesIO do arquivo processado, quantidade de registros adicionados)
         
-        if df_filtrado.empty:
-            msg = f"Nenhum teste com status válido encontrado para processar! Aceitos apenas: {', '.join(STATUS_VALIDOS_FINAIS)}"
-            registrar_log(msg, "aviso")
-            
-            # Mostrar os status encontrados para ajudar no diagnóstico
-            status_valores = df_combined['Status'].unique().tolist()
-            if status_valores:
-                msg += f" Status encontrados: {', '.join([str(s) for s in status_valores])}"
-            
-            raise Exception(msg)
-            
-        # Verificar de novo se há algum status inválido
-        for status in df_filtrado['Status'].unique():
-            if status not in STATUS_VALIDOS_FINAIS:
-                registrar_log(f"ALERTA: Status inválido '{status}' ainda presente após filtragem!", "erro")
-                # Remover este status específico
-                df_filtrado = df_filtrado[df_filtrado['Status'] != status]
+    Raises:
+        Exception: Erro durante o processamento dos arquivos
+    """
+    progresso = progresso or (lambda fracao, etapa: None)
+    try:
+        registrar_log(f"Iniciando processamento de {len(arquivos_caderno)} caderno(s) de teste", "info")
+        progresso(0.05, "Lendo arquivo diário")
         
-        # Adicionar data aos registros
         data = data_manual if data_manual else datetime.now(timezone('America/Sao_Paulo')).strftime('%d/%m/%Y')
-        df_filtrado.insert(0, 'Data', data)
-        registrar_log(f"Data adicionada aos registros: {data}", "info")
-        
-        # Carregar o arquivo diário
-        try:
-            registrar_log("Carregando arquivo diário", "info")
-            wb = load_workbook(BytesIO(arquivo_diario.read()))
-            
-            # Verificar se a aba B2C existe
-            if 'B2C' not in wb.sheetnames:
-                msg = "Aba 'B2C' não encontrada no arquivo diário!"
-                registrar_log(msg, "erro")
-                raise Exception(msg)
-                
-            ws = wb['B2C']
-            registrar_log("Aba B2C encontrada e carregada", "info")
-        except Exception as e:
-            registrar_log(f"Erro ao carregar arquivo diário: {str(e)}", "erro")
-            raise Exception(f"Erro ao carregar arquivo diário: {str(e)}")
+        registrar_log(f"Data dos registros: {data}", "info")
         
-        # Encontrar a última linha com dados
-        ultima_linha = ws.max_row
-        while ultima_linha > 0 and ws.cell(row=ultima_linha, column=1).value is None:
-            ultima_linha -= 1
-            
-        registrar_log(f"Última linha com dados: {ultima_linha}", "info")
+        # O cabeçalho do arquivo diário define o layout em que os cadernos são montados
+        diario = como_arquivo_enviado(arquivo_diario)
+        header, anexador = ler_cabecalho_diario(diario, modo_anexar)
         
-        # Obter cabeçalho do arquivo diário
-        header = [cell.value for cell in ws[1]]
-        registrar_log(f"Cabeçalho obtido: {len(header)} colunas", "info")
+        # Cadernos já lidos (mesmo conteúdo) vêm do cache do pipeline; com outra data ou
+        # outro layout do arquivo diário só a montagem dos registros é refeita
+        cadernos = [como_arquivo_enviado(arquivo) for arquivo in arquivos_caderno]
+        nomes = [caderno.nome or f"caderno {i}" for i, caderno in enumerate(cadernos, 1)]
+        hashes = [hash_conteudo(caderno.dados) for caderno in cadernos]
+        pendentes = [i for i, hash_caderno in enumerate(hashes) if not PIPELINE_CADERNO.em_cache(hash_caderno, ate="ler")]
+        if len(pendentes) < len(cadernos):
+            registrar_log(f"{len(cadernos) - len(pendentes)} caderno(s) reaproveitado(s) do cache", "info")
         
-        # Mapear as colunas do DataFrame para corresponder ao cabeçalho do arquivo
-        try:
-            df_mapped = df_filtrado.reindex(columns=header, fill_value='')
-        except Exception as e:
-            registrar_log(f"Erro ao mapear colunas: {str(e)}", "erro")
-            # Tentar corrigir problemas de índice
-            registrar_log("Tentando abordagem alternativa para mapear colunas", "info")
-            df_mapped = pd.DataFrame(columns=header)
-            for col in header:
-                if col in df_filtrado.columns:
-                    df_mapped[col] = df_filtrado[col]
+        frames = [None] * len(cadernos)
+        if len(pendentes) == 1:
+            progresso(0.2, "Lendo caderno de testes")
+        elif pendentes:
+            progresso(0.2, f"Lendo {len(pendentes)} cadernos de testes")
+            workers = max_workers or min(len(pendentes), os.cpu_count() or 1)
+            # "spawn" evita copiar o estado (threads) do servidor Streamlit para os processos
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futuros = [pool.submit(executar_caderno, cadernos[i], hashes[i], data, header) for i in pendentes]
+                for lidos, (i, futuro) in enumerate(zip(pendentes, futuros), 1):
+                    try:
+                        frames[i] = futuro.result()
+                    except Exception as e:
+                        raise Exception(f"{nomes[i]}: {str(e)}")
+                    registrar_log(f"Caderno {nomes[i]} processado: {len(frames[i])} registros válidos", "info")
+                    progresso(0.2 + 0.6 * lidos / len(futuros), f"Caderno {lidos} de {len(futuros)} processado")
         
-        # Adicionar os novos registros ao arquivo
-        registrar_log(f"Adicionando {len(df_mapped)} novos registros", "info")
-        for r_idx, row in enumerate(dataframe_to_rows(df_mapped, index=False, header=False), 1):
-            nova_linha = ultima_linha + r_idx
-            for c_idx, value in enumerate(row, 1):
-                cell = ws.cell(row=nova_linha, column=c_idx, value=value)
-                
-                # Aplicar formatação de cor para o status
-                if c_idx <= len(header) and header[c_idx-1] == 'Status':
-                    status = str(value).strip().title() if value is not None else ''
-                    cell.fill = CORES_STATUS.get(status, PatternFill())
+        # Cadernos em cache (e o único pendente) são preparados neste processo
+        for i, frame in enumerate(frames):
+            if frame is None:
+                frames[i] = executar_caderno(cadernos[i], hashes[i], data, header)
         
-        # Salvar o resultado
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
+        df_filtrado = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
         
-        registrar_log(f"Processamento concluído com sucesso: {len(df_mapped)} registros adicionados", "info")
-        return output, len(df_mapped)
+        # Gravar os registros no arquivo diário
+        progresso(0.85, "Gravando no arquivo diário")
+        nome_diario = diario.nome if ignorar_duplicados else None
+        return gravar_no_diario(df_filtrado, diario, anexador is not None, nome_diario, anexador)
 
     except Exception as e:
         registrar_log(f"Erro crítico no processamento de testes: {str(e)}", "erro")
         registrar_log(f"Detalhes: {traceback.format_exc()}", "erro")
-        raise Exception(f"Erro ao processar testes: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Erro ao processar testes: {str(e)}")
@@ -3,9 +3,21 @@ import pandas as pd
 from datetime import datetime
 from pytz import timezone
 from io import BytesIO
-import traceback
-from test_processor import processar_testes, STATUS_VALIDOS_FINAIS
-from logger import registrar_log
+from test_processor import processar_testes_lote, STATUS_VALIDOS_FINAIS
+from tarefas import obter_executor
+from cache_compartilhado import hash_conteudo
+from painel_tarefas import acompanhar_tarefa
+from arquivo_enviado import ArquivoEnviado
+
+def processar_testes_tarefa(tarefa, cadernos, diario, data_registros, ignorar_duplicados):
+    """Tarefa em segundo plano: mescla os cadernos ((nome, conteúdo)) no arquivo diário."""
+    return processar_testes_lote(
+        arquivos_caderno=[ArquivoEnviado(conteudo, nome=nome) for nome, conteudo in cadernos],
+        arquivo_diario=ArquivoEnviado(diario[1], nome=diario[0]),
+        data_manual=data_registros,
+        ignorar_duplicados=ignorar_duplicados,
+        progresso=tarefa.atualizar
+    )
 
 def render_test_processor_page():
     """
@@ -59,6 +71,13 @@ def render_test_processor_page():
                 # Converter para formato DD/MM/YYYY
                 data_manual = data_manual.strftime('%d/%m/%Y') if data_manual else None
             
+            ignorar_duplicados = st.checkbox(
+                "Ignorar registros já existentes no arquivo diário",
+                value=True,
+                help="Evita duplicar linhas ao reprocessar o mesmo caderno. Os registros são comparados "
+                     "pela data e pelas colunas de destino."
+            )
+            
             # Exibir informações sobre status válidos
             with st.expander("ℹ️ Informações sobre Status Válidos"):
                 st.info(f"""
@@ -74,12 +93,14 @@ def render_test_processor_page():
         with col2:
             st.subheader("Upload de Arquivos")
             
-            # Upload do caderno de testes
-            caderno_file = st.file_uploader(
-                "Faça upload do Caderno de Testes (Excel)",
-                type=["xlsx"],
+            # Upload dos cadernos de testes (um ou mais, mesclados em uma única gravação)
+            caderno_files = st.file_uploader(
+                "Faça upload do(s) Caderno(s) de Testes (Excel ou ODS)",
+                type=["xlsx", "ods"],
                 key="caderno_uploader",
-                help="Arquivo Excel contendo os testes nas abas 'Caderno App Vivo' e 'Caderno Web B2C'"
+                accept_multiple_files=True,
+                help="Planilhas Excel ou LibreOffice (ODS) contendo os testes nas abas 'Caderno App Vivo' e 'Caderno Web B2C'. "
+                     "Vários cadernos podem ser enviados de uma vez."
             )
             
             # Upload do arquivo diário
@@ -91,14 +112,17 @@ def render_test_processor_page():
             )
             
             # Exibir detalhes dos arquivos quando carregados
-            if caderno_file and diario_file:
+            if caderno_files and diario_file:
                 st.markdown("### Arquivos carregados")
                 file_details = {
-                    "Caderno de Testes": {
-                        "Nome": caderno_file.name, 
-                        "Tipo": caderno_file.type, 
-                        "Tamanho": f"{caderno_file.size/1024:.2f} KB"
-                    },
+                    "Cadernos de Testes": [
+                        {
+                            "Nome": caderno_file.name, 
+                            "Tipo": caderno_file.type, 
+                            "Tamanho": f"{caderno_file.size/1024:.2f} KB"
+                        }
+                        for caderno_file in caderno_files
+                    ],
                     "Arquivo Diário": {
                         "Nome": diario_file.name, 
                         "Tipo": diario_file.type, 
@@ -108,60 +132,78 @@ def render_test_processor_page():
                 st.json(file_details)
         
         # Botão de processamento
-        if caderno_file and diario_file:
+        if caderno_files and diario_file:
+            arquivos_ids = tuple(arquivo.file_id for arquivo in caderno_files) + (diario_file.file_id,)
             if st.button("Processar Arquivos", type="primary", use_container_width=True):
-                try:
-                    with st.spinner('Processando os arquivos de teste...'):
-                        # Chamar a função de processamento
-                        resultado, qtd_registros = processar_testes(
-                            arquivo_caderno=caderno_file,
-                            arquivo_diario=diario_file,
-                            data_manual=data_manual
+                data_registros = data_manual if data_manual else datetime.now(timezone('America/Sao_Paulo')).strftime('%d/%m/%Y')
+                cadernos = [(arquivo.name, arquivo.getvalue()) for arquivo in caderno_files]
+                diario = (diario_file.name, diario_file.getvalue())
+                # Os mesmos arquivos com as mesmas opções reaproveitam a tarefa já executada
+                chave = (
+                    "testes",
+                    hash_conteudo(*(conteudo for _, conteudo in cadernos), diario[1], diario[0]),
+                    data_registros,
+                    ignorar_duplicados
+                )
+                obter_executor().submeter(
+                    chave,
+                    f"Processador de testes ({len(cadernos)} caderno(s))",
+                    processar_testes_tarefa,
+                    cadernos, diario, data_registros, ignorar_duplicados
+                )
+                st.session_state.tarefa_testes = (arquivos_ids, chave, data_registros)
+            
+            # A tarefa continua sendo acompanhada nas reexecuções enquanto os arquivos não mudarem
+            tarefa = None
+            if st.session_state.get('tarefa_testes') and st.session_state.tarefa_testes[0] == arquivos_ids:
+                _, chave, data_registros = st.session_state.tarefa_testes
+                tarefa = obter_executor().obter(chave)
+            
+            if tarefa is not None and acompanhar_tarefa(tarefa):
+                if tarefa.erro:
+                    st.error(f"Erro ao processar os arquivos: {tarefa.erro}")
+                    
+                    # Mostrar mais informações sobre o erro
+                    with st.expander("Detalhes do erro"):
+                        st.code(tarefa.detalhes)
+                else:
+                    resultado, qtd_registros = tarefa.resultado
+                    
+                    # Feedback de sucesso
+                    st.markdown(f"""
+                        <div class="success-message">
+                            ✅ Processamento concluído com sucesso! {qtd_registros} registro(s) adicionado(s).
+                        </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Visualização dos resultados
+                    col1, col2 = st.columns([1, 1])
+                    
+                    with col1:
+                        st.subheader("Resumo")
+                        st.markdown(f"""
+                            * **Registros processados:** {qtd_registros}
+                            * **Cadernos processados:** {len(caderno_files)}
+                            * **Abas processadas:** Caderno App Vivo, Caderno Web B2C
+                            * **Aba de destino:** B2C
+                            * **Data registrada:** {data_registros}
+                        """)
+                    
+                    with col2:
+                        # Botão para download do resultado
+                        nome_arquivo = diario_file.name.split(".")[0] + "_atualizado.xlsx"
+                        st.download_button(
+                            "⬇️ Baixar Arquivo Processado",
+                            resultado.getvalue(),
+                            file_name=nome_arquivo,
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            use_container_width=True
                         )
                         
-                        # Feedback de sucesso
-                        st.markdown(f"""
-                            <div class="success-message">
-                                ✅ Processamento concluído com sucesso! {qtd_registros} registro(s) adicionado(s).
+                        st.markdown("""
+                            <div style="background-color: #e7f3e7; padding: 10px; border-radius: 5px; margin-top: 15px;">
+                                <p style="margin: 0; font-size: 0.9em;">
+                                    ℹ️ O arquivo atualizado contém os registros originais mais os novos testes processados.
+                                </p>
                             </div>
                         """, unsafe_allow_html=True)
-                        
-                        # Visualização dos resultados
-                        col1, col2 = st.columns([1, 1])
-                        
-                        with col1:
-                            st.subheader("Resumo")
-                            st.markdown(f"""
-                                * **Registros processados:** {qtd_registros}
-                                * **Abas processadas:** Caderno App Vivo, Caderno Web B2C
-                                * **Aba de destino:** B2C
-                                * **Data registrada:** {data_manual if data_manual else datetime.now(timezone('America/Sao_Paulo')).strftime('%d/%m/%Y')}
-                            """)
-                        
-                        with col2:
-                            # Botão para download do resultado
-                            nome_arquivo = diario_file.name.split(".")[0] + "_atualizado.xlsx"
-                            st.download_button(
-                                "⬇️ Baixar Arquivo Processado",
-                                resultado,
-                                file_name=nome_arquivo,
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                use_container_width=True
-                            )
-                            
-                            st.markdown("""
-                                <div style="background-color: #e7f3e7; padding: 10px; border-radius: 5px; margin-top: 15px;">
-                                    <p style="margin: 0; font-size: 0.9em;">
-                                        ℹ️ O arquivo atualizado contém os registros originais mais os novos testes processados.
-                                    </p>
-                                </div>
-                            """, unsafe_allow_html=True)
-                
-                except Exception as e:
-                    st.error(f"Erro ao processar os arquivos: {str(e)}")
-                    registrar_log(f"Erro no processamento de testes: {str(e)}", "erro")
-                    registrar_log(f"Detalhes do erro: {traceback.format_exc()}", "erro")
-                    
-                    # Mostrar mais informações sobre o erro
-                    with st.expander("Detalhes do erro"):
-                        st.code(traceback.format_exc()) 
\ No newline at end of file